@@ -303,6 +303,27 @@ class UnbufferedFullyRandom(InstaseisBenchmark):
         return "Unbuffered, random src and receiver"
 
 
+class UnbufferedFixedSrcRandomRecNoObsPy(InstaseisBenchmark):
+    def setup(self):
+        self.db = open_db(self.path, read_on_demand=False,
+                          buffer_size_in_mb=0)
+        self.src = Source(latitude=10.0, longitude=10.0, depth_in_m=10000)
+
+    def iterate(self):
+        # Each receiver results in an uncached element read.
+        lat = np.rad2deg(np.arcsin(2 * random.random() - 1))
+        lng = random.random() * 360.0 - 180.0
+        rec = Receiver(latitude=lat, longitude=lng)
+
+        self.db.get_seismograms(source=self.src, receiver=rec,
+                                return_obspy_stream=False)
+
+    @property
+    def description(self):
+        return "Unbuffered, fixed src, random receiver, no ObsPy - " \
+               "measures cold element reads"
+
+
 class UnbufferedAndRandomReadOnDemandTrue(InstaseisBenchmark):
     def setup(self):
         self.db = open_db(self.path, read_on_demand=True,
@@ -328,6 +349,30 @@ class UnbufferedAndRandomReadOnDemandTrue(InstaseisBenchmark):
                "worst case!"
 
 
+class UnbufferedDenseStationArray(InstaseisBenchmark):
+    def setup(self):
+        self.db = open_db(self.path, read_on_demand=False,
+                          buffer_size_in_mb=0)
+        self.max_depth = self.db.info.max_radius - self.db.info.min_radius
+        # Dense 10 x 10 array with 0.1 degree station spacing.
+        self.receivers = [Receiver(latitude=45.0 + _i * 0.1,
+                                   longitude=45.0 + _j * 0.1)
+                          for _i in range(10) for _j in range(10)]
+
+    def iterate(self):
+        lat = np.rad2deg(np.arcsin(2 * random.random() - 1))
+        lng = random.random() * 360.0 - 180.0
+        depth_in_m = random.random() * self.max_depth
+        src = Source(latitude=lat, longitude=lng, depth_in_m=depth_in_m)
+
+        self.db.get_seismograms_many(source=src, receivers=self.receivers)
+
+    @property
+    def description(self):
+        return "Unbuffered, random src, 100 receivers per iteration using " \
+               "get_seismograms_many()"
+
+
 class FiniteSourceEmulation(InstaseisBenchmark):
     def setup(self):
         self.db = open_db(self.path, read_on_demand=False,
@@ -361,6 +406,34 @@ class FiniteSourceEmulation(InstaseisBenchmark):
         return "Finite source emulation."
 
 
+class FiniteSourceEmulationSummed(FiniteSourceEmulation):
+    def setup(self):
+        FiniteSourceEmulation.setup(self)
+        self.nsamp = self.db.info.npts
+
+    def iterate(self):
+        # The same geometry as above but each column of point sources is
+        # passed as a whole to get_seismograms_finite_source().
+        lng = self.counter * 0.01
+        self.counter += 1
+        sources = []
+        for _i, depth in enumerate(self.depths):
+            src = Source(latitude=0.0, longitude=lng, depth_in_m=depth,
+                         m_rr=1E17, m_tt=1E17, m_pp=1E17)
+            src.set_sliprate_lp(dt=self.db.info.dt, nsamp=self.nsamp,
+                                freq=1.0 / (2.0 * self.db.info.period))
+            src.time_shift = _i * self.db.info.dt
+            sources.append(src)
+
+        self.db.get_seismograms_finite_source(sources=sources,
+                                              receiver=self.rec)
+
+    @property
+    def description(self):
+        return "Finite source emulation, 26 point sources per iteration " \
+               "summed with get_seismograms_finite_source()."
+
+
 parser = argparse.ArgumentParser(
     prog="python -m instaseis.benchmark",
     description='Benchmark Instaseis.')
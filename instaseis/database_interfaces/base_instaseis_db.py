@@ -17,7 +17,9 @@ from future.utils import with_metaclass
 
 from abc import ABCMeta, abstractmethod
 from distutils.version import LooseVersion
+import hashlib
 import math
+import threading
 import warnings
 
 import numpy as np
@@ -26,7 +28,9 @@ from obspy.geodetics import locations2degrees
 from obspy.signal.interpolation import lanczos_interpolation
 from scipy.integrate import cumtrapz
 import scipy.signal
+import scipy.sparse
 
+from .mesh import Buffer
 from ..source import Source, ForceSource, Receiver
 from ..helpers import get_band_code, sizeof_fmt, rfftfreq
 
@@ -34,6 +38,15 @@ from ..helpers import get_band_code, sizeof_fmt, rfftfreq
 DEFAULT_MU = 32e9
 
 
+# Memory limit of the per database cache of the spectra used to reconvolve
+# source time functions.
+SPECTRAL_CACHE_SIZE_IN_MB = 50
+
+# Guards the creation of the spectral caches. The databases have no common
+# constructor to create them in.
+_SPECTRAL_CACHE_LOCK = threading.Lock()
+
+
 KIND_MAP = {
     'displacement': 0,
     'velocity': 1,
@@ -53,18 +66,87 @@ STF_MAP = {
 
 
 def _diff_and_integrate(n_derivative, data, comp, dt_out):
+    """
+    Differentiate or integrate ``data[comp]`` along its last axis.
+    """
     for _ in np.arange(n_derivative):
         # In some numpy version there is an incompatibility here - 1.11
         # works for both so we branch here.
         if LooseVersion(np.__version__) >= LooseVersion("1.11.0"):
-            data[comp] = np.gradient(data[comp], dt_out)
+            data[comp] = np.gradient(data[comp], dt_out, axis=-1)
         else:  # pragma: no cover
             data[comp] = np.gradient(data[comp], [dt_out])
 
     # Cannot happen currently - maybe with other source time functions?
     for _ in np.arange(-n_derivative):  # pragma: no cover
         # adding a zero at the beginning to avoid phase shift
-        data[comp] = cumtrapz(data[comp], dx=dt_out, initial=0.0)
+        data[comp] = cumtrapz(data[comp], dx=dt_out, initial=0.0, axis=-1)
+
+
+def _lanczos_interpolation(data, old_dt, new_start, new_dt, new_npts,
+                           kernelwidth):
+    """
+    Lanczos resampling of data arrays of any dimension along the last axis.
+    The original data is assumed to start at zero.
+    """
+    kwargs = {"old_start": 0, "old_dt": old_dt, "new_start": new_start,
+              "new_dt": new_dt, "new_npts": new_npts, "a": kernelwidth,
+              "window": "blackman"}
+
+    if data.ndim == 1:
+        return lanczos_interpolation(
+            data=np.require(data, requirements=["C"]), **kwargs)
+
+    rows = data.reshape(-1, data.shape[-1])
+    period = 2 * int(kernelwidth) + 2
+
+    # Few rows are cheaper to resample one by one.
+    if rows.shape[0] <= period:
+        out = np.empty((rows.shape[0], new_npts), dtype=np.float64)
+        for _i in range(rows.shape[0]):
+            out[_i] = lanczos_interpolation(
+                data=np.require(rows[_i], requirements=["C"]), **kwargs)
+        return out.reshape(data.shape[:-1] + (new_npts,))
+
+    # All rows share the same time axis and the resampling is linear so
+    # it is a sparse matrix that is applied to all rows at once. Each new
+    # sample only depends on less than ``period`` consecutive old samples.
+    # Resampling combs with one impulse every ``period`` samples thus
+    # yields each weight of the matrix exactly once.
+    old_npts = rows.shape[-1]
+    first = np.floor((new_start + np.arange(new_npts) * new_dt) /
+                     old_dt).astype(np.int64) - int(kernelwidth)
+    row_idx = []
+    col_idx = []
+    weights = []
+    for k in range(period):
+        comb = np.zeros(old_npts, dtype=np.float64)
+        comb[k::period] = 1.0
+        w = lanczos_interpolation(data=comb, **kwargs)
+        col = first + (k - first) % period
+        mask = (col >= 0) & (col < old_npts) & (w != 0.0)
+        row_idx.append(np.nonzero(mask)[0])
+        col_idx.append(col[mask])
+        weights.append(w[mask])
+    matrix = scipy.sparse.csr_matrix(
+        (np.concatenate(weights),
+         (np.concatenate(row_idx), np.concatenate(col_idx))),
+        shape=(new_npts, old_npts))
+
+    out = np.asarray(matrix.dot(np.require(rows, dtype=np.float64).T).T)
+    return out.reshape(data.shape[:-1] + (new_npts,))
+
+
+def _get_elementary_sources(source):
+    """
+    The six moment tensor sources with a single unit component at the
+    location of the given source in the order of
+    :attr:`instaseis.source.Source.tensor`.
+    """
+    return [Source(latitude=source.latitude, longitude=source.longitude,
+                   depth_in_m=source.depth_in_m,
+                   origin_time=source.origin_time, **{name: 1.0})
+            for name in ("m_rr", "m_tt", "m_pp", "m_rt", "m_rp", "m_tp")]
 
 
 class BaseInstaseisDB(with_metaclass(ABCMeta)):
@@ -121,8 +203,21 @@ class BaseInstaseisDB(with_metaclass(ABCMeta)):
         self._get_greens_seiscomp_sanity_checks(epicentral_distance_in_degree,
                                                 source_depth_in_m, kind, dt=dt)
 
-        src_latitude, src_longitude = 90., 0.
-        rec_latitude, rec_longitude = 90. - epicentral_distance_in_degree, 0.
+        source = Source(latitude=90.0, longitude=0.0,
+                        depth_in_m=source_depth_in_m, origin_time=origin_time)
+        receiver = Receiver(latitude=90.0 - epicentral_distance_in_degree,
+                            longitude=0.0)
+
+        # All Green's functions are linear combinations of the seismograms of
+        # the six elementary moment tensors so these are extracted and
+        # processed only once.
+        components = ("Z", "R", "T")
+        data = self._get_moment_tensor_kernels(
+            source=source, receiver=receiver, components=components)
+        time_information = self._process_seismograms(
+            data=data, source=source, components=components, kind=kind,
+            remove_source_shift=True, reconvolve_stf=False, dt=dt,
+            kernelwidth=kernelwidth)
 
         # sources according to https://github.com/krischer/instaseis/issues/8
         # transformed to r, theta, phi
@@ -137,29 +232,12 @@ class BaseInstaseisDB(with_metaclass(ABCMeta)):
         #  0     0     0      1.0    0      0      m4
         #  1.0   1.0   1.0    0      0      0      m6
         #  2.0  -1.0  -1.0    0      0      0      cl
-
-        m1 = Source(src_latitude, src_longitude, source_depth_in_m,
-                    m_tp=-1.0, origin_time=origin_time)
-        m2 = Source(src_latitude, src_longitude, source_depth_in_m,
-                    m_tt=1.0, m_pp=-1.0, origin_time=origin_time)
-        m3 = Source(src_latitude, src_longitude, source_depth_in_m,
-                    m_rp=-1.0, origin_time=origin_time)
-        m4 = Source(src_latitude, src_longitude, source_depth_in_m,
-                    m_rt=1.0, origin_time=origin_time)
-        m6 = Source(src_latitude, src_longitude, source_depth_in_m,
-                    m_rr=1.0, m_tt=1.0, m_pp=1.0, origin_time=origin_time)
-        cl = Source(src_latitude, src_longitude, source_depth_in_m,
-                    m_rr=2.0, m_tt=-1.0, m_pp=-1.0, origin_time=origin_time)
-
-        receiver = Receiver(rec_latitude, rec_longitude)
-
-        # Extract all seismograms - leverage the logic of the
-        # get_seismograms() method as much as possible.
-        args = {'receiver': receiver,
-                'dt': dt,
-                'kind': kind,
-                'kernelwidth': kernelwidth,
-                'return_obspy_stream': return_obspy_stream}
+        m1 = [0.0, 0.0, 0.0, 0.0, 0.0, -1.0]
+        m2 = [0.0, 1.0, -1.0, 0.0, 0.0, 0.0]
+        m3 = [0.0, 0.0, 0.0, 0.0, -1.0, 0.0]
+        m4 = [0.0, 0.0, 0.0, 1.0, 0.0, 0.0]
+        m6 = [1.0, 1.0, 1.0, 0.0, 0.0, 0.0]
+        cl = [2.0, -1.0, -1.0, 0.0, 0.0, 0.0]
 
         items = [
             ("TSS", m1, "T"),
@@ -173,28 +251,27 @@ class BaseInstaseisDB(with_metaclass(ABCMeta)):
             ("ZEP", m6, "Z"),
             ("REP", m6, "R")]
 
+        st = {"mu": data["mu"]}
+        for name, tensor, comp in items:
+            st[name] = np.dot(tensor, data[comp])
+
         if return_obspy_stream:
-            st = Stream()
-        else:
-            st = {}
-
-        for name, src, comp in items:
-            tr = self.get_seismograms(
-                source=src, components=comp, **args)
-            if return_obspy_stream:
-                tr = tr[0]
-                tr.stats.channel = name
-                st.append(tr)
+            if dt is None:
+                dt_out = self.info.dt
             else:
-                st["mu"] = tr["mu"]
-                st[name] = tr[comp]
+                dt_out = dt
+            st = self._convert_to_stream(
+                receiver=receiver, components=[_i[0] for _i in items],
+                data=st, dt_out=dt_out,
+                starttime=time_information["starttime"], add_band_code=False)
 
         return st
 
     def get_seismograms(self, source, receiver, components=None,
                         kind='displacement', remove_source_shift=True,
                         reconvolve_stf=False, return_obspy_stream=True,
-                        dt=None, kernelwidth=12):
+                        dt=None, kernelwidth=12, starttime=None,
+                        endtime=None):
         """
         Extract seismograms from the Green's function database.
 
@@ -231,6 +308,14 @@ class BaseInstaseisDB(with_metaclass(ABCMeta)):
         :param kernelwidth: The width of the sinc kernel used for resampling in
             terms of the original sampling interval. Best choose something
             between 10 and 20.
+        :type starttime: :class:`obspy.core.utcdatetime.UTCDateTime`,
+            optional
+        :param starttime: Only return the samples at or after this time.
+        :type endtime: :class:`obspy.core.utcdatetime.UTCDateTime`, optional
+        :param endtime: Only return the samples at or before this time.
+            Setting ``starttime`` and/or ``endtime`` gives the same samples
+            as trimming the full seismograms but only the data required for
+            them is read and processed where possible.
 
         :returns: Multi component seismograms.
         :rtype: A :class:`obspy.core.stream.Stream` object or a dictionary
@@ -243,24 +328,307 @@ class BaseInstaseisDB(with_metaclass(ABCMeta)):
             source=source, receiver=receiver, components=components,
             kind=kind, dt=dt)
 
+        sample_window = None
+        if starttime is not None or endtime is not None:
+            sample_window = self._get_sample_window(
+                source=source, kind=kind,
+                remove_source_shift=remove_source_shift,
+                reconvolve_stf=reconvolve_stf, dt=dt, kernelwidth=kernelwidth,
+                starttime=starttime, endtime=endtime)
+            if sample_window is None:
+                raise ValueError("No samples of the seismograms are between "
+                                 "starttime and endtime.")
+
         # Call the _get_seismograms() method of the respective implementation.
-        data = self._get_seismograms(source=source, receiver=receiver,
-                                     components=components)
+        if sample_window is None:
+            data = self._get_seismograms(source=source, receiver=receiver,
+                                         components=components)
+        else:
+            data = self._get_seismograms_window(
+                source=source, receiver=receiver, components=components,
+                time_window=sample_window["raw"])
+
+        time_information = self._process_seismograms(
+            data=data, source=source, components=components, kind=kind,
+            remove_source_shift=remove_source_shift,
+            reconvolve_stf=reconvolve_stf, dt=dt, kernelwidth=kernelwidth,
+            sample_window=sample_window)
 
         if dt is None:
             dt_out = self.info.dt
         else:
             dt_out = dt
 
-        stf_deconv_map = {
-            0: self.info.sliprate,
-            1: self.info.slip}
+        if return_obspy_stream:
+            return self._convert_to_stream(
+                receiver=receiver, components=components, data=data,
+                dt_out=dt_out, starttime=time_information["starttime"])
+        else:
+            return data
 
-        # Can never be negative with the current logic.
-        n_derivative = KIND_MAP[kind] - STF_MAP[self.info.stf]
+    def get_seismograms_many(self, source, receivers, components=None,
+                             kind='displacement', remove_source_shift=True,
+                             reconvolve_stf=False, dt=None, kernelwidth=12):
+        """
+        Extract seismograms for a single source and many receivers at once.
 
-        if isinstance(source, ForceSource):
-            n_derivative += 1
+        This is a lot faster than calling :meth:`get_seismograms` in a loop
+        for large receiver arrays. Geometry and element lookups are done for
+        all receivers in one go, receivers located in the same element share
+        the read and the differentiation of that element, and the source
+        time function handling is done as a single two-dimensional operation.
+
+        :param source: The source definition.
+        :type source: :class:`instaseis.source.Source` or
+            :class:`instaseis.source.ForceSource`
+        :param receivers: The seismic receivers.
+        :type receivers: list of :class:`instaseis.source.Receiver`
+        :type components: tuple of str, optional
+        :param components: Which components to calculate. Must be a tuple
+            containing any combination of ``"Z"``, ``"N"``, ``"E"``,
+            ``"R"``, and ``"T"``. Defaults to ``["Z", "N", "E"]`` for two
+            component databases, to ``["N", "E"]`` for horizontal only
+            databases, and to ``["Z"]`` for vertical only databases.
+        :type kind: str, optional
+        :param kind: The desired units of the seismogram:
+            ``"displacement"``, ``"velocity"``, or ``"acceleration"``.
+        :type remove_source_shift: bool, optional
+        :param remove_source_shift: Cut all samples before the peak of the
+            source time function. This has the effect that the first sample
+            is the origin time of the source.
+        :type reconvolve_stf: bool, optional
+        :param reconvolve_stf: Deconvolve the source time function used in
+            the AxiSEM run and convolve with the STF attached to the source.
+            For this to be stable, the new STF needs to bandlimited.
+        :type dt: float, optional
+        :param dt: Desired sampling rate of the seismograms. Resampling is done
+            using a Lanczos kernel.
+        :type kernelwidth: int, optional
+        :param kernelwidth: The width of the sinc kernel used for resampling in
+            terms of the original sampling interval. Best choose something
+            between 10 and 20.
+
+        :returns: A dictionary with one two-dimensional array of shape
+            ``(len(receivers), npts)`` per component. The ``"mu"`` key holds
+            an array with the shear modulus at each receiver. The samples
+            are timed exactly like the ones returned by
+            :meth:`get_seismograms`.
+        :rtype: dict
+        """
+        if components is None:
+            components = self.default_components
+
+        source, receivers = self._get_seismograms_many_sanity_checks(
+            source=source, receivers=receivers, components=components,
+            kind=kind, dt=dt)
+
+        data = self._get_seismograms_many(source=source, receivers=receivers,
+                                          components=components)
+
+        self._process_seismograms(
+            data=data, source=source, components=components, kind=kind,
+            remove_source_shift=remove_source_shift,
+            reconvolve_stf=reconvolve_stf, dt=dt, kernelwidth=kernelwidth)
+
+        return data
+
+    def get_moment_tensor_kernels(self, source, receiver, components=None,
+                                  kind='displacement',
+                                  remove_source_shift=True,
+                                  reconvolve_stf=False, dt=None,
+                                  kernelwidth=12):
+        """
+        Extract the seismograms of the six elementary moment tensors at the
+        location of a source.
+
+        The seismogram of any moment tensor source at this location is a
+        linear combination of these kernels, e.g.
+        ``np.tensordot(source.tensor, kernels, axes=1)`` results in the
+        same data as :meth:`get_seismograms` for ``source``. Useful for
+        moment tensor inversions and everything else requiring the
+        seismograms of many moment tensors at the same location.
+
+        The geometry and the strain at the point are only determined once
+        and the source time function handling and the resampling are done
+        for all six kernels in one go.
+
+        :param source: The source. Only its location, origin time and
+            source time function are used, the moment tensor is ignored.
+        :type source: :class:`instaseis.source.Source`
+        :param receiver: The seismic receiver.
+        :type receiver: :class:`instaseis.source.Receiver`
+        :type components: tuple of str, optional
+        :param components: Which components to calculate. Must be a tuple
+            containing any combination of ``"Z"``, ``"N"``, ``"E"``,
+            ``"R"``, and ``"T"``. Defaults to ``["Z", "N", "E"]`` for two
+            component databases, to ``["N", "E"]`` for horizontal only
+            databases, and to ``["Z"]`` for vertical only databases.
+        :type kind: str, optional
+        :param kind: The desired units of the seismogram:
+            ``"displacement"``, ``"velocity"``, or ``"acceleration"``.
+        :type remove_source_shift: bool, optional
+        :param remove_source_shift: Cut all samples before the peak of the
+            source time function. This has the effect that the first sample
+            is the origin time of the source.
+        :type reconvolve_stf: bool, optional
+        :param reconvolve_stf: Deconvolve the source time function used in
+            the AxiSEM run and convolve with the STF attached to the source.
+            For this to be stable, the new STF needs to bandlimited.
+        :type dt: float, optional
+        :param dt: Desired sampling rate of the seismograms. Resampling is done
+            using a Lanczos kernel.
+        :type kernelwidth: int, optional
+        :param kernelwidth: The width of the sinc kernel used for resampling in
+            terms of the original sampling interval. Best choose something
+            between 10 and 20.
+
+        :returns: Array of shape ``(6, len(components), npts)``. The first
+            axis is in the order of :attr:`instaseis.source.Source.tensor`,
+            i.e. ``m_rr``, ``m_tt``, ``m_pp``, ``m_rt``, ``m_rp``,
+            ``m_tp``. The samples are timed exactly like the ones returned
+            by :meth:`get_seismograms`.
+        :rtype: :class:`numpy.ndarray`
+        """
+        if components is None:
+            components = self.default_components
+
+        source, receiver = self._get_seismograms_sanity_checks(
+            source=source, receiver=receiver, components=components,
+            kind=kind, dt=dt)
+
+        if not isinstance(source, Source):
+            raise ValueError("Moment tensor kernels can only be calculated "
+                             "for moment tensor sources.")
+
+        data = self._get_moment_tensor_kernels(
+            source=source, receiver=receiver, components=components)
+
+        self._process_seismograms(
+            data=data, source=source, components=components, kind=kind,
+            remove_source_shift=remove_source_shift,
+            reconvolve_stf=reconvolve_stf, dt=dt, kernelwidth=kernelwidth)
+
+        return np.array([data[comp] for comp in components]).swapaxes(0, 1)
+
+    def scan_source_grid(self, sources, receivers, components=None,
+                         kind='displacement', remove_source_shift=True,
+                         reconvolve_stf=False, dt=None, kernelwidth=12,
+                         misfit=None):
+        """
+        Scan a grid of candidate source locations, e.g. for a centroid
+        location and depth search.
+
+        Returns the moment tensor kernels (see
+        :meth:`get_moment_tensor_kernels`) of all receivers for one source
+        location after the other. This is a lot faster than calling
+        :meth:`get_moment_tensor_kernels` in a loop: geometry and element
+        lookups are done for many source locations at once and the grid is
+        walked in the order of the elements to maximize the reuse of the
+        buffers.
+
+        Results are returned by a generator so only the kernels of a single
+        location are ever kept in memory. The results are NOT in the order
+        of ``sources``, each is paired with the index of its source.
+
+        Only works with reciprocal databases.
+
+        :param sources: The candidate source locations. Only their
+            locations, origin times and source time functions are used, the
+            moment tensors are ignored.
+        :type sources: list of :class:`instaseis.source.Source`
+        :param receivers: The seismic receivers.
+        :type receivers: list of :class:`instaseis.source.Receiver`
+        :type components: tuple of str, optional
+        :param components: Which components to calculate. Must be a tuple
+            containing any combination of ``"Z"``, ``"N"``, ``"E"``,
+            ``"R"``, and ``"T"``. Defaults to ``["Z", "N", "E"]`` for two
+            component databases, to ``["N", "E"]`` for horizontal only
+            databases, and to ``["Z"]`` for vertical only databases.
+        :type kind: str, optional
+        :param kind: The desired units of the seismogram:
+            ``"displacement"``, ``"velocity"``, or ``"acceleration"``.
+        :type remove_source_shift: bool, optional
+        :param remove_source_shift: Cut all samples before the peak of the
+            source time function. This has the effect that the first sample
+            is the origin time of the source.
+        :type reconvolve_stf: bool, optional
+        :param reconvolve_stf: Deconvolve the source time function used in
+            the AxiSEM run and convolve with the STF attached to the source.
+            For this to be stable, the new STF needs to bandlimited.
+        :type dt: float, optional
+        :param dt: Desired sampling rate of the seismograms. Resampling is done
+            using a Lanczos kernel.
+        :type kernelwidth: int, optional
+        :param kernelwidth: The width of the sinc kernel used for resampling in
+            terms of the original sampling interval. Best choose something
+            between 10 and 20.
+        :type misfit: function, optional
+        :param misfit: Called with the source and the kernels of each
+            location. Its return value, e.g. a misfit or the best fitting
+            moment tensor, is returned instead of the kernels.
+
+        :returns: Generator of ``(index, kernels)`` tuples with ``index``
+            being the index of the source in ``sources`` and ``kernels`` an
+            array of shape ``(len(receivers), 6, len(components), npts)``.
+            If ``misfit`` is given, the generator returns
+            ``(index, misfit(source, kernels))`` tuples instead.
+        """
+        if components is None:
+            components = self.default_components
+
+        sources, receivers = self._scan_source_grid_sanity_checks(
+            sources=sources, receivers=receivers, components=components,
+            kind=kind, dt=dt)
+
+        # Everything above is checked immediately, the actual work is done
+        # while iterating.
+        return self._scan_source_grid(
+            sources=sources, receivers=receivers, components=components,
+            kind=kind, remove_source_shift=remove_source_shift,
+            reconvolve_stf=reconvolve_stf, dt=dt, kernelwidth=kernelwidth,
+            misfit=misfit)
+
+    def _scan_source_grid(self, sources, receivers, components, kind,
+                          remove_source_shift, reconvolve_stf, dt,
+                          kernelwidth, misfit):
+        for index, data in self._get_source_grid_kernels(
+                sources=sources, receivers=receivers, components=components):
+            self._process_seismograms(
+                data=data, source=sources[index], components=components,
+                kind=kind, remove_source_shift=remove_source_shift,
+                reconvolve_stf=reconvolve_stf, dt=dt,
+                kernelwidth=kernelwidth)
+            # (ncomp, nrec, 6, npts) -> (nrec, 6, ncomp, npts)
+            kernels = np.array([data[comp] for comp in components]) \
+                .transpose(1, 2, 0, 3)
+            if misfit is not None:
+                yield index, misfit(sources[index], kernels)
+            else:
+                yield index, kernels
+
+    def _process_seismograms(self, data, source, components, kind,
+                             remove_source_shift, reconvolve_stf, dt,
+                             kernelwidth, sample_window=None):
+        """
+        Apply the source time function handling, the resampling,
+        the integration/differentiation and the source shift removal to the
+        raw data arrays. Modifies ``data`` in place.
+
+        Works with data arrays of any dimension. The time axis is always the
+        last axis.
+
+        If a ``sample_window`` as returned by :meth:`_get_sample_window` is
+        given, the raw data arrays only contain the samples in its raw
+        range and only its output samples are calculated.
+
+        Returns the time information of the final seismograms.
+        """
+        if dt is None:
+            dt_out = self.info.dt
+        else:
+            dt_out = dt
+
+        n_derivative = self._get_n_derivative(source=source, kind=kind)
 
         if reconvolve_stf and remove_source_shift:
             raise ValueError("'remove_source_shift' argument not "
@@ -272,59 +640,49 @@ class BaseInstaseisDB(with_metaclass(ABCMeta)):
             kernelwidth=kernelwidth, remove_source_shift=remove_source_shift,
             reconvolve_stf=reconvolve_stf)
 
+        if sample_window is None:
+            first_raw = 0
+            first, last = 0, time_information["npts_before_shift_removal"]
+            cut = slice(time_information["ref_sample"]
+                        if remove_source_shift else 0, None)
+        else:
+            first_raw = sample_window["raw"][0]
+            first, last = sample_window["processed"]
+            cut = slice(*sample_window["output"])
+            time_information["starttime"] = sample_window["starttime"]
+            time_information["npts"] = sample_window["npts"]
+            time_information["endtime"] = sample_window["endtime"]
+
         for comp in components:
             if reconvolve_stf:
-                # We assume here that the sliprate is well-behaved,
-                # e.g. zeros at the boundaries and no energy above the mesh
-                # resolution.
-                if source.dt is None or source.sliprate is None:
-                    raise ValueError("source has no source time function")
-
-                if STF_MAP[self.info.stf] not in [0, 1]:
-                    raise NotImplementedError(
-                        'deconvolution not implemented for stf %s'
-                        % (self.info.stf))
-
-                stf_deconv_f = np.fft.rfft(
-                    stf_deconv_map[STF_MAP[self.info.stf]],
-                    n=self.info.nfft)
-
-                if abs((source.dt - self.info.dt) / self.info.dt) > 1e-7:
-                    raise ValueError("dt of the source not compatible")
-
-                stf_conv_f = np.fft.rfft(source.sliprate,
-                                         n=self.info.nfft)
-
-                if source.time_shift is not None:
-                    stf_conv_f *= \
-                        np.exp(- 1j * rfftfreq(self.info.nfft) *
-                               2. * np.pi * source.time_shift / self.info.dt)
+                f = self._get_stf_reconvolution_filter(source)
 
                 # Apply a 5 percent, at least 5 samples taper at the end.
                 # The first sample is guaranteed to be zero in any case.
-                tlen = max(int(math.ceil(0.05 * len(data[comp]))), 5)
-                taper = np.ones_like(data[comp])
-                taper[-tlen:] = scipy.signal.hann(tlen * 2)[tlen:]
-                dataf = np.fft.rfft(taper * data[comp], n=self.info.nfft)
+                taper = self._get_reconvolution_taper(data[comp].shape[-1])
+                dataf = np.fft.rfft(taper * data[comp], n=self.info.nfft,
+                                    axis=-1)
 
-                # Ensure numerical stability by not dividing with zero.
-                f = stf_conv_f
-                _l = np.abs(stf_deconv_f)
-                _idx = np.where(_l > 0.0)
-                f[_idx] /= stf_deconv_f[_idx]
-                f[_l == 0] = 0 + 0j
-
-                data[comp] = np.fft.irfft(dataf * f)[:self.info.npts]
+                data[comp] = np.fft.irfft(dataf * f, axis=-1)[
+                    ..., :self.info.npts]
 
             if dt is not None:
-                data[comp] = lanczos_interpolation(
-                    data=np.require(data[comp], requirements=["C"]),
-                    old_start=0, old_dt=self.info.dt,
-                    new_start=time_information["time_shift_at_beginning"],
-                    new_dt=dt,
-                    new_npts=time_information["npts_before_shift_removal"],
-                    a=kernelwidth,
-                    window="blackman")
+                # Only evaluate the required samples.
+                new_start = time_information["time_shift_at_beginning"] + \
+                    first * dt - first_raw * self.info.dt
+                if sample_window is not None:
+                    # Rounding errors must not move the last sample past
+                    # the end of the data.
+                    new_start = min(
+                        new_start, (data[comp].shape[-1] - 1) * self.info.dt -
+                        (last - first - 1) * dt)
+                data[comp] = _lanczos_interpolation(
+                    data=data[comp], old_dt=self.info.dt,
+                    new_start=new_start, new_dt=dt, new_npts=last - first,
+                    kernelwidth=kernelwidth)
+            elif sample_window is not None:
+                data[comp] = data[comp][..., first - first_raw:
+                                        last - first_raw]
 
             # Integrate/differentiate before removing the source shift in
             # order to reduce boundary effects at the start of the signal.
@@ -335,16 +693,205 @@ class BaseInstaseisDB(with_metaclass(ABCMeta)):
                                     comp=comp, dt_out=dt_out)
 
             # If desired, remove the samples before the peak of the source
-            # time function.
-            if remove_source_shift:
-                data[comp] = data[comp][time_information["ref_sample"]:]
+            # time function. Also removes the samples outside of the
+            # requested time window.
+            data[comp] = data[comp][..., cut]
 
-        if return_obspy_stream:
-            return self._convert_to_stream(
-                receiver=receiver, components=components, data=data,
-                dt_out=dt_out, starttime=time_information["starttime"])
+        return time_information
+
+    def _get_n_derivative(self, source, kind):
+        """
+        The number of time derivatives to apply to the raw seismograms.
+        """
+        # Can never be negative with the current logic.
+        n_derivative = KIND_MAP[kind] - STF_MAP[self.info.stf]
+
+        if isinstance(source, ForceSource):
+            n_derivative += 1
+
+        return n_derivative
+
+    def _get_sample_window(self, source, kind, remove_source_shift,
+                           reconvolve_stf, dt, kernelwidth, starttime,
+                           endtime):
+        """
+        Determine the samples required to calculate the samples of the final
+        seismograms between ``starttime`` and ``endtime``.
+
+        Returns a dictionary with the following keys or ``None`` if no
+        sample is in the time window.
+
+        * ``'raw'``: ``(first, last + 1)`` indices of the raw samples that
+            have to be read. Includes the support of the resampling kernel.
+            Reconvolving the source time function requires all samples.
+        * ``'processed'``: ``(first, last + 1)`` indices of the samples
+            that have to be calculated before the source shift is removed.
+            Includes the support of the differentiation.
+        * ``'output'``: ``(first, last + 1)`` indices of the final samples
+            in the processed samples.
+        * ``'starttime'``, ``'endtime'``, ``'npts'``: The time information
+            of the final seismograms.
+        """
+        ti = _get_seismogram_times(
+            info=self.info, origin_time=source.origin_time, dt=dt,
+            kernelwidth=kernelwidth, remove_source_shift=remove_source_shift,
+            reconvolve_stf=reconvolve_stf)
+        dt_out = dt or self.info.dt
+
+        # Same samples as a trim() with nearest_sample=False.
+        first, last = 0, ti["npts"]
+        if starttime is not None:
+            first = max(first, int(math.ceil(
+                round((starttime - ti["starttime"]) / dt_out, 6))))
+        if endtime is not None:
+            last = min(last, int(math.floor(
+                round((endtime - ti["starttime"]) / dt_out, 6))) + 1)
+        if last <= first:
+            return None
+
+        # In samples before the removal of the source shift.
+        shift = ti["ref_sample"] if remove_source_shift else 0
+        first += shift
+        last += shift
+
+        n_derivative = self._get_n_derivative(source=source, kind=kind)
+        if n_derivative < 0 or reconvolve_stf:
+            # Integration and convolution require all samples.
+            proc_first, proc_last = 0, ti["npts_before_shift_removal"]
         else:
-            return data
+            # Finite differences only use the neighbouring samples.
+            proc_first = max(first - n_derivative, 0)
+            proc_last = min(last + n_derivative,
+                            ti["npts_before_shift_removal"])
+
+        if reconvolve_stf:
+            raw = (0, self.info.npts)
+        elif dt is None:
+            raw = (proc_first, proc_last)
+        else:
+            # Support of the resampling kernel.
+            t_first = ti["time_shift_at_beginning"] + proc_first * dt
+            t_last = ti["time_shift_at_beginning"] + (proc_last - 1) * dt
+            raw = (max(int(math.floor(t_first / self.info.dt)) -
+                       kernelwidth - 1, 0),
+                   min(int(math.ceil(t_last / self.info.dt)) +
+                       kernelwidth + 2, self.info.npts))
+
+        starttime = ti["starttime"] + (first - shift) * dt_out
+        return {
+            "raw": raw,
+            "processed": (proc_first, proc_last),
+            "output": (first - proc_first, last - proc_first),
+            "starttime": starttime,
+            "endtime": starttime + (last - first - 1) * dt_out,
+            "npts": last - first}
+
+    @property
+    def _spectral_cache(self):
+        """
+        Buffer of the spectra, tapers, and phase shifts used to reconvolve
+        the source time functions. They only depend on the database and the
+        source time function so they are shared by all calls.
+        """
+        cache = getattr(self, "_spectral_cache_buffer", None)
+        if cache is not None:
+            return cache
+        with _SPECTRAL_CACHE_LOCK:
+            # Another thread might have created it in the meanwhile.
+            if getattr(self, "_spectral_cache_buffer", None) is None:
+                self._spectral_cache_buffer = Buffer(
+                    max_size_in_mb=SPECTRAL_CACHE_SIZE_IN_MB)
+        return self._spectral_cache_buffer
+
+    def _get_cached_spectrum(self, key, func):
+        """
+        Returns the read-only array(s) stored for the key in the spectral
+        cache. Calls ``func`` to compute and store them if not cached yet.
+        """
+        cache = self._spectral_cache
+        # get() returns None if another thread removed the item in the
+        # meanwhile.
+        value = None
+        if key in cache:
+            value = cache.get(key)
+        if value is None:
+            value = func()
+            for _i in (value if isinstance(value, tuple) else [value]):
+                _i.setflags(write=False)
+            cache.add(key, value)
+        return value
+
+    def _get_reconvolution_taper(self, npts):
+        """
+        A 5 percent, at least 5 samples Hann taper at the end.
+        """
+        def _taper():
+            tlen = max(int(math.ceil(0.05 * npts)), 5)
+            taper = np.ones(npts)
+            taper[-tlen:] = scipy.signal.hann(tlen * 2)[tlen:]
+            return taper
+        return self._get_cached_spectrum(("taper", npts), _taper)
+
+    def _get_stf_deconvolution_spectrum(self):
+        """
+        Spectrum of the database's source time function and the mask of
+        its non-zero values.
+        """
+        def _spectrum():
+            stf_deconv_map = {
+                0: self.info.sliprate,
+                1: self.info.slip}
+            stf_deconv_f = np.fft.rfft(
+                stf_deconv_map[STF_MAP[self.info.stf]],
+                n=self.info.nfft)
+            return stf_deconv_f, np.abs(stf_deconv_f) > 0.0
+        return self._get_cached_spectrum(("deconv", self.info.nfft),
+                                         _spectrum)
+
+    def _get_stf_reconvolution_filter(self, source):
+        """
+        Spectrum deconvolving the database's source time function and
+        convolving with the one attached to the source.
+
+        Cached per source time function, number of samples, and time shift
+        so it is only computed once for sources sharing these.
+        """
+        # We assume here that the sliprate is well-behaved,
+        # e.g. zeros at the boundaries and no energy above the mesh
+        # resolution.
+        if source.dt is None or source.sliprate is None:
+            raise ValueError("source has no source time function")
+
+        if STF_MAP[self.info.stf] not in [0, 1]:
+            raise NotImplementedError(
+                'deconvolution not implemented for stf %s'
+                % (self.info.stf))
+
+        if abs((source.dt - self.info.dt) / self.info.dt) > 1e-7:
+            raise ValueError("dt of the source not compatible")
+
+        sliprate = np.require(source.sliprate, dtype=np.float64)
+        key = ("filter", hashlib.sha1(sliprate.tobytes()).hexdigest(),
+               self.info.nfft, source.time_shift)
+
+        def _filter():
+            stf_deconv_f, nonzero = self._get_stf_deconvolution_spectrum()
+
+            stf_conv_f = np.fft.rfft(sliprate, n=self.info.nfft)
+
+            if source.time_shift is not None:
+                stf_conv_f *= self._get_cached_spectrum(
+                    ("shift", self.info.nfft, source.time_shift),
+                    lambda: np.exp(- 1j * rfftfreq(self.info.nfft) *
+                                   2. * np.pi * source.time_shift /
+                                   self.info.dt))
+
+            # Ensure numerical stability by not dividing with zero.
+            f = stf_conv_f
+            f[nonzero] /= stf_deconv_f[nonzero]
+            f[~nonzero] = 0 + 0j
+            return f
+        return self._get_cached_spectrum(key, _filter)
 
     @staticmethod
     def _convert_to_stream(receiver, components, data, dt_out, starttime,
@@ -371,6 +918,92 @@ class BaseInstaseisDB(with_metaclass(ABCMeta)):
     def _get_seismograms(self, source, receiver, components=("Z", "N", "E")):
         raise NotImplementedError
 
+    def _get_seismograms_window(self, source, receiver, components,
+                                time_window):
+        """
+        Same as :meth:`_get_seismograms` but only returns the raw samples
+        with indices in ``[time_window[0], time_window[1])``.
+
+        Database implementations are encouraged to overwrite this with
+        something only reading the required samples - this default
+        implementation just cuts the full seismograms.
+        """
+        data = self._get_seismograms(source=source, receiver=receiver,
+                                     components=components)
+        for comp in components:
+            data[comp] = data[comp][time_window[0]:time_window[1]]
+        return data
+
+    def _get_seismograms_many(self, source, receivers, components):
+        """
+        Extract the raw seismograms for many receivers. Returns a dictionary
+        with one array of shape ``(len(receivers), npts)`` per component and
+        an array of shear moduli under the ``"mu"`` key.
+
+        Database implementations are encouraged to overwrite this with
+        something faster - this default implementation just loops over the
+        receivers.
+        """
+        data = {"mu": np.empty(len(receivers), dtype=np.float64)}
+        for _i, receiver in enumerate(receivers):
+            _d = self._get_seismograms(source=source, receiver=receiver,
+                                       components=components)
+            data["mu"][_i] = _d["mu"]
+            for comp in components:
+                if comp not in data:
+                    data[comp] = np.empty((len(receivers), len(_d[comp])),
+                                          dtype=np.float64)
+                data[comp][_i] = _d[comp]
+        return data
+
+    def _get_moment_tensor_kernels(self, source, receiver, components):
+        """
+        Extract the raw seismograms of the six elementary moment tensors at
+        the location of the source. Returns a dictionary with one array of
+        shape ``(6, npts)`` per component and the shear modulus under the
+        ``"mu"`` key.
+
+        Database implementations are encouraged to overwrite this with
+        something faster - this default implementation just extracts the
+        seismograms one after the other.
+        """
+        data = {}
+        for _i, src in enumerate(_get_elementary_sources(source)):
+            _d = self._get_seismograms(source=src, receiver=receiver,
+                                       components=components)
+            data["mu"] = _d["mu"]
+            for comp in components:
+                if comp not in data:
+                    data[comp] = np.empty((6, len(_d[comp])),
+                                          dtype=np.float64)
+                data[comp][_i] = _d[comp]
+        return data
+
+    def _get_source_grid_kernels(self, sources, receivers, components):
+        """
+        Generator of the raw moment tensor kernels of many source locations
+        and receivers. Yields ``(index, data)`` tuples, ``data`` being a
+        dictionary with one array of shape ``(len(receivers), 6, npts)`` per
+        component and an array of shear moduli under the ``"mu"`` key.
+
+        Database implementations are encouraged to overwrite this with
+        something faster - this default implementation just loops over the
+        sources and receivers.
+        """
+        for index, source in enumerate(sources):
+            data = {"mu": np.empty(len(receivers), dtype=np.float64)}
+            for _i, receiver in enumerate(receivers):
+                _d = self._get_moment_tensor_kernels(
+                    source=source, receiver=receiver, components=components)
+                data["mu"][_i] = _d["mu"]
+                for comp in components:
+                    if comp not in data:
+                        data[comp] = np.empty(
+                            (len(receivers),) + _d[comp].shape,
+                            dtype=np.float64)
+                    data[comp][_i] = _d[comp]
+            yield index, data
+
     @abstractmethod
     def _get_info(self):
         """
@@ -392,7 +1025,8 @@ class BaseInstaseisDB(with_metaclass(ABCMeta)):
                                       components=None,
                                       kind='displacement', dt=None,
                                       kernelwidth=12, correct_mu=False,
-                                      progress_callback=None):
+                                      progress_callback=None, workers=None,
+                                      executor=None):
         """
         Extract seismograms for a finite source from an Instaseis database.
 
@@ -426,6 +1060,16 @@ class BaseInstaseisDB(with_metaclass(ABCMeta)):
             sources for each calculated source. Useful for integration into
             user interfaces to provide some kind of progress information. If
             the callback returns ``True``, the calculation will be cancelled.
+        :type workers: int, optional
+        :param workers: Compute the seismograms of spatially coherent groups
+            of point sources in up to this many worker processes in
+            parallel. Each worker opens its own handle to the database.
+            Defaults to the number of CPUs if only an ``executor`` is given.
+            Only available for local databases.
+        :type executor: :class:`concurrent.futures.Executor`, optional
+        :param executor: Executor to run the workers in. A process pool
+            with ``workers`` processes is created for the call if not
+            given.
 
         :returns: Multi component finite source seismogram.
         :rtype: :class:`obspy.core.stream.Stream`
@@ -436,39 +1080,43 @@ class BaseInstaseisDB(with_metaclass(ABCMeta)):
         if not self.info.is_reciprocal:
             raise NotImplementedError
 
+        if workers is not None or executor is not None:
+            spectra = self._get_finite_source_spectra_parallel(
+                sources=sources, receiver=receiver, components=components,
+                correct_mu=correct_mu, progress_callback=progress_callback,
+                workers=workers, executor=executor)
+        else:
+            spectra = self._get_finite_source_spectra(
+                sources=sources, receiver=receiver, components=components,
+                correct_mu=correct_mu, progress_callback=progress_callback)
+        if spectra is None:
+            return None
+
+        # The convolution is linear so a single inverse FFT of the summed
+        # spectra per component is enough.
         data_summed = {}
-        count = len(sources)
-        for _i, source in enumerate(sources):
-            # Don't perform the diff/integration here, but after the
-            # resampling later on.
-            data = self.get_seismograms(
-                source, receiver, components, reconvolve_stf=True,
-                # Effectively results in nothing happening.
-                kind=INV_KIND_MAP[STF_MAP[self.info.stf]],
-                return_obspy_stream=False, remove_source_shift=False)
-
-            if correct_mu:
-                corr_fac = data["mu"] / DEFAULT_MU,
-            else:
-                corr_fac = 1
-
-            for comp in components:
-                if comp in data_summed:
-                    data_summed[comp] += data[comp] * corr_fac
-                else:
-                    data_summed[comp] = data[comp] * corr_fac
-            # Only used for the GUI.
-            if progress_callback:  # pragma: no cover
-                cancel = progress_callback(_i + 1, count)
-                if cancel:
-                    return None
+        for comp in components:
+            data_summed[comp] = np.zeros(self.info.npts, dtype=np.float64)
+            if comp in spectra:
+                data_summed[comp] += np.fft.irfft(
+                    spectra[comp], n=self.info.nfft)[:self.info.npts]
+            # Force sources require one more time derivative. Applied to
+            # their sum before resampling, same as get_seismograms() does
+            # for each of them.
+            if ("force", comp) in spectra:
+                force = {comp: np.fft.irfft(
+                    spectra[("force", comp)],
+                    n=self.info.nfft)[:self.info.npts]}
+                _diff_and_integrate(n_derivative=1, data=force, comp=comp,
+                                    dt_out=self.info.dt)
+                data_summed[comp] += force[comp]
 
         if dt is not None:
             for comp in components:
                 # We don't need to align a sample to the peak of the source
                 # time function here.
                 new_npts = int(round(
-                    (len(data[comp]) - 1) * self.info.dt / dt, 6) + 1)
+                    (len(data_summed[comp]) - 1) * self.info.dt / dt, 6) + 1)
                 data_summed[comp] = lanczos_interpolation(
                     data=np.require(data_summed[comp], requirements=["C"]),
                     old_start=0, old_dt=self.info.dt, new_start=0, new_dt=dt,
@@ -513,6 +1161,76 @@ class BaseInstaseisDB(with_metaclass(ABCMeta)):
             st += tr
         return st
 
+    def _get_finite_source_spectra(self, sources, receiver, components,
+                                   correct_mu=False, progress_callback=None):
+        """
+        Sum the spectra of the seismograms of all point sources, each
+        reconvolved with its source time function and shifted by its time
+        shift.
+
+        Returns a dictionary with the summed spectrum of each component or
+        ``None`` if the calculation has been cancelled by the progress
+        callback.
+        """
+        spectra = {}
+        count = len(sources)
+        # Don't perform the diff/integration here, but after the
+        # resampling later on.
+        kind = INV_KIND_MAP[STF_MAP[self.info.stf]]
+        for _i, source in enumerate(sources):
+            source, receiver = self._get_seismograms_sanity_checks(
+                source=source, receiver=receiver, components=components,
+                kind=kind, dt=None)
+            data = self._get_seismograms(source=source, receiver=receiver,
+                                         components=components)
+            self._add_to_spectra(spectra=spectra, data=data, source=source,
+                                 components=components,
+                                 correct_mu=correct_mu)
+
+            # Only used for the GUI.
+            if progress_callback:  # pragma: no cover
+                cancel = progress_callback(_i + 1, count)
+                if cancel:
+                    return None
+        return spectra
+
+    def _get_finite_source_spectra_parallel(
+            self, sources, receiver, components, correct_mu=False,
+            progress_callback=None, workers=None, executor=None):
+        """
+        Same as :meth:`_get_finite_source_spectra` but distributed over
+        several worker processes. Has to be implemented by databases
+        supporting it.
+        """
+        raise NotImplementedError(
+            "Parallel finite source extraction is only available for local "
+            "databases.")
+
+    def _add_to_spectra(self, spectra, data, source, components,
+                        correct_mu=False):
+        """
+        Add the spectra of the raw seismograms of a point source reconvolved
+        with its source time function to ``spectra``.
+
+        Force sources need one more time derivative than moment tensor
+        sources so they are summed separately with ``("force", comp)``
+        as the keys.
+        """
+        f = self._get_stf_reconvolution_filter(source)
+        if correct_mu:
+            f = f * (data["mu"] / DEFAULT_MU)
+
+        for comp in components:
+            taper = self._get_reconvolution_taper(data[comp].shape[-1])
+            dataf = np.fft.rfft(taper * data[comp], n=self.info.nfft)
+            dataf *= f
+            key = ("force", comp) if isinstance(source, ForceSource) \
+                else comp
+            if key in spectra:
+                spectra[key] += dataf
+            else:
+                spectra[key] = dataf
+
     def _get_greens_seiscomp_sanity_checks(self, epicentral_distance_degree,
                                            source_depth_in_m, kind, dt):
         """
@@ -653,33 +1371,134 @@ class BaseInstaseisDB(with_metaclass(ABCMeta)):
                         src_radius, self.info.min_radius,
                         self.info.max_radius))
                 raise ValueError(msg)
-        elif not self.info.is_reciprocal and receiver.depth_in_m is not None:
-            rec_radius = self.info.planet_radius - receiver.depth_in_m
-            if rec_radius < self.info.min_radius:
-                msg = (
-                    "Receiver too deep. Receiver would be located at a radius "
-                    "of %.1f meters. The database supports receiver radii "
-                    "from %.1f to %.1f meters." % (
-                        rec_radius, self.info.min_radius,
-                        self.info.max_radius))
-                raise ValueError(msg)
-            elif rec_radius > self.info.max_radius:
-                msg = (
-                    "Receiver is too shallow. Receiver would be located at a "
-                    "radius of %.1f meters. The database supports receiver "
-                    "radii from %.1f to %.1f meters." % (
-                        rec_radius, self.info.min_radius,
-                        self.info.max_radius))
-                raise ValueError(msg)
+        elif not self.info.is_reciprocal:
+            self._check_receiver_depth(receiver)
 
-        d = locations2degrees(source.latitude, source.longitude,
-                              receiver.latitude, receiver.longitude)
-        if not self.info.min_d <= d <= self.info.max_d:
+        self._check_epicentral_distances(source=source, receivers=[receiver])
+
+        return source, receiver
+
+    def _get_seismograms_many_sanity_checks(self, source, receivers,
+                                            components, kind, dt):
+        """
+        Sanity checks for the get_seismograms_many method. Also parses
+        source and receiver objects if necessary.
+
+        :param source: instaseis.Source or instaseis.ForceSource object
+        :type source: :class:`instaseis.source.Source` or
+            :class:`instaseis.source.ForceSource`
+        :param receivers: list of instaseis.Receiver objects
+        :type receivers: list of :class:`instaseis.source.Receiver`
+        :param components: a tuple containing any combination of the
+            strings ``"Z"``, ``"N"``, ``"E"``, ``"R"``, and ``"T"``
+        :param kind: 'displacement', 'velocity' or 'acceleration'
+        """
+        if isinstance(receivers, Receiver):
+            receivers = [receivers]
+
+        parsed_receivers = []
+        for receiver in receivers:
+            if isinstance(receiver, Receiver):
+                parsed_receivers.append(receiver)
+            else:
+                parsed_receivers.extend(Receiver.parse(receiver))
+
+        if not parsed_receivers:
+            raise ValueError("At least one receiver is required.")
+
+        # Everything but the receiver depth and the epicentral distance is
+        # independent of the actual receiver.
+        source, _ = self._get_seismograms_sanity_checks(
+            source=source, receiver=parsed_receivers[0],
+            components=components, kind=kind, dt=dt)
+
+        if self.info.is_reciprocal:
+            if any(_i.depth_in_m is not None for _i in parsed_receivers[1:]):
+                warnings.warn('Receiver depth cannot be changed when reading '
+                              'from reciprocal DB. Using depth from the DB.')
+        else:
+            for receiver in parsed_receivers[1:]:
+                self._check_receiver_depth(receiver)
+
+        self._check_epicentral_distances(source=source,
+                                         receivers=parsed_receivers)
+
+        return source, parsed_receivers
+
+    def _scan_source_grid_sanity_checks(self, sources, receivers,
+                                        components, kind, dt):
+        """
+        Sanity checks for the scan_source_grid method. Also parses source
+        and receiver objects if necessary.
+
+        :param sources: list of instaseis.Source objects
+        :type sources: list of :class:`instaseis.source.Source`
+        :param receivers: list of instaseis.Receiver objects
+        :type receivers: list of :class:`instaseis.source.Receiver`
+        :param components: a tuple containing any combination of the
+            strings ``"Z"``, ``"N"``, ``"E"``, ``"R"``, and ``"T"``
+        :param kind: 'displacement', 'velocity' or 'acceleration'
+        """
+        if not self.info.is_reciprocal:
+            raise ValueError('forward DB cannot be used with '
+                             'scan_source_grid()')
+
+        if isinstance(sources, Source):
+            sources = [sources]
+        if not len(sources):
+            raise ValueError("At least one source is required.")
+
+        parsed_sources = []
+        for source in sources:
+            if not isinstance(source, Source):
+                raise ValueError("Source grids can only consist of moment "
+                                 "tensor sources.")
+            source, receivers = self._get_seismograms_many_sanity_checks(
+                source=source, receivers=receivers, components=components,
+                kind=kind, dt=dt)
+            parsed_sources.append(source)
+
+        return parsed_sources, receivers
+
+    def _check_epicentral_distances(self, source, receivers):
+        """
+        Make sure all receivers are within the distance range of the
+        database.
+        """
+        d = locations2degrees(
+            source.latitude, source.longitude,
+            np.array([_i.latitude for _i in receivers], dtype=np.float64),
+            np.array([_i.longitude for _i in receivers], dtype=np.float64))
+        invalid = (d < self.info.min_d) | (d > self.info.max_d)
+        if np.any(invalid):
             raise ValueError(
                 'Epicentral distance is %.1f but should be in [%.1f, '
-                '%.1f].' % (d, self.info.min_d, self.info.max_d))
+                '%.1f].' % (d[invalid][0], self.info.min_d, self.info.max_d))
 
-        return source, receiver
+    def _check_receiver_depth(self, receiver):
+        """
+        Make sure the receiver depth is within the domain of a forward
+        database.
+        """
+        if receiver.depth_in_m is None:
+            return
+        rec_radius = self.info.planet_radius - receiver.depth_in_m
+        if rec_radius < self.info.min_radius:
+            msg = (
+                "Receiver too deep. Receiver would be located at a radius "
+                "of %.1f meters. The database supports receiver radii "
+                "from %.1f to %.1f meters." % (
+                    rec_radius, self.info.min_radius,
+                    self.info.max_radius))
+            raise ValueError(msg)
+        elif rec_radius > self.info.max_radius:
+            msg = (
+                "Receiver is too shallow. Receiver would be located at a "
+                "radius of %.1f meters. The database supports receiver "
+                "radii from %.1f to %.1f meters." % (
+                    rec_radius, self.info.min_radius,
+                    self.info.max_radius))
+            raise ValueError(msg)
 
     @property
     def info(self):
@@ -18,12 +18,18 @@ from future.utils import with_metaclass
 
 from abc import ABCMeta, abstractmethod
 import collections
+import concurrent.futures
+import math
+import multiprocessing
 
 import numpy as np
 from obspy.signal.util import next_pow_2
 import os
 
-from .base_instaseis_db import BaseInstaseisDB
+from .base_instaseis_db import (BaseInstaseisDB, INV_KIND_MAP, STF_MAP,
+                                _get_elementary_sources)
+from .element_info_cache import ElementInfoCache
+from .strain_cache import StrainCache
 from .. import finite_elem_mapping
 from .. import helpers
 from .. import rotations
@@ -37,6 +43,29 @@ ElementInfo = collections.namedtuple("ElementInfo", [
 
 Coordinates = collections.namedtuple("Coordinates", ["s", "phi", "z"])
 
+# Number of source locations located at once when scanning source grids.
+SOURCE_GRID_CHUNK_SIZE = 1000
+
+# Database handles of the workers of the parallel finite source engine, one
+# per database and set of options.
+_WORKER_DBS = {}
+
+
+def _get_finite_source_spectra_worker(db_path, db_kwargs, sources, receiver,
+                                      components, correct_mu):
+    """
+    Sum the spectra of some point sources in a worker of the parallel
+    finite source engine. The database handle is kept for later tasks of
+    the same worker.
+    """
+    key = (db_path, tuple(sorted(db_kwargs.items())))
+    if key not in _WORKER_DBS:
+        from . import find_and_open_files
+        _WORKER_DBS[key] = find_and_open_files(db_path, **db_kwargs)
+    return _WORKER_DBS[key]._get_finite_source_spectra(
+        sources=sources, receiver=receiver, components=components,
+        correct_mu=correct_mu)
+
 
 class BaseNetCDFInstaseisDB(with_metaclass(ABCMeta, BaseInstaseisDB)):
     """
@@ -44,7 +73,10 @@ class BaseNetCDFInstaseisDB(with_metaclass(ABCMeta, BaseInstaseisDB)):
     database.
     """
     def __init__(self, db_path, buffer_size_in_mb=100,
-                 read_on_demand=False, *args, **kwargs):
+                 read_on_demand=False, strain_cache_dir=None,
+                 strain_cache_size_in_mb=1000, index_cache=False,
+                 page_cache_size_in_mb=10, element_info_cache_size_in_mb=0,
+                 element_info_cache_file=None, *args, **kwargs):
         """
         :param db_path: Path to the Instaseis Database containing
             subdirectories PZ and/or PX each containing a
@@ -61,27 +93,175 @@ class BaseNetCDFInstaseisDB(with_metaclass(ABCMeta, BaseInstaseisDB)):
             initialization, faster in individual seismogram extraction,
             useful e.g. for finite sources, default).
         :type read_on_demand: bool, optional
+        :param strain_cache_dir: Directory to persistently cache the strain
+            of elements computed from the displacement in. Only used for
+            databases storing the displacement. The cache survives restarts
+            and can be shared by all processes on a machine.
+        :type strain_cache_dir: str, optional
+        :param strain_cache_size_in_mb: Maximum size of the strain cache
+            per database file.
+        :type strain_cache_size_in_mb: float, optional
+        :param index_cache: Store the mesh indices and the kd-tree in a
+            sidecar directory next to each netCDF file and load them from
+            there on subsequent opens. The arrays are memory mapped so
+            opening is fast and the memory is shared between all processes.
+        :type index_cache: bool, optional
+        :param page_cache_size_in_mb: Memory limit of the cache of mesh
+            index pages used to look up elements if ``read_on_demand`` is
+            set.
+        :type page_cache_size_in_mb: float, optional
+        :param element_info_cache_size_in_mb: Memory limit of the cache of
+            element locations. Repeated source-receiver geometries then skip
+            the kd-tree query and the search for the element. Disabled if
+            ``0``.
+        :type element_info_cache_size_in_mb: float, optional
+        :param element_info_cache_file: File to initialize the element
+            location cache from if it exists. Use
+            :meth:`save_element_info_cache` to write it.
+        :type element_info_cache_file: str, optional
         """
         self.db_path = db_path
         self.buffer_size_in_mb = buffer_size_in_mb
         self.read_on_demand = read_on_demand
+        self.strain_cache_dir = strain_cache_dir
+        self.strain_cache_size_in_mb = strain_cache_size_in_mb
+        self.index_cache = index_cache
+        self.page_cache_size_in_mb = page_cache_size_in_mb
+        self._strain_caches = {}
+        self.element_info_cache_size_in_mb = element_info_cache_size_in_mb
+        self.element_info_cache_file = element_info_cache_file
+        self._element_info_cache = None
+        # Used by the workers of the parallel finite source engine to open
+        # the database again.
+        self._init_kwargs = {
+            "buffer_size_in_mb": buffer_size_in_mb,
+            "read_on_demand": read_on_demand,
+            "strain_cache_dir": strain_cache_dir,
+            "strain_cache_size_in_mb": strain_cache_size_in_mb,
+            "index_cache": index_cache,
+            "page_cache_size_in_mb": page_cache_size_in_mb,
+            "element_info_cache_size_in_mb": element_info_cache_size_in_mb,
+            "element_info_cache_file": element_info_cache_file}
+
+    def _get_strain_cache(self, mesh):
+        """
+        Returns the on-disk strain cache for the mesh or None if disabled.
+        """
+        if not self.strain_cache_dir:
+            return None
+        if mesh.filename not in self._strain_caches:
+            self._strain_caches[mesh.filename] = StrainCache(
+                directory=self.strain_cache_dir, filename=mesh.filename,
+                max_size_in_mb=self.strain_cache_size_in_mb)
+        return self._strain_caches[mesh.filename]
+
+    @property
+    def element_info_cache(self):
+        """
+        The cache of element locations or None if disabled.
+        """
+        if not self.element_info_cache_size_in_mb:
+            return None
+        if self._element_info_cache is None:
+            cache = ElementInfoCache(
+                max_size_in_mb=self.element_info_cache_size_in_mb,
+                fingerprint=helpers.get_file_fingerprint(
+                    self.parsed_mesh.filename))
+            if self.element_info_cache_file and \
+                    os.path.exists(self.element_info_cache_file):
+                cache.load(self.element_info_cache_file, ElementInfo)
+            self._element_info_cache = cache
+        return self._element_info_cache
+
+    def save_element_info_cache(self, filename=None):
+        """
+        Write the element location cache to a file so it can be used to
+        initialize the cache of later instances.
 
-    def _get_element_info(self, coordinates):
+        :param filename: The file. Defaults to the
+            ``element_info_cache_file`` passed on initialization.
+        :type filename: str, optional
         """
-        Find and collect/calculate information about the element containing
-        the given coordinates.
+        filename = filename or self.element_info_cache_file
+        if self.element_info_cache is None:
+            raise ValueError("The element info cache is disabled.")
+        if not filename:
+            raise ValueError("No filename given.")
+        self.element_info_cache.save(filename)
+
+    def _query_kdtree(self, points):
+        """
+        Query the kd-tree of the mesh for the candidate elements (or GLL
+        points) closest to the given (s, z) point(s).
         """
         k_map = {"displ_only": 6,
                  "strain_only": 1,
                  "fullfields": 1}
 
-        nextpoints = self.parsed_mesh.kdtree.query(
-            [coordinates.s, coordinates.z], k=k_map[self.info.dump_type])
+        return self.parsed_mesh.kdtree.query(
+            points, k=k_map[self.info.dump_type])[1]
 
+    def _get_element_info(self, coordinates):
+        """
+        Find and collect/calculate information about the element containing
+        the given coordinates.
+        """
+        cache = self.element_info_cache
+        if cache is not None:
+            element_info = cache.get(coordinates.s, coordinates.z)
+            if element_info is not None:
+                return element_info
+
+        candidates = self._query_kdtree([coordinates.s, coordinates.z])
+        element_info = self._find_element(coordinates=coordinates,
+                                          candidates=candidates)
+        if cache is not None:
+            cache.add(coordinates.s, coordinates.z, element_info)
+        return element_info
+
+    def _get_element_info_many(self, coordinates):
+        """
+        Same as :meth:`_get_element_info` but for coordinates whose
+        components are arrays. The kd-tree is only queried once for all
+        points.
+
+        Returns a list of :class:`ElementInfo` objects.
+        """
+        npts = len(coordinates.s)
+        cache = self.element_info_cache
+        if cache is not None:
+            element_infos = [cache.get(coordinates.s[_i], coordinates.z[_i])
+                             for _i in range(npts)]
+        else:
+            element_infos = [None] * npts
+
+        missing = [_i for _i in range(npts) if element_infos[_i] is None]
+        if not missing:
+            return element_infos
+
+        candidates = self._query_kdtree(
+            np.column_stack([coordinates.s[missing], coordinates.z[missing]]))
+        found = self._find_elements(
+            coordinates=Coordinates(s=coordinates.s[missing],
+                                    phi=coordinates.phi[missing],
+                                    z=coordinates.z[missing]),
+            candidates=candidates)
+        for _i, ei in zip(missing, found):
+            element_infos[_i] = ei
+            if cache is not None:
+                cache.add(coordinates.s[_i], coordinates.z[_i], ei)
+        return element_infos
+
+    def _find_element(self, coordinates, candidates):
+        """
+        Find the element containing the given coordinates among the
+        candidates returned by the kd-tree and collect all information
+        about it.
+        """
         # Find the element containing the point of interest.
-        mesh = self.parsed_mesh.f["Mesh"]
+        mesh = self.parsed_mesh.paged_mesh
         if self.info.dump_type == 'displ_only':
-            for idx in nextpoints[1]:
+            for idx in candidates:
                 corner_points = np.empty((4, 2), dtype="float64")
 
                 if not self.read_on_demand:
@@ -92,18 +272,12 @@ class BaseNetCDFInstaseisDB(with_metaclass(ABCMeta, BaseInstaseisDB)):
                     corner_points[:, 1] = \
                         self.parsed_mesh.mesh_Z[corner_point_ids]
                 else:
+                    # Served from the page cache - the neighbouring elements
+                    # and points are then already in memory.
                     corner_point_ids = mesh["fem_mesh"][idx][:4]
-
-                    # When reading from a netcdf file, the indices must be
-                    # sorted for newer netcdf versions. The double argsort()
-                    # gives the indices in the sorted array to restore the
-                    # original order.
                     eltype = mesh["eltype"][idx]
-
-                    m_s = mesh["mesh_S"]
-                    m_z = mesh["mesh_Z"]
-                    corner_points[:, 0] = [m_s[_i] for _i in corner_point_ids]
-                    corner_points[:, 1] = [m_z[_i] for _i in corner_point_ids]
+                    corner_points[:, 0] = mesh["mesh_S"][corner_point_ids]
+                    corner_points[:, 1] = mesh["mesh_Z"][corner_point_ids]
 
                 isin, xi, eta = finite_elem_mapping.inside_element(
                     coordinates.s, coordinates.z, corner_points, eltype,
@@ -114,29 +288,97 @@ class BaseNetCDFInstaseisDB(with_metaclass(ABCMeta, BaseInstaseisDB)):
             else:  # pragma: no cover
                 raise ValueError("Element not found")
 
-            if not self.read_on_demand:
-                gll_point_ids = self.parsed_mesh.sem_mesh[id_elem]
-                axis = bool(self.parsed_mesh.axis[id_elem])
-            else:
-                gll_point_ids = mesh["sem_mesh"][id_elem]
-                axis = bool(mesh["axis"][id_elem])
-
-            if axis:
-                col_points_xi = self.parsed_mesh.glj_points
-                col_points_eta = self.parsed_mesh.gll_points
-            else:
-                col_points_xi = self.parsed_mesh.gll_points
-                col_points_eta = self.parsed_mesh.gll_points
+            return self._collect_element_info(
+                id_elem=id_elem, xi=xi, eta=eta, corner_points=corner_points,
+                eltype=eltype)
+        else:
+            return self._collect_element_info(id_elem=candidates)
+
+    def _find_elements(self, coordinates, candidates):
+        """
+        Same as :meth:`_find_element` but for coordinates whose components
+        are arrays and the candidates of all points as a two dimensional
+        array. All candidates are tested in a single call to the compiled
+        library.
+
+        Returns a list of :class:`ElementInfo` objects.
+        """
+        if self.info.dump_type != 'displ_only':
+            return [self._collect_element_info(id_elem=_c)
+                    for _c in candidates]
+
+        candidates = np.asarray(candidates)
+        if not self.read_on_demand:
+            fem_mesh, eltypes = self.parsed_mesh.fem_mesh, \
+                self.parsed_mesh.eltypes
+            mesh_S, mesh_Z = self.parsed_mesh.mesh_S, self.parsed_mesh.mesh_Z
+        else:
+            mesh = self.parsed_mesh.paged_mesh
+            fem_mesh, eltypes = mesh["fem_mesh"], mesh["eltype"]
+            mesh_S, mesh_Z = mesh["mesh_S"], mesh["mesh_Z"]
+
+        # Corner points of all candidates: (npoints, ncandidates, 4, 2).
+        corner_point_ids = fem_mesh[candidates][..., :4]
+        nodes = np.empty(corner_point_ids.shape + (2,), dtype="float64")
+        nodes[..., 0] = mesh_S[corner_point_ids]
+        nodes[..., 1] = mesh_Z[corner_point_ids]
+        candidate_eltypes = eltypes[candidates]
+
+        id_elem, xi, eta = finite_elem_mapping.inside_element_many(
+            coordinates.s, coordinates.z, candidates, nodes,
+            candidate_eltypes, tolerance=1E-3)
+        if (id_elem == -1).any():  # pragma: no cover
+            raise ValueError("Element not found")
+        idx = np.argmax(candidates == id_elem[:, np.newaxis], axis=1)
+        points = np.arange(len(id_elem))
+        corner_points = nodes[points, idx]
+        eltype = candidate_eltypes[points, idx]
+
+        # Gather the remaining information for all elements at once.
+        if not self.read_on_demand:
+            gll_point_ids = self.parsed_mesh.sem_mesh[id_elem]
+            axis = self.parsed_mesh.axis[id_elem]
+        else:
+            gll_point_ids = mesh["sem_mesh"][id_elem]
+            axis = mesh["axis"][id_elem]
+        gll_points = self.parsed_mesh.gll_points
+        glj_points = self.parsed_mesh.glj_points
+
+        return [ElementInfo(
+            id_elem=_id, gll_point_ids=_gll, xi=_xi, eta=_eta,
+            corner_points=_cp, col_points_xi=glj_points if _ax else gll_points,
+            col_points_eta=gll_points, axis=_ax, eltype=_et)
+            for _id, _gll, _xi, _eta, _cp, _ax, _et in zip(
+                id_elem, gll_point_ids, xi, eta, corner_points,
+                axis.astype(bool).tolist(), eltype)]
+
+    def _collect_element_info(self, id_elem, xi=None, eta=None,
+                              corner_points=None, eltype=None):
+        """
+        Collect the remaining information about the element once it has
+        been found. Only the id is used for databases not storing the
+        displacement.
+        """
+        if self.info.dump_type != 'displ_only':
+            return ElementInfo(
+                id_elem=id_elem, gll_point_ids=None, xi=None, eta=None,
+                corner_points=None, col_points_xi=None, col_points_eta=None,
+                axis=None, eltype=None)
+
+        if not self.read_on_demand:
+            gll_point_ids = self.parsed_mesh.sem_mesh[id_elem]
+            axis = bool(self.parsed_mesh.axis[id_elem])
         else:
-            id_elem = nextpoints[1]
-            col_points_xi = None
-            col_points_eta = None
-            gll_point_ids = None
-            axis = None
-            corner_points = None
-            eltype = None
-            xi = None
-            eta = None
+            mesh = self.parsed_mesh.paged_mesh
+            gll_point_ids = mesh["sem_mesh"][id_elem]
+            axis = bool(mesh["axis"][id_elem])
+
+        if axis:
+            col_points_xi = self.parsed_mesh.glj_points
+            col_points_eta = self.parsed_mesh.gll_points
+        else:
+            col_points_xi = self.parsed_mesh.gll_points
+            col_points_eta = self.parsed_mesh.gll_points
 
         return ElementInfo(
             id_elem=id_elem, gll_point_ids=gll_point_ids, xi=xi, eta=eta,
@@ -145,7 +387,7 @@ class BaseNetCDFInstaseisDB(with_metaclass(ABCMeta, BaseInstaseisDB)):
 
     @abstractmethod
     def _get_data(self, source, receiver, components, coordinates,
-                  element_info):
+                  element_info, element_cache=None):
         """
         Has to be implemented by each implementation.
 
@@ -158,6 +400,10 @@ class BaseNetCDFInstaseisDB(with_metaclass(ABCMeta, BaseInstaseisDB)):
         :param coordinates: The coordinates in correct coordinates system.
         :param element_info: Information about the element containing the
             coordinates.
+        :param element_cache: Optional dictionary shared by successive
+            calls for points in the same element. The full element strain
+            or displacement is stored in it so that it is read and
+            differentiated only once, independent of the buffer size.
         """
         raise NotImplementedError
 
@@ -193,99 +439,494 @@ class BaseNetCDFInstaseisDB(with_metaclass(ABCMeta, BaseInstaseisDB)):
             source=source, receiver=receiver, components=components,
             coordinates=coordinates, element_info=element_info)
 
-    def _get_strain_interp(  # NOQA
-            self, mesh, id_elem, gll_point_ids, G, GT, col_points_xi,
-            col_points_eta, corner_points, eltype, axis, xi, eta):
-        if id_elem not in mesh.strain_buffer:
-            # Single precision in the NetCDF files but the later interpolation
-            # routines require double precision. Assignment to this array will
-            # force a cast.
-            utemp = np.zeros((mesh.ndumps, mesh.npol + 1, mesh.npol + 1, 3),
-                             dtype=np.float64, order="F")
-
-            # The list of ids we have is unique but not sorted.
-            ids = gll_point_ids.flatten()
-            s_ids = np.sort(ids)
-            mesh_dict = mesh.f["Snapshots"]
+    def _get_moment_tensor_kernels(self, source, receiver, components):
+        """
+        Extract the raw seismograms of the six elementary moment tensors.
 
-            # Load displacement from all GLL points.
-            for i, var in enumerate(["disp_s", "disp_p", "disp_z"]):
-                if var not in mesh_dict:
-                    continue
+        The geometry and the element lookup are only done once and all six
+        share the element and the strain interpolated at the point.
+        """
+        if self.info.is_reciprocal:
+            a, b = source, receiver
+        else:
+            a, b = receiver, source
 
-                # Make sure it can work with normal and transposed arrays to
-                # support legacy as well as modern, transposed databases.
-                time_axis = mesh.time_axis[var]
+        rotmesh_s, rotmesh_phi, rotmesh_z = rotations.rotate_frame_rd(
+            a.x(planet_radius=self.info.planet_radius),
+            a.y(planet_radius=self.info.planet_radius),
+            a.z(planet_radius=self.info.planet_radius),
+            b.longitude, b.colatitude)
 
-                # Chunk the I/O by requesting successive indices in one go -
-                # this actually makes quite a big difference on some file
-                # systems.
-                chunks = helpers.io_chunker(s_ids)
-                _temp = []
-                m = mesh_dict[var]
-                if time_axis == 0:
-                    for _c in chunks:
-                        if isinstance(_c, list):
-                            _temp.append(m[:, _c[0]:_c[1]])
-                        else:
-                            _temp.append(m[:, _c])
-                else:
-                    for _c in chunks:
-                        if isinstance(_c, list):
-                            _temp.append(m[_c[0]:_c[1], :].T)
-                        else:
-                            _temp.append(m[_c, :].T)
+        coordinates = Coordinates(s=rotmesh_s, phi=rotmesh_phi, z=rotmesh_z)
 
-                _t = np.empty((_temp[0].shape[0], 25),
-                              dtype=_temp[0].dtype)
+        element_info = self._get_element_info(coordinates=coordinates)
 
-                k = 0
-                for _i in _temp:
-                    if len(_i.shape) == 1:
-                        _t[:, k] = _i
-                        k += 1
-                    else:
-                        for _j in range(_i.shape[1]):
-                            _t[:, k + _j] = _i[:, _j]
+        data = {}
+        element_cache = {}
+        for _i, src in enumerate(_get_elementary_sources(source)):
+            _d = self._get_data(
+                source=src, receiver=receiver, components=components,
+                coordinates=coordinates, element_info=element_info,
+                element_cache=element_cache)
+            data["mu"] = _d["mu"]
+            for comp in components:
+                if comp not in data:
+                    data[comp] = np.empty((6, len(_d[comp])),
+                                          dtype=np.float64)
+                data[comp][_i] = _d[comp]
+        return data
+
+    def _get_seismograms_many(self, source, receivers, components):
+        """
+        Extract seismograms for one source and many receivers from a netCDF
+        based Instaseis database.
 
-                        k += _j + 1
+        The rotation and the kd-tree query are done for all receivers at
+        once. Receivers are then grouped by the element they are located in
+        and each element is read and differentiated only once.
+        """
+        # Only the receivers vary which is only useful for reciprocal
+        # databases. Forward databases use the simple loop.
+        if not self.info.is_reciprocal:
+            return BaseInstaseisDB._get_seismograms_many(
+                self, source=source, receivers=receivers,
+                components=components)
+
+        planet_radius = self.info.planet_radius
+        rotmesh_s, rotmesh_phi, rotmesh_z = rotations.rotate_frame_rd(
+            source.x(planet_radius=planet_radius),
+            source.y(planet_radius=planet_radius),
+            source.z(planet_radius=planet_radius),
+            np.array([_i.longitude for _i in receivers], dtype=np.float64),
+            np.array([_i.colatitude for _i in receivers], dtype=np.float64))
 
-                _temp = _t
+        coordinates = Coordinates(s=rotmesh_s, phi=rotmesh_phi, z=rotmesh_z)
+        element_infos = self._get_element_info_many(coordinates=coordinates)
+
+        # Group by element - this determines the order of the reads.
+        groups = collections.OrderedDict()
+        for _i, ei in enumerate(element_infos):
+            groups.setdefault(int(ei.id_elem), []).append(_i)
+
+        data = {"mu": np.empty(len(receivers), dtype=np.float64)}
+        for indices in groups.values():
+            element_cache = {}
+            for _i in indices:
+                _d = self._get_data(
+                    source=source, receiver=receivers[_i],
+                    components=components,
+                    coordinates=Coordinates(s=rotmesh_s[_i],
+                                            phi=rotmesh_phi[_i],
+                                            z=rotmesh_z[_i]),
+                    element_info=element_infos[_i],
+                    element_cache=element_cache)
+                data["mu"][_i] = _d["mu"]
+                for comp in components:
+                    if comp not in data:
+                        data[comp] = np.empty(
+                            (len(receivers), len(_d[comp])), dtype=np.float64)
+                    data[comp][_i] = _d[comp]
+
+        return data
+
+    def _get_source_grid_kernels(self, sources, receivers, components):
+        """
+        Same as :meth:`BaseInstaseisDB._get_source_grid_kernels` but the
+        source locations are processed in chunks of neighbouring locations.
+        All locations of a chunk are located for all receivers at once and
+        then walked in the order of the elements they are located in. Each
+        element is read and differentiated only once per chunk and
+        receiver, independent of the buffer size.
+        """
+        if not self.info.is_reciprocal:
+            for _i in BaseInstaseisDB._get_source_grid_kernels(
+                    self, sources=sources, receivers=receivers,
+                    components=components):
+                yield _i
+            return
+
+        planet_radius = self.info.planet_radius
+
+        # Neighbouring locations end up in the same chunk.
+        order = np.lexsort((
+            [_i.longitude for _i in sources],
+            [_i.latitude for _i in sources],
+            [_i.radius_in_m(planet_radius=planet_radius) for _i in sources]))
+        nchunks = int(math.ceil(len(sources) /
+                                float(SOURCE_GRID_CHUNK_SIZE)))
+
+        for chunk in np.array_split(order, nchunks):
+            chunk_sources = [sources[_i] for _i in chunk]
+            x = np.array([_i.x(planet_radius=planet_radius)
+                          for _i in chunk_sources], dtype=np.float64)
+            y = np.array([_i.y(planet_radius=planet_radius)
+                          for _i in chunk_sources], dtype=np.float64)
+            z = np.array([_i.z(planet_radius=planet_radius)
+                          for _i in chunk_sources], dtype=np.float64)
+
+            geometry = []
+            for receiver in receivers:
+                rotmesh_s, rotmesh_phi, rotmesh_z = rotations.rotate_frame_rd(
+                    x, y, z, receiver.longitude, receiver.colatitude)
+                coordinates = Coordinates(s=rotmesh_s, phi=rotmesh_phi,
+                                          z=rotmesh_z)
+                geometry.append((coordinates, self._get_element_info_many(
+                    coordinates=coordinates)))
+
+            # Walk in the order of the elements of the first receiver.
+            # Neighbouring locations are mostly in neighbouring elements for
+            # all other receivers as well.
+            walk = np.lexsort([[int(_i.id_elem) for _i in element_infos]
+                               for _, element_infos in geometry][::-1])
+
+            # One element cache per receiver, reset whenever the element
+            # changes.
+            current_elements = [None] * len(receivers)
+            element_caches = [{} for _ in receivers]
+
+            for _j in walk:
+                source = chunk_sources[_j]
+                elementary_sources = _get_elementary_sources(source)
+                data = {"mu": np.empty(len(receivers), dtype=np.float64)}
+                for _r, receiver in enumerate(receivers):
+                    coordinates, element_infos = geometry[_r]
+                    ei = element_infos[_j]
+                    if ei.id_elem != current_elements[_r]:
+                        current_elements[_r] = ei.id_elem
+                        element_caches[_r] = {}
+                    for _k, src in enumerate(elementary_sources):
+                        _d = self._get_data(
+                            source=src, receiver=receiver,
+                            components=components,
+                            coordinates=Coordinates(s=coordinates.s[_j],
+                                                    phi=coordinates.phi[_j],
+                                                    z=coordinates.z[_j]),
+                            element_info=ei,
+                            element_cache=element_caches[_r])
+                        data["mu"][_r] = _d["mu"]
+                        for comp in components:
+                            if comp not in data:
+                                data[comp] = np.empty(
+                                    (len(receivers), 6, len(_d[comp])),
+                                    dtype=np.float64)
+                            data[comp][_r, _k] = _d[comp]
+                yield int(chunk[_j]), data
+
+    def _get_finite_source_spectra(self, sources, receiver, components,
+                                   correct_mu=False, progress_callback=None):
+        """
+        Same as :meth:`BaseInstaseisDB._get_finite_source_spectra` but all
+        point sources are located first and then processed grouped by the
+        element they are located in. Each element is read and
+        differentiated only once, independent of the order of the point
+        sources and the buffer size.
+        """
+        if not self.info.is_reciprocal:
+            return BaseInstaseisDB._get_finite_source_spectra(
+                self, sources=sources, receiver=receiver,
+                components=components, correct_mu=correct_mu,
+                progress_callback=progress_callback)
+
+        kind = INV_KIND_MAP[STF_MAP[self.info.stf]]
+        checked_sources = []
+        for source in sources:
+            source, receiver = self._get_seismograms_sanity_checks(
+                source=source, receiver=receiver, components=components,
+                kind=kind, dt=None)
+            checked_sources.append(source)
+        sources = checked_sources
+
+        planet_radius = self.info.planet_radius
+        rotmesh_s, rotmesh_phi, rotmesh_z = rotations.rotate_frame_rd(
+            np.array([_i.x(planet_radius=planet_radius) for _i in sources],
+                     dtype=np.float64),
+            np.array([_i.y(planet_radius=planet_radius) for _i in sources],
+                     dtype=np.float64),
+            np.array([_i.z(planet_radius=planet_radius) for _i in sources],
+                     dtype=np.float64),
+            receiver.longitude, receiver.colatitude)
 
-                for ipol in range(mesh.npol + 1):
-                    for jpol in range(mesh.npol + 1):
-                        idx = ipol * 5 + jpol
-                        utemp[:, jpol, ipol, i] = \
-                            _temp[:, np.argwhere(
-                                s_ids == ids[idx])[0][0]]
+        coordinates = Coordinates(s=rotmesh_s, phi=rotmesh_phi, z=rotmesh_z)
+        element_infos = self._get_element_info_many(coordinates=coordinates)
+
+        # Group by element - this determines the order of the reads.
+        groups = collections.OrderedDict()
+        for _i, ei in enumerate(element_infos):
+            groups.setdefault(int(ei.id_elem), []).append(_i)
+
+        spectra = {}
+        count = len(sources)
+        done = 0
+        for indices in groups.values():
+            element_cache = {}
+            for _i in indices:
+                data = self._get_data(
+                    source=sources[_i], receiver=receiver,
+                    components=components,
+                    coordinates=Coordinates(s=rotmesh_s[_i],
+                                            phi=rotmesh_phi[_i],
+                                            z=rotmesh_z[_i]),
+                    element_info=element_infos[_i],
+                    element_cache=element_cache)
+                self._add_to_spectra(spectra=spectra, data=data,
+                                     source=sources[_i],
+                                     components=components,
+                                     correct_mu=correct_mu)
+
+                done += 1
+                # Only used for the GUI.
+                if progress_callback:  # pragma: no cover
+                    cancel = progress_callback(done, count)
+                    if cancel:
+                        return None
+        return spectra
+
+    def _get_finite_source_spectra_parallel(
+            self, sources, receiver, components, correct_mu=False,
+            progress_callback=None, workers=None, executor=None):
+        """
+        Same as :meth:`_get_finite_source_spectra` but the point sources are
+        split into spatially coherent chunks whose partial sums are
+        computed by workers that each open their own database handle. At
+        most ``workers`` chunks are in flight at any time so a shared
+        executor can serve several calls with a budget each.
+        """
+        sources = list(sources)
+        count = len(sources)
+        if workers is None:
+            workers = multiprocessing.cpu_count()
+        workers = max(int(workers), 1)
+
+        # Sort by location so each chunk only touches a few elements.
+        # Several chunks per worker balance the load and give a smoother
+        # progress report.
+        order = np.lexsort((
+            [_i.depth_in_m for _i in sources],
+            [_i.longitude for _i in sources],
+            [_i.latitude for _i in sources]))
+        chunks = collections.deque(
+            [sources[_j] for _j in _c]
+            for _c in np.array_split(order, min(count, workers * 4)))
+
+        own_executor = executor is None
+        if own_executor:
+            executor = concurrent.futures.ProcessPoolExecutor(
+                max_workers=workers)
+
+        spectra = {}
+        done = 0
+        pending = {}
+        try:
+            while chunks or pending:
+                while chunks and len(pending) < workers:
+                    chunk = chunks.popleft()
+                    future = executor.submit(
+                        _get_finite_source_spectra_worker,
+                        db_path=self.db_path, db_kwargs=self._init_kwargs,
+                        sources=chunk, receiver=receiver,
+                        components=components, correct_mu=correct_mu)
+                    pending[future] = len(chunk)
+
+                finished, _ = concurrent.futures.wait(
+                    pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in finished:
+                    done += pending.pop(future)
+                    for key, value in future.result().items():
+                        if key in spectra:
+                            spectra[key] += value
+                        else:
+                            spectra[key] = value
+                    # Only used for the GUI.
+                    if progress_callback:
+                        cancel = progress_callback(done, count)
+                        if cancel:
+                            return None
+        finally:
+            for future in pending:
+                future.cancel()
+            if own_executor:
+                executor.shutdown(wait=True)
+        return spectra
 
-            strain_fct_map = {
-                "monopole": sem_derivatives.strain_monopole_td,
-                "dipole": sem_derivatives.strain_dipole_td,
-                "quadpole": sem_derivatives.strain_quadpole_td}
+    def _get_strain_interp(  # NOQA
+            self, mesh, id_elem, gll_point_ids, G, GT, col_points_xi,
+            col_points_eta, corner_points, eltype, axis, xi, eta,
+            element_cache=None, time_window=None):
+        strain_fct_map = {
+            "monopole": sem_derivatives.strain_monopole_td,
+            "dipole": sem_derivatives.strain_dipole_td,
+            "quadpole": sem_derivatives.strain_quadpole_td}
+        strain_fct = strain_fct_map[mesh.excitation_type]
+
+        cache_key = (mesh.filename, "strain")
+        displ_key = (mesh.filename, "displacement")
+        # Successive calls for the same point, e.g. for several sources at
+        # the same location, also share the interpolated strain.
+        point_key = (mesh.filename, "strain_at", xi, eta, time_window)
+        if element_cache is not None and point_key in element_cache:
+            return element_cache[point_key]
+
+        strain = None
+        if element_cache is not None:
+            strain = element_cache.get(cache_key)
+        # get() returns None if another thread removed the element from the
+        # buffer in the meanwhile.
+        if strain is None and id_elem in mesh.strain_buffer:
+            strain = mesh.strain_buffer.get(id_elem)
 
-            strain = strain_fct_map[mesh.excitation_type](
+        strain_cache = self._get_strain_cache(mesh)
+        if strain is None and strain_cache is not None:
+            strain = strain_cache.get(id_elem)
+            if strain is not None:
+                mesh.strain_buffer.add(id_elem, strain)
+
+        # Time-major files can cheaply be read for only part of the
+        # samples. Such partial reads are never buffered.
+        partial = strain is None and time_window is not None and \
+            self._is_time_major(mesh)
+        if partial:
+            displ_key = (mesh.filename, "displacement", time_window)
+
+        if partial or (strain is None and strain_cache is None and
+                       mesh.strain_buffer.max_size_in_mb <= 0):
+            # Nothing would be buffered so don't waste time calculating the
+            # strain on all GLL points but only at the point of interest.
+            utemp = None
+            if element_cache is not None:
+                utemp = element_cache.get(displ_key)
+            if utemp is None:
+                if partial:
+                    utemp = self._read_element_displacement(
+                        mesh, gll_point_ids, time_window=time_window)
+                else:
+                    utemp = self._read_element_displacement(mesh,
+                                                            gll_point_ids)
+                if element_cache is not None:
+                    element_cache[displ_key] = utemp
+            if time_window is not None and not partial:
+                utemp = utemp[time_window[0]:time_window[1]]
+
+            final_strain = sem_derivatives.strain_at_point_td(
+                strain_fct, utemp, G, GT, col_points_xi, col_points_eta,
+                mesh.npol, corner_points, eltype, axis, xi, eta)
+
+            if not mesh.excitation_type == "monopole":
+                final_strain[:, 3] *= -1.0
+                final_strain[:, 5] *= -1.0
+
+            if element_cache is not None:
+                element_cache[point_key] = final_strain
+            return final_strain
+        elif strain is None:
+            utemp = self._read_element_displacement(mesh, gll_point_ids)
+
+            strain = strain_fct(
                 utemp, G, GT, col_points_xi, col_points_eta, mesh.npol,
                 mesh.ndumps, corner_points, eltype, axis)
 
             mesh.strain_buffer.add(id_elem, strain)
-        else:
-            strain = mesh.strain_buffer.get(id_elem)
+            if strain_cache is not None:
+                strain_cache.add(id_elem, strain)
+
+        if element_cache is not None:
+            element_cache[cache_key] = strain
 
-        final_strain = np.empty((strain.shape[0], 6), order="F")
+        if time_window is not None:
+            strain = strain[time_window[0]:time_window[1]]
 
-        for i in range(6):
-            final_strain[:, i] = spectral_basis.lagrange_interpol_2D_td(
-                col_points_xi, col_points_eta, strain[:, :, :, i], xi, eta)
+        final_strain = spectral_basis.lagrange_interpol_2D_td_multi(
+            col_points_xi, col_points_eta, strain, xi, eta)
 
         if not mesh.excitation_type == "monopole":
             final_strain[:, 3] *= -1.0
             final_strain[:, 5] *= -1.0
 
+        if element_cache is not None:
+            element_cache[point_key] = final_strain
         return final_strain
 
-    def _get_strain(self, mesh, id_elem):
-        if id_elem not in mesh.strain_buffer:
+    @staticmethod
+    def _is_time_major(mesh):
+        """
+        True if all displacement datasets of the mesh have time as their
+        first axis.
+        """
+        return all(_i == 0 for _i in getattr(mesh, "time_axis", {}).values())
+
+    def _read_element_displacement(self, mesh, gll_point_ids,
+                                   time_window=None):
+        """
+        Read the displacement on all GLL points of an element.
+
+        Returns an array of shape ``(nsamp, npol + 1, npol + 1, 3)``. All
+        samples are read unless a ``(first, last + 1)`` tuple of sample
+        indices is given as ``time_window``.
+        """
+        npol = mesh.npol
+        if time_window is None:
+            time_window = (0, mesh.ndumps)
+        _t = slice(*time_window)
+        nsamp = time_window[1] - time_window[0]
+        # Single precision in the NetCDF files but the later interpolation
+        # routines require double precision. Assignment to this array will
+        # force a cast.
+        utemp = np.zeros((nsamp, npol + 1, npol + 1, 3),
+                         dtype=np.float64, order="F")
+
+        # The list of ids we have is unique but not sorted. HDF5 wants
+        # sorted indices - inv is the inverse permutation mapping the
+        # sorted reads back to the original order.
+        ids = gll_point_ids.flatten()
+        s_ids, inv = np.unique(ids, return_inverse=True)
+        mesh_dict = mesh.f["Snapshots"]
+
+        # Chunk the I/O by requesting successive indices in one go - this
+        # actually makes quite a big difference on some file systems.
+        chunks = helpers.io_chunker(s_ids)
+
+        # Load displacement from all GLL points.
+        for i, var in enumerate(["disp_s", "disp_p", "disp_z"]):
+            if var not in mesh_dict:
+                continue
+
+            # Make sure it can work with normal and transposed arrays to
+            # support legacy as well as modern, transposed databases.
+            time_axis = mesh.time_axis[var]
+
+            m = mesh_dict[var]
+            # Always (npoints, nsamp) - the sorted points along the first
+            # axis.
+            _temp = np.empty((len(s_ids), nsamp), dtype=m.dtype)
+            k = 0
+            for _c in chunks:
+                if isinstance(_c, list):
+                    _s = slice(_c[0], _c[1])
+                    n = _c[1] - _c[0]
+                else:
+                    _s = _c
+                    n = 1
+                if time_axis == 0:
+                    _temp[k:k + n] = m[_t, _s].T.reshape((n, nsamp))
+                else:
+                    _temp[k:k + n] = m[_s, _t].reshape((n, nsamp))
+                k += n
+
+            # Gather in the original order: ids are ordered (ipol, jpol)
+            # but utemp expects (jpol, ipol).
+            utemp[:, :, :, i] = np.take(_temp, inv, axis=0).reshape(
+                (npol + 1, npol + 1, nsamp)).T
+
+        return utemp
+
+    def _get_strain(self, mesh, id_elem, element_cache=None):
+        cache_key = (mesh.filename, "strain")
+        final_strain = None
+        if element_cache is not None:
+            final_strain = element_cache.get(cache_key)
+        if final_strain is None and id_elem in mesh.strain_buffer:
+            final_strain = mesh.strain_buffer.get(id_elem)
+
+        if final_strain is None:
             strain_temp = np.zeros((self.info.npts, 6), order="F")
 
             mesh_dict = mesh.f["Snapshots"]
@@ -321,61 +962,30 @@ class BaseNetCDFInstaseisDB(with_metaclass(ABCMeta, BaseInstaseisDB)):
             final_strain[:, 4] = strain_temp[:, 1]
             final_strain[:, 5] = -strain_temp[:, 3]
             mesh.strain_buffer.add(id_elem, final_strain)
-        else:
-            final_strain = mesh.strain_buffer.get(id_elem)
+
+        if element_cache is not None:
+            element_cache[cache_key] = final_strain
 
         return final_strain
 
     def _get_displacement(self, mesh, id_elem, gll_point_ids, col_points_xi,
-                          col_points_eta, xi, eta):
-        if id_elem not in mesh.displ_buffer:
-            utemp = np.zeros((mesh.ndumps, mesh.npol + 1, mesh.npol + 1, 3),
-                             dtype=np.float64, order="F")
-
-            mesh_dict = mesh.f["Snapshots"]
-
-            # Load displacement from all GLL points.
-            for i, var in enumerate(["disp_s", "disp_p", "disp_z"]):
-                if var not in mesh_dict:
-                    continue
-
-                # Make sure it can work with normal and transposed arrays to
-                # support legacy as well as modern, transposed databases.
-                time_axis = mesh.time_axis[var]
-
-                # The netCDF Python wrappers starting with version 1.1.6
-                # disallow duplicate and unordered indices while slicing. So
-                # we need to do it manually.
-                # The list of ids we have is unique but not sorted.
-                ids = gll_point_ids.flatten()
-                s_ids = np.sort(ids)
-
-                if time_axis == 0:
-                    temp = mesh_dict[var][:, s_ids]
-                    for ipol in range(mesh.npol + 1):
-                        for jpol in range(mesh.npol + 1):
-                            idx = ipol * 5 + jpol
-                            utemp[:, jpol, ipol, i] = \
-                                temp[:, np.argwhere(s_ids == ids[idx])[0][0]]
-                else:
-                    temp = mesh_dict[var][s_ids, :]
-                    for ipol in range(mesh.npol + 1):
-                        for jpol in range(mesh.npol + 1):
-                            idx = ipol * 5 + jpol
-                            utemp[:, jpol, ipol, i] = \
-                                temp[np.argwhere(s_ids == ids[idx])[0][0], :]
-
-            mesh.displ_buffer.add(id_elem, utemp)
-        else:
+                          col_points_eta, xi, eta, element_cache=None):
+        cache_key = (mesh.filename, "displacement")
+        utemp = None
+        if element_cache is not None:
+            utemp = element_cache.get(cache_key)
+        if utemp is None and id_elem in mesh.displ_buffer:
             utemp = mesh.displ_buffer.get(id_elem)
 
-        final_displacement = np.empty((utemp.shape[0], 3), order="F")
+        if utemp is None:
+            utemp = self._read_element_displacement(mesh, gll_point_ids)
+            mesh.displ_buffer.add(id_elem, utemp)
 
-        for i in range(3):
-            final_displacement[:, i] = spectral_basis.lagrange_interpol_2D_td(
-                col_points_xi, col_points_eta, utemp[:, :, :, i], xi, eta)
+        if element_cache is not None:
+            element_cache[cache_key] = utemp
 
-        return final_displacement
+        return spectral_basis.lagrange_interpol_2D_td_multi(
+            col_points_xi, col_points_eta, utemp, xi, eta)
 
     def _get_info(self):
         """
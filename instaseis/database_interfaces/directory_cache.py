@@ -0,0 +1,174 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Base class of the persistent on-disk caches.
+
+:copyright:
+    The Instaseis Development Team, 2026
+:license:
+    GNU Lesser General Public License, Version 3 [non-commercial/academic use]
+    (http://www.gnu.org/copyleft/lgpl.html)
+"""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import os
+import tempfile
+import threading
+
+
+# Fraction of the size limit the cache is reduced to once it is exceeded.
+EVICTION_TARGET = 0.9
+
+
+class DirectoryCache(object):
+    """
+    Directory based cache with a size limit.
+
+    Each item is stored in its own file. Once the cache exceeds its size
+    limit, the least recently used files are removed. Usage is tracked with
+    the modification time of the files so it is shared between all
+    processes using the same directory. Its size is tracked incrementally;
+    the directory is only listed again once the limit is exceeded.
+
+    Subclasses define the ``extension`` of the files and how items are
+    read and written in :meth:`_load` and :meth:`_save`.
+
+    :param directory: The cache directory. Created if it does not exist.
+    :type directory: str
+    :param max_size_in_mb: The maximum size of all files in the directory.
+    :type max_size_in_mb: float
+    """
+    # Extension of the files holding the cached items.
+    extension = None
+
+    def __init__(self, directory, max_size_in_mb=1000):
+        self.directory = directory
+        if not os.path.exists(self.directory):
+            try:
+                os.makedirs(self.directory)
+            except OSError:  # pragma: no cover
+                # Might have been created by another process.
+                if not os.path.isdir(self.directory):
+                    raise
+        self._max_size_in_bytes = max_size_in_mb * 1024 ** 2
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._fails = 0
+        self._total_size = self._get_directory_size()
+
+    def _get_filename(self, key):
+        return os.path.join(self.directory, "%s%s" % (key, self.extension))
+
+    def _get_files(self):
+        files = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(self.extension):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except OSError:  # pragma: no cover
+                # Removed by another process in the meanwhile.
+                continue
+            files.append((stat.st_mtime, stat.st_size, name))
+        return files
+
+    def _get_directory_size(self):
+        return sum(_i[1] for _i in self._get_files())
+
+    def get(self, key):
+        """
+        Returns the item stored for the key or ``None`` if it is not in the
+        cache.
+        """
+        filename = self._get_filename(key)
+        try:
+            value = self._load(filename)
+            # Mark as recently used.
+            os.utime(filename, None)
+        except (IOError, OSError, ValueError):
+            # Not cached or removed by another process in the meanwhile.
+            # ValueError in case a file is truncated.
+            with self._lock:
+                self._fails += 1
+            return None
+        with self._lock:
+            self._hits += 1
+        return value
+
+    def _load(self, filename):
+        """
+        Read an item from a file. Must raise an IOError, OSError, or
+        ValueError if the file cannot be read.
+        """
+        raise NotImplementedError
+
+    def _save(self, fh, value):
+        """
+        Write an item to an open file.
+        """
+        raise NotImplementedError
+
+    def add(self, key, value):
+        """
+        Store an item in the cache and remove the least recently used files
+        if the cache exceeds its size limit.
+        """
+        # Write to a temporary file and move it in place so other threads
+        # and processes never see partially written files.
+        fd, tmp_filename = tempfile.mkstemp(dir=self.directory,
+                                            suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                self._save(fh, value)
+            size = os.path.getsize(tmp_filename)
+            filename = self._get_filename(key)
+            # Another thread or process might have added the same item in
+            # the meanwhile. It is replaced and must not be counted twice.
+            try:
+                size -= os.path.getsize(filename)
+            except OSError:
+                pass
+            os.rename(tmp_filename, filename)
+        except Exception:  # pragma: no cover
+            if os.path.exists(tmp_filename):
+                os.remove(tmp_filename)
+            raise
+
+        with self._lock:
+            self._total_size += size
+            if self._total_size > self._max_size_in_bytes:
+                self._evict()
+
+    def _evict(self):
+        # Other processes might have added or removed files so first get
+        # the true size.
+        files = sorted(self._get_files())
+        self._total_size = sum(_i[1] for _i in files)
+        if self._total_size <= self._max_size_in_bytes:
+            return
+        # Make some room so a full cache is not listed again on each add.
+        target_size = EVICTION_TARGET * self._max_size_in_bytes
+        for _, size, name in files:
+            if self._total_size <= target_size:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:  # pragma: no cover
+                pass
+            self._total_size -= size
+
+    def get_size_mb(self):
+        return float(self._total_size) / 1024 ** 2
+
+    @property
+    def efficiency(self):
+        """
+        Return the fraction of calls to get() that found the item.
+        """
+        with self._lock:
+            hits, fails = self._hits, self._fails
+        if (hits + fails) == 0:
+            return 0.0
+        else:
+            return float(hits) / float(hits + fails)
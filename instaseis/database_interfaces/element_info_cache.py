@@ -0,0 +1,189 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Cache of the location of points in the mesh.
+
+Locating a point requires a kd-tree query and the inversion of the mapping
+of up to six candidate elements. Workloads revisiting the same geometries
+can skip all of that with this cache.
+
+:copyright:
+    The Instaseis Development Team, 2026
+:license:
+    GNU Lesser General Public License, Version 3 [non-commercial/academic use]
+    (http://www.gnu.org/copyleft/lgpl.html)
+"""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+from collections import OrderedDict
+import io
+import threading
+
+import numpy as np
+
+
+# Increase if the layout of the stored files changes.
+ELEMENT_INFO_CACHE_VERSION = 2
+
+# Rough estimate of the memory used by a single entry without its arrays.
+_ENTRY_OVERHEAD_IN_BYTES = 400
+
+
+class ElementInfoCache(object):
+    """
+    Memory limited LRU cache of element information keyed by the quantized
+    (s, z) coordinates of points in the mesh.
+
+    :param max_size_in_mb: Memory limit of the cache.
+    :type max_size_in_mb: float
+    :param resolution_in_m: Points closer than this are considered to be
+        the same. Must be small compared to the size of the elements as the
+        local coordinates of the first point are returned for all of them.
+    :type resolution_in_m: float
+    :param fingerprint: Identifies the mesh. Caches are only loaded from
+        files with the same fingerprint.
+    :type fingerprint: str
+    """
+    def __init__(self, max_size_in_mb=10, resolution_in_m=1E-3,
+                 fingerprint=None):
+        self._max_size_in_bytes = max_size_in_mb * 1024 ** 2
+        self.resolution_in_m = resolution_in_m
+        self.fingerprint = fingerprint
+        self._total_size = 0
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _get_key(self, s, z):
+        return (int(round(s / self.resolution_in_m)),
+                int(round(z / self.resolution_in_m)))
+
+    @staticmethod
+    def _get_nbytes(element_info):
+        return _ENTRY_OVERHEAD_IN_BYTES + sum(
+            _i.nbytes for _i in element_info if isinstance(_i, np.ndarray))
+
+    def get(self, s, z):
+        """
+        Returns the cached element information for the point or ``None``.
+        """
+        key = self._get_key(s, z)
+        with self._lock:
+            if key not in self._cache:
+                self.misses += 1
+                return None
+            self.hits += 1
+            value = self._cache.pop(key)
+            self._cache[key] = value
+        return value
+
+    def add(self, s, z, element_info):
+        """
+        Add the element information for a point, removing the least recently
+        used entries if the memory limit is exceeded.
+        """
+        key = self._get_key(s, z)
+        nbytes = self._get_nbytes(element_info)
+        with self._lock:
+            if key in self._cache:
+                self._total_size -= self._get_nbytes(self._cache.pop(key))
+            self._cache[key] = element_info
+            self._total_size += nbytes
+            while self._total_size > self._max_size_in_bytes:
+                _, v = self._cache.popitem(last=False)
+                self._total_size -= self._get_nbytes(v)
+
+    def __len__(self):
+        return len(self._cache)
+
+    def get_size_mb(self):
+        return float(self._total_size) / 1024 ** 2
+
+    @property
+    def efficiency(self):
+        """
+        Return the fraction of lookups that were answered from the cache.
+        """
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        if (hits + misses) == 0:
+            return 0.0
+        else:
+            return float(hits) / float(hits + misses)
+
+    def save(self, filename):
+        """
+        Write the cache to a file.
+
+        The keys and each field of the entries are stored as stacked arrays
+        in a ``.npz`` file. Fields that are ``None`` for all entries are not
+        stored, fields that are ``None`` for some entries get an additional
+        ``<field>_is_none`` mask.
+        """
+        with self._lock:
+            entries = list(self._cache.items())
+        arrays = {
+            "version": np.array(ELEMENT_INFO_CACHE_VERSION),
+            "fingerprint": np.array(self.fingerprint or ""),
+            "resolution_in_m": np.array(self.resolution_in_m),
+            "keys": np.array([_i[0] for _i in entries],
+                             dtype=np.int64).reshape(len(entries), 2)}
+        if entries:
+            for _i, name in enumerate(entries[0][1]._fields):
+                values = [v[_i] for _, v in entries]
+                is_none = np.array([_j is None for _j in values])
+                if is_none.all():
+                    continue
+                if is_none.any():
+                    fill = np.zeros_like(values[np.argmin(is_none)])
+                    values = [fill if _j is None else _j for _j in values]
+                    arrays[name + "_is_none"] = is_none
+                arrays[name] = np.array(values)
+        with io.open(filename, "wb") as fh:
+            np.savez(fh, **arrays)
+
+    def load(self, filename, element_info_type):
+        """
+        Add all entries of a file written by :meth:`save` to the cache.
+        Files that cannot be read, or written for a different mesh, with a
+        different resolution or by a different version are ignored.
+
+        :param filename: The file.
+        :param element_info_type: The named tuple to create the entries
+            with.
+        :returns: ``True`` if the file has been loaded, ``False`` otherwise.
+        """
+        try:
+            with np.load(filename, allow_pickle=False) as f:
+                content = {_i: f[_i] for _i in f.files}
+        except Exception:
+            return False
+        if "version" not in content or \
+                int(content["version"]) != ELEMENT_INFO_CACHE_VERSION or \
+                str(content["fingerprint"]) != (self.fingerprint or "") or \
+                float(content["resolution_in_m"]) != self.resolution_in_m:
+            return False
+
+        for _i, key in enumerate(content["keys"]):
+            fields = {}
+            for name in element_info_type._fields:
+                if name not in content or (
+                        name + "_is_none" in content and
+                        content[name + "_is_none"][_i]):
+                    fields[name] = None
+                else:
+                    fields[name] = content[name][_i]
+            value = element_info_type(**fields)
+            key = tuple(int(_j) for _j in key)
+            nbytes = self._get_nbytes(value)
+            with self._lock:
+                if key in self._cache:
+                    continue
+                self._cache[key] = value
+                self._total_size += nbytes
+                while self._total_size > self._max_size_in_bytes:
+                    _, v = self._cache.popitem(last=False)
+                    self._total_size -= self._get_nbytes(v)
+        return True
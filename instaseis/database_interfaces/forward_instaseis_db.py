@@ -55,20 +55,28 @@ class ForwardInstaseisDB(BaseNetCDFInstaseisDB):
         m1_m = mesh.Mesh(
             files["MZZ"], full_parse=True, strain_buffer_size_in_mb=0,
             displ_buffer_size_in_mb=self.buffer_size_in_mb,
-            read_on_demand=self.read_on_demand)
+            read_on_demand=self.read_on_demand,
+            index_cache=self.index_cache,
+            page_cache_size_in_mb=self.page_cache_size_in_mb)
         m2_m = mesh.Mesh(
             files["MXX_P_MYY"], full_parse=False, strain_buffer_size_in_mb=0,
             displ_buffer_size_in_mb=self.buffer_size_in_mb,
-            read_on_demand=self.read_on_demand)
+            read_on_demand=self.read_on_demand,
+            index_cache=self.index_cache,
+            page_cache_size_in_mb=self.page_cache_size_in_mb)
         m3_m = mesh.Mesh(
             files["MXZ_MYZ"], full_parse=False, strain_buffer_size_in_mb=0,
             displ_buffer_size_in_mb=self.buffer_size_in_mb,
-            read_on_demand=self.read_on_demand)
+            read_on_demand=self.read_on_demand,
+            index_cache=self.index_cache,
+            page_cache_size_in_mb=self.page_cache_size_in_mb)
         m4_m = mesh.Mesh(
             files["MXY_MXX_M_MYY"], full_parse=False,
             strain_buffer_size_in_mb=0,
             displ_buffer_size_in_mb=self.buffer_size_in_mb,
-            read_on_demand=self.read_on_demand)
+            read_on_demand=self.read_on_demand,
+            index_cache=self.index_cache,
+            page_cache_size_in_mb=self.page_cache_size_in_mb)
         self.parsed_mesh = m1_m
 
         MeshCollection_fwd = collections.namedtuple(
@@ -78,12 +86,12 @@ class ForwardInstaseisDB(BaseNetCDFInstaseisDB):
         self._is_reciprocal = False
 
     def _get_data(self, source, receiver, components, coordinates,
-                  element_info):
+                  element_info, element_cache=None):
         ei = element_info
         # Collect data arrays and mu in a dictionary.
         data = {}
 
-        mesh = self.parsed_mesh.f["Mesh"]
+        mesh = self.parsed_mesh.paged_mesh
 
         # Get mu.
         if not self.read_on_demand:
@@ -60,18 +60,20 @@ class ForwardMergedInstaseisDB(BaseNetCDFInstaseisDB):
             filename, full_parse=True,
             strain_buffer_size_in_mb=self.buffer_size_in_mb,
             displ_buffer_size_in_mb=self.buffer_size_in_mb,
-            read_on_demand=self.read_on_demand))
+            read_on_demand=self.read_on_demand,
+            index_cache=self.index_cache,
+            page_cache_size_in_mb=self.page_cache_size_in_mb))
         self.parsed_mesh = self.meshes.merged
 
         self._is_reciprocal = False
 
     def _get_data(self, source, receiver, components, coordinates,
-                  element_info):
+                  element_info, element_cache=None):
         ei = element_info
         # Collect data arrays and mu in a dictionary.
         data = {}
 
-        mesh = self.parsed_mesh.f["Mesh"]
+        mesh = self.parsed_mesh.paged_mesh
 
         # Get mu.
         if not self.read_on_demand:
@@ -87,8 +89,13 @@ class ForwardMergedInstaseisDB(BaseNetCDFInstaseisDB):
         if self.info.dump_type != 'displ_only':
             raise NotImplementedError
 
-        # Get from netcdf file or buffer.
-        if ei.id_elem not in self.parsed_mesh.displ_buffer:
+        # Get from netcdf file or buffer. get() returns None if another
+        # thread removed the element from the buffer in the meanwhile.
+        utemp = None
+        if ei.id_elem in self.parsed_mesh.displ_buffer:
+            utemp = self.parsed_mesh.displ_buffer.get(ei.id_elem)
+
+        if utemp is None:
             utemp = self.meshes.merged.f["MergedSnapshots"][ei.id_elem]
 
             # utemp is currently (nvars, jpol, ipol, npts)
@@ -100,8 +107,11 @@ class ForwardMergedInstaseisDB(BaseNetCDFInstaseisDB):
             utemp = np.rollaxis(utemp, 3, 2)
 
             self.parsed_mesh.displ_buffer.add(ei.id_elem, utemp)
-        else:
-            utemp = self.parsed_mesh.displ_buffer.get(ei.id_elem)
+
+        # Interpolate all ten components in one go.
+        displ = spectral_basis.lagrange_interpol_2D_td_multi(
+            points1=ei.col_points_xi, points2=ei.col_points_eta,
+            coefficients=utemp, x1=ei.xi, x2=ei.eta)
 
         displ_1 = np.zeros((utemp.shape[0], 3), order="F")
         displ_2 = np.zeros((utemp.shape[0], 3), order="F")
@@ -111,42 +121,18 @@ class ForwardMergedInstaseisDB(BaseNetCDFInstaseisDB):
         # Now just fill them all.
         # displ_1 is generated from MZZ which has only two displacement
         # components.
-        displ_1[:, 0] = spectral_basis.lagrange_interpol_2D_td(
-            points1=ei.col_points_xi, points2=ei.col_points_eta,
-            coefficients=utemp[:, :, :, 0], x1=ei.xi, x2=ei.eta)
-        displ_1[:, 2] = spectral_basis.lagrange_interpol_2D_td(
-            points1=ei.col_points_xi, points2=ei.col_points_eta,
-            coefficients=utemp[:, :, :, 1], x1=ei.xi, x2=ei.eta)
+        displ_1[:, 0] = displ[:, 0]
+        displ_1[:, 2] = displ[:, 1]
         # displ_2 is generated from MXX+MYY which has only two displacement
         # components.
-        displ_2[:, 0] = spectral_basis.lagrange_interpol_2D_td(
-            points1=ei.col_points_xi, points2=ei.col_points_eta,
-            coefficients=utemp[:, :, :, 2], x1=ei.xi, x2=ei.eta)
-        displ_2[:, 2] = spectral_basis.lagrange_interpol_2D_td(
-            points1=ei.col_points_xi, points2=ei.col_points_eta,
-            coefficients=utemp[:, :, :, 3], x1=ei.xi, x2=ei.eta)
+        displ_2[:, 0] = displ[:, 2]
+        displ_2[:, 2] = displ[:, 3]
         # displ_3 is generated from MXZ/MYZ which has three displacement
         # components.
-        displ_3[:, 0] = spectral_basis.lagrange_interpol_2D_td(
-            points1=ei.col_points_xi, points2=ei.col_points_eta,
-            coefficients=utemp[:, :, :, 4], x1=ei.xi, x2=ei.eta)
-        displ_3[:, 1] = spectral_basis.lagrange_interpol_2D_td(
-            points1=ei.col_points_xi, points2=ei.col_points_eta,
-            coefficients=utemp[:, :, :, 5], x1=ei.xi, x2=ei.eta)
-        displ_3[:, 2] = spectral_basis.lagrange_interpol_2D_td(
-            points1=ei.col_points_xi, points2=ei.col_points_eta,
-            coefficients=utemp[:, :, :, 6], x1=ei.xi, x2=ei.eta)
+        displ_3[:, :] = displ[:, 4:7]
         # displ_3 is generated from MXY/MXX-MYY which has three displacement
         # components.
-        displ_4[:, 0] = spectral_basis.lagrange_interpol_2D_td(
-            points1=ei.col_points_xi, points2=ei.col_points_eta,
-            coefficients=utemp[:, :, :, 7], x1=ei.xi, x2=ei.eta)
-        displ_4[:, 1] = spectral_basis.lagrange_interpol_2D_td(
-            points1=ei.col_points_xi, points2=ei.col_points_eta,
-            coefficients=utemp[:, :, :, 8], x1=ei.xi, x2=ei.eta)
-        displ_4[:, 2] = spectral_basis.lagrange_interpol_2D_td(
-            points1=ei.col_points_xi, points2=ei.col_points_eta,
-            coefficients=utemp[:, :, :, 9], x1=ei.xi, x2=ei.eta)
+        displ_4[:, :] = displ[:, 7:10]
 
         mij = source.tensor / self.parsed_mesh.amplitude
         # mij is [m_rr, m_tt, m_pp, m_rt, m_rp, m_tp]
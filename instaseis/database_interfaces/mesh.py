@@ -25,12 +25,71 @@ from __future__ import (absolute_import, division, print_function,
                         unicode_literals)
 
 from collections import OrderedDict
+import os
+import re
+import shutil
+import tempfile
+import threading
+import warnings
 
 import h5py
 import numpy as np
 from obspy import UTCDateTime
 from scipy.spatial import cKDTree
 
+from ..helpers import get_file_fingerprint
+from .shared_buffer import get_shared_buffer
+
+
+# Increase if the layout of the index cache changes.
+INDEX_CACHE_VERSION = 2
+
+
+# Read-only mesh indices per file, filled by share_indices(). Meshes opened
+# later on reuse these instead of reading and building them again. Pages
+# of the arrays and the kd-tree are shared between the processes forked
+# afterwards as long as nobody writes to them.
+_SHARED_INDICES = {}
+
+# Attributes of a fully parsed mesh that never change.
+SHARED_INDEX_NAMES = ("mesh", "kdtree", "fem_mesh", "eltypes", "mesh_S",
+                      "mesh_Z", "sem_mesh", "axis", "mesh_mu")
+
+
+def share_indices(mesh):
+    """
+    Register the read-only indices (element midpoints, kd-tree, connectivity
+    and coordinate arrays) of a parsed mesh so that all further meshes
+    opened for the same file use the very same objects.
+
+    Meant to be called in the parent process before forking worker
+    processes. The workers then have to reopen the file, but don't have to
+    parse the mesh and build the kd-tree again and the memory holding the
+    indices is shared between all of them. The arrays are made read-only to
+    make sure no pages are copied on write.
+
+    :param mesh: A fully parsed mesh.
+    :type mesh: :class:`Mesh`
+    """
+    indices = {}
+    for name in SHARED_INDEX_NAMES:
+        value = getattr(mesh, name, None)
+        # Skip things that are not in memory, e.g. lazily read HDF5
+        # datasets.
+        if isinstance(value, np.ndarray):
+            value.flags.writeable = False
+        elif not isinstance(value, cKDTree):
+            continue
+        indices[name] = value
+    _SHARED_INDICES[os.path.abspath(mesh.filename)] = indices
+
+
+def clear_shared_indices():
+    """
+    Forget all indices registered with :func:`share_indices`.
+    """
+    _SHARED_INDICES.clear()
+
 
 class Buffer(object):
     """
@@ -38,6 +97,10 @@ class Buffer(object):
     Implemented as a kind of priority queue where priority is highest for
     recently accessed items. Thus the "stalest" items are removed first once
     the memory limit it reached.
+
+    The buffer is thread-safe. Items might be removed by another thread
+    between a ``key in buffer`` check and the following :meth:`get` call
+    in which case :meth:`get` returns the default value.
     """
     def __init__(self, max_size_in_mb=100):
         self._max_size_in_bytes = max_size_in_mb * 1024 ** 2
@@ -45,22 +108,27 @@ class Buffer(object):
         self._buffer = OrderedDict()
         self._hits = 0
         self._fails = 0
+        self._lock = threading.RLock()
 
     def __contains__(self, key):
-        contains = key in self._buffer
-        if contains:
-            self._hits += 1
-        else:
-            self._fails += 1
+        with self._lock:
+            contains = key in self._buffer
+            if contains:
+                self._hits += 1
+            else:
+                self._fails += 1
         return contains
 
-    def get(self, key):
+    def get(self, key, default=None):
         """
         Return an item from the buffer and move it to the end, so it is removed
-        last.
+        last. Returns ``default`` if the item is not in the buffer.
         """
-        value = self._buffer.pop(key)
-        self._buffer[key] = value
+        with self._lock:
+            if key not in self._buffer:
+                return default
+            value = self._buffer.pop(key)
+            self._buffer[key] = value
         return value
 
     def _get_nbytes(self, value):
@@ -75,28 +143,108 @@ class Buffer(object):
         Add an item to the buffer and make sure that the buffer does not exceed
         the maximum size in memory.
         """
-        self._buffer[key] = value
-        # Assuming value is a numpy array
-        self._total_size += self._get_nbytes(value)
-
-        # Remove existing values, until the size limit is fulfilled.
-        while self._total_size > self._max_size_in_bytes:
-            _, v = self._buffer.popitem(last=False)
-            self._total_size -= self._get_nbytes(v)
+        nbytes = self._get_nbytes(value)
+        with self._lock:
+            # Multiple threads might add the same item.
+            if key in self._buffer:
+                self._total_size -= self._get_nbytes(self._buffer.pop(key))
+            self._buffer[key] = value
+            # Assuming value is a numpy array
+            self._total_size += nbytes
+
+            # Remove existing values, until the size limit is fulfilled.
+            while self._total_size > self._max_size_in_bytes:
+                _, v = self._buffer.popitem(last=False)
+                self._total_size -= self._get_nbytes(v)
 
     def get_size_mb(self):
         return float(self._total_size) / 1024 ** 2
 
+    @property
+    def max_size_in_mb(self):
+        return float(self._max_size_in_bytes) / 1024 ** 2
+
     @property
     def efficiency(self):
         """
         Return the fraction of calls to the __contains__() routine that
         returned True.
         """
-        if (self._hits + self._fails) == 0:
+        with self._lock:
+            hits, fails = self._hits, self._fails
+        if (hits + fails) == 0:
             return 0.0
         else:
-            return float(self._hits) / float(self._hits + self._fails)
+            return float(hits) / float(hits + fails)
+
+
+class PagedGroup(object):
+    """
+    Read-only view of the datasets of a HDF5 group answering lookups from a
+    LRU cache of aligned blocks of rows (pages) instead of reading single
+    items from the file.
+
+    Meant for the mesh indices when they are read on demand. Lookups of
+    single elements and points then cost one read per page and are answered
+    from memory afterwards.
+
+    :param group: The HDF5 group.
+    :param max_size_in_mb: Memory limit of all cached pages.
+    :type max_size_in_mb: float
+    :param page_size_in_bytes: Approximate size of a page.
+    :type page_size_in_bytes: int
+    """
+    def __init__(self, group, max_size_in_mb=10,
+                 page_size_in_bytes=64 * 1024):
+        self._group = group
+        self._page_size_in_bytes = page_size_in_bytes
+        self.pages = Buffer(max_size_in_mb)
+        self._datasets = {}
+
+    def __getitem__(self, name):
+        if name not in self._datasets:
+            self._datasets[name] = PagedDataset(self, name)
+        return self._datasets[name]
+
+
+class PagedDataset(object):
+    """
+    A single dataset of a :class:`PagedGroup`. Can be indexed with integers
+    or arrays of integers along the first axis.
+    """
+    def __init__(self, group, name):
+        self._group = group
+        self._name = name
+        self._ds = group._group[name]
+        self.shape = self._ds.shape
+        self.dtype = self._ds.dtype
+        row_size = int(np.prod(self.shape[1:])) * self.dtype.itemsize
+        self.rows_per_page = max(1, group._page_size_in_bytes // row_size)
+
+    def _get_page(self, page):
+        key = (self._name, page)
+        value = None
+        # get() returns None if another thread removed the page in the
+        # meanwhile.
+        if key in self._group.pages:
+            value = self._group.pages.get(key)
+        if value is None:
+            start = page * self.rows_per_page
+            value = self._ds[start:start + self.rows_per_page]
+            self._group.pages.add(key, value)
+        return value
+
+    def __getitem__(self, idx):
+        idx = np.asarray(idx)
+        pages = idx // self.rows_per_page
+        offsets = idx % self.rows_per_page
+        if idx.ndim == 0:
+            return self._get_page(int(pages))[offsets]
+        values = np.empty(idx.shape + self.shape[1:], dtype=self.dtype)
+        for page in np.unique(pages):
+            mask = pages == page
+            values[mask] = self._get_page(int(page))[offsets[mask]]
+        return values
 
 
 def get_time_axis(ds, ndumps):
@@ -125,14 +273,41 @@ class Mesh(object):
 
     def __init__(self, filename, full_parse=False,
                  strain_buffer_size_in_mb=0, displ_buffer_size_in_mb=0,
-                 read_on_demand=True):
+                 read_on_demand=True, index_cache=False,
+                 page_cache_size_in_mb=10):
+        # h5py serializes all calls to the HDF5 library with a global lock so
+        # a single handle can safely be shared by all threads. Multiple
+        # handles would not allow any parallel I/O.
         self.f = h5py.File(filename, "r")
         self.filename = filename
         self.read_on_demand = read_on_demand
+        self.page_cache_size_in_mb = page_cache_size_in_mb
+        self._index_cache_dir = None
+        self._uncached_indices = []
+        if index_cache:
+            self._index_cache_dir = os.path.join(
+                self.filename + ".index_cache",
+                "v%i_%s" % (INDEX_CACHE_VERSION,
+                            get_file_fingerprint(self.filename)))
         self._parse(full_parse=full_parse)
+        if self._uncached_indices:
+            self._write_index_cache()
         self._find_time_axis()
-        self.strain_buffer = Buffer(strain_buffer_size_in_mb)
-        self.displ_buffer = Buffer(displ_buffer_size_in_mb)
+        self.strain_buffer = self._get_buffer(
+            "strain", strain_buffer_size_in_mb)
+        self.displ_buffer = self._get_buffer(
+            "displ", displ_buffer_size_in_mb)
+
+    def _get_buffer(self, kind, max_size_in_mb):
+        """
+        Use the buffer shared between processes if one has been registered
+        for this file, otherwise create a new one.
+        """
+        if max_size_in_mb > 0:
+            shared = get_shared_buffer(self.filename, kind)
+            if shared is not None:
+                return shared
+        return Buffer(max_size_in_mb)
 
     def _get_str_attr(self, name):
         attr = self.f.attrs[name]
@@ -143,6 +318,74 @@ class Mesh(object):
         except Exception:
             return attr
 
+    def _get_index(self, name, read, cache=True):
+        """
+        Returns the shared index ``name`` if available, then tries the index
+        cache, and finally returns the result of calling ``read``.
+
+        :param cache: Indices derived from other indices, e.g. the kd-tree,
+            are never read from or written to the index cache.
+        """
+        shared = _SHARED_INDICES.get(os.path.abspath(self.filename), {})
+        if name in shared:
+            return shared[name]
+        if cache and self._index_cache_dir:
+            value = self._read_cached_index(name)
+            if value is not None:
+                return value
+            self._uncached_indices.append(name)
+        return read()
+
+    def _read_cached_index(self, name):
+        """
+        Arrays are memory mapped so the pages are shared between all
+        processes.
+        """
+        filename = os.path.join(self._index_cache_dir, name + ".npy")
+        try:
+            return np.load(filename, mmap_mode="r")
+        except (IOError, OSError, ValueError):
+            return None
+
+    def _write_index_cache(self):
+        """
+        Write all indices not yet in the index cache to it. Failures, e.g. on
+        read-only file systems, only result in a warning.
+        """
+        try:
+            if not os.path.exists(self._index_cache_dir):
+                os.makedirs(self._index_cache_dir)
+            # Remove caches of older versions of the index cache. Others of
+            # the current version might still be used by other processes
+            # opening the same file via another path or a different
+            # version of the file.
+            sidecar = os.path.dirname(self._index_cache_dir)
+            for name in os.listdir(sidecar):
+                match = re.match(r"^v(\d+)_", name)
+                if match and int(match.group(1)) < INDEX_CACHE_VERSION:
+                    shutil.rmtree(os.path.join(sidecar, name),
+                                  ignore_errors=True)
+
+            for name in self._uncached_indices:
+                # Write to a temporary file and move it in place so other
+                # processes never see partially written files.
+                fd, tmp_filename = tempfile.mkstemp(
+                    dir=self._index_cache_dir, suffix=".tmp")
+                with os.fdopen(fd, "wb") as fh:
+                    np.save(fh, getattr(self, name))
+                os.rename(tmp_filename, os.path.join(self._index_cache_dir,
+                                                     name + ".npy"))
+        except (IOError, OSError) as e:
+            warnings.warn("Could not write the index cache for '%s': %s" % (
+                self.filename, str(e)))
+        self._uncached_indices = []
+
+    def _read_mesh_points(self, s, z):
+        mesh = np.empty((s.shape[0], 2), dtype=s.dtype)
+        mesh[:, 0] = s[:]
+        mesh[:, 1] = z[:]
+        return mesh
+
     def _find_time_axis(self):
         # Merged databases are always the same and don't have a Snapshots key.
         if "Snapshots" not in self.f:
@@ -260,6 +503,10 @@ class Mesh(object):
         self.source_depth = self.f.attrs["source depth in km"][0]
         self.stf_kind = self._get_str_attr("source time function")
 
+        # Used to look up the indices if they are read on demand.
+        self.paged_mesh = PagedGroup(self.f["Mesh"],
+                                     max_size_in_mb=self.page_cache_size_in_mb)
+
         if self.dump_type == "displ_only":
             self.gll_points = self.f["Mesh"]["gll"][:]
             self.glj_points = self.f["Mesh"]["glj"][:]
@@ -276,36 +523,36 @@ class Mesh(object):
             self.s_mp = self.f["Mesh"]["mp_mesh_S"]
             self.z_mp = self.f["Mesh"]["mp_mesh_Z"]
 
-            self.mesh = np.empty((self.s_mp.shape[0], 2),
-                                 dtype=self.s_mp.dtype)
-            self.mesh[:, 0] = self.s_mp[:]
-            self.mesh[:, 1] = self.z_mp[:]
-
-            self.kdtree = cKDTree(data=self.mesh)
+            self.mesh = self._get_index(
+                "mesh", lambda: self._read_mesh_points(self.s_mp, self.z_mp))
+            # Always built from the possibly memory mapped points.
+            self.kdtree = self._get_index(
+                "kdtree", lambda: cKDTree(data=self.mesh), cache=False)
 
             # Store some more index types in memory. While this increases
             # memory use it should be acceptable and result in much less netCDF
             # reads.
             if not self.read_on_demand:
-                self.fem_mesh = self.f["Mesh"]["fem_mesh"][:]
-                self.eltypes = self.f["Mesh"]["eltype"][:]
-                self.mesh_S = self.f["Mesh"]["mesh_S"][:]
-                self.mesh_Z = self.f["Mesh"]["mesh_Z"][:]
-                self.sem_mesh = self.f["Mesh"]["sem_mesh"][:]
-                self.axis = self.f["Mesh"]["axis"][:]
-                self.mesh_mu = self.f["Mesh"]["mesh_mu"][:]
+                for name, ds_name in (
+                        ("fem_mesh", "fem_mesh"), ("eltypes", "eltype"),
+                        ("mesh_S", "mesh_S"), ("mesh_Z", "mesh_Z"),
+                        ("sem_mesh", "sem_mesh"), ("axis", "axis"),
+                        ("mesh_mu", "mesh_mu")):
+                    setattr(self, name, self._get_index(
+                        name, lambda: self.f["Mesh"][ds_name][:]))
 
         elif self.dump_type == "fullfields" or self.dump_type == "strain_only":
             # Build a kdtree of the stored gll points.
             self.mesh_S = self.f["Mesh"]["mesh_S"]
             self.mesh_Z = self.f["Mesh"]["mesh_Z"]
 
-            self.mesh = np.empty((self.mesh_S.shape[0], 2),
-                                 dtype=self.mesh_S.dtype)
-            self.mesh[:, 0] = self.mesh_S[:]
-            self.mesh[:, 1] = self.mesh_Z[:]
-
-            self.kdtree = cKDTree(data=self.mesh)
+            self.mesh = self._get_index(
+                "mesh",
+                lambda: self._read_mesh_points(self.mesh_S, self.mesh_Z))
+            # Always built from the possibly memory mapped points.
+            self.kdtree = self._get_index(
+                "kdtree", lambda: cKDTree(data=self.mesh), cache=False)
 
             if not self.read_on_demand:
-                self.mesh_mu = self.f["Mesh"]["mesh_mu"][:]
+                self.mesh_mu = self._get_index(
+                    "mesh_mu", lambda: self.f["Mesh"]["mesh_mu"][:])
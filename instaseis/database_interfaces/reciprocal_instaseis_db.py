@@ -17,7 +17,7 @@ from __future__ import (absolute_import, division, print_function,
 import collections
 import numpy as np
 
-from .base_netcdf_instaseis_db import BaseNetCDFInstaseisDB
+from .base_netcdf_instaseis_db import BaseNetCDFInstaseisDB, Coordinates
 from . import mesh
 from .. import rotations
 from ..source import Source, ForceSource
@@ -69,19 +69,25 @@ class ReciprocalInstaseisDB(BaseNetCDFInstaseisDB):
                 px_file, full_parse=True,
                 strain_buffer_size_in_mb=self.buffer_size_in_mb,
                 displ_buffer_size_in_mb=self.buffer_size_in_mb,
-                read_on_demand=self.read_on_demand)
+                read_on_demand=self.read_on_demand,
+                index_cache=self.index_cache,
+                page_cache_size_in_mb=self.page_cache_size_in_mb)
             pz_m = mesh.Mesh(
                 pz_file, full_parse=False,
                 strain_buffer_size_in_mb=self.buffer_size_in_mb,
                 displ_buffer_size_in_mb=self.buffer_size_in_mb,
-                read_on_demand=self.read_on_demand)
+                read_on_demand=self.read_on_demand,
+                index_cache=self.index_cache,
+                page_cache_size_in_mb=self.page_cache_size_in_mb)
             self.parsed_mesh = px_m
         elif x_exists:
             px_m = mesh.Mesh(
                 px_file, full_parse=True,
                 strain_buffer_size_in_mb=self.buffer_size_in_mb,
                 displ_buffer_size_in_mb=self.buffer_size_in_mb,
-                read_on_demand=self.read_on_demand)
+                read_on_demand=self.read_on_demand,
+                index_cache=self.index_cache,
+                page_cache_size_in_mb=self.page_cache_size_in_mb)
             pz_m = None
             self.parsed_mesh = px_m
         elif z_exists:
@@ -90,7 +96,9 @@ class ReciprocalInstaseisDB(BaseNetCDFInstaseisDB):
                 pz_file, full_parse=True,
                 strain_buffer_size_in_mb=self.buffer_size_in_mb,
                 displ_buffer_size_in_mb=self.buffer_size_in_mb,
-                read_on_demand=self.read_on_demand)
+                read_on_demand=self.read_on_demand,
+                index_cache=self.index_cache,
+                page_cache_size_in_mb=self.page_cache_size_in_mb)
             self.parsed_mesh = pz_m
         else:
             # Should not happen.
@@ -102,13 +110,38 @@ class ReciprocalInstaseisDB(BaseNetCDFInstaseisDB):
 
         self._is_reciprocal = True
 
+    def _get_seismograms_window(self, source, receiver, components,
+                                time_window):
+        """
+        Same as :meth:`BaseInstaseisDB._get_seismograms_window` but only
+        the required samples are read from time-major files.
+        """
+        rotmesh_s, rotmesh_phi, rotmesh_z = rotations.rotate_frame_rd(
+            source.x(planet_radius=self.info.planet_radius),
+            source.y(planet_radius=self.info.planet_radius),
+            source.z(planet_radius=self.info.planet_radius),
+            receiver.longitude, receiver.colatitude)
+
+        coordinates = Coordinates(s=rotmesh_s, phi=rotmesh_phi, z=rotmesh_z)
+
+        element_info = self._get_element_info(coordinates=coordinates)
+
+        return self._get_data(
+            source=source, receiver=receiver, components=components,
+            coordinates=coordinates, element_info=element_info,
+            time_window=time_window)
+
     def _get_data(self, source, receiver, components, coordinates,
-                  element_info):
+                  element_info, element_cache=None, time_window=None):
+        """
+        :param time_window: Optional ``(first, last + 1)`` tuple of the
+            indices of the samples to return.
+        """
         ei = element_info
         # Collect data arrays and mu in a dictionary.
         data = {}
 
-        mesh = self.parsed_mesh.f["Mesh"]
+        mesh = self.parsed_mesh.paged_mesh
 
         # Get mu.
         if not self.read_on_demand:
@@ -146,20 +179,30 @@ class ReciprocalInstaseisDB(BaseNetCDFInstaseisDB):
                     strain_z = self._get_strain_interp(
                         self.meshes.pz, ei.id_elem, ei.gll_point_ids, G, GT,
                         ei.col_points_xi, ei.col_points_eta, ei.corner_points,
-                        ei.eltype, ei.axis, ei.xi, ei.eta)
+                        ei.eltype, ei.axis, ei.xi, ei.eta,
+                        element_cache=element_cache, time_window=time_window)
                 elif (self.info.dump_type == 'fullfields' or
                       self.info.dump_type == 'strain_only'):
-                    strain_z = self._get_strain(self.meshes.pz, ei.id_elem)
+                    strain_z = self._get_strain(
+                        self.meshes.pz, ei.id_elem,
+                        element_cache=element_cache)
+                    if time_window is not None:
+                        strain_z = strain_z[time_window[0]:time_window[1]]
 
             if any(comp in components for comp in ['N', 'E', 'R', 'T']):
                 if self.info.dump_type == 'displ_only':
                     strain_x = self._get_strain_interp(
                         self.meshes.px, ei.id_elem, ei.gll_point_ids, G, GT,
                         ei.col_points_xi, ei.col_points_eta, ei.corner_points,
-                        ei.eltype, ei.axis, ei.xi, ei.eta)
+                        ei.eltype, ei.axis, ei.xi, ei.eta,
+                        element_cache=element_cache, time_window=time_window)
                 elif (self.info.dump_type == 'fullfields' or
                       self.info.dump_type == 'strain_only'):
-                    strain_x = self._get_strain(self.meshes.px, ei.id_elem)
+                    strain_x = self._get_strain(
+                        self.meshes.px, ei.id_elem,
+                        element_cache=element_cache)
+                    if time_window is not None:
+                        strain_x = strain_x[time_window[0]:time_window[1]]
 
             mij = rotations \
                 .rotate_symm_tensor_voigt_xyz_src_to_xyz_earth(
@@ -221,14 +264,22 @@ class ReciprocalInstaseisDB(BaseNetCDFInstaseisDB):
                                                  ei.gll_point_ids,
                                                  ei.col_points_xi,
                                                  ei.col_points_eta, ei.xi,
-                                                 ei.eta)
+                                                 ei.eta,
+                                                 element_cache=element_cache)
 
             if any(comp in components for comp in ['N', 'E', 'R', 'T']):
                 displ_x = self._get_displacement(self.meshes.px, ei.id_elem,
                                                  ei.gll_point_ids,
                                                  ei.col_points_xi,
                                                  ei.col_points_eta, ei.xi,
-                                                 ei.eta)
+                                                 ei.eta,
+                                                 element_cache=element_cache)
+
+            if time_window is not None:
+                if "Z" in components:
+                    displ_z = displ_z[time_window[0]:time_window[1]]
+                if any(comp in components for comp in ['N', 'E', 'R', 'T']):
+                    displ_x = displ_x[time_window[0]:time_window[1]]
 
             force = rotations.rotate_vector_xyz_src_to_xyz_earth(
                 source.force_tpr, np.deg2rad(source.longitude),
@@ -60,18 +60,20 @@ class ReciprocalMergedInstaseisDB(BaseNetCDFInstaseisDB):
             filename, full_parse=True,
             strain_buffer_size_in_mb=self.buffer_size_in_mb,
             displ_buffer_size_in_mb=self.buffer_size_in_mb,
-            read_on_demand=self.read_on_demand))
+            read_on_demand=self.read_on_demand,
+            index_cache=self.index_cache,
+            page_cache_size_in_mb=self.page_cache_size_in_mb))
         self.parsed_mesh = self.meshes.merged
 
         self._is_reciprocal = True
 
     def _get_data(self, source, receiver, components, coordinates,
-                  element_info):
+                  element_info, element_cache=None):
         ei = element_info
         # Collect data arrays and mu in a dictionary.
         data = {}
 
-        mesh = self.parsed_mesh.f["Mesh"]
+        mesh = self.parsed_mesh.paged_mesh
 
         # Get mu.
         if not self.read_on_demand:
@@ -107,7 +109,8 @@ class ReciprocalMergedInstaseisDB(BaseNetCDFInstaseisDB):
                 strain_x, strain_z = self._get_strain_interp(
                     ei.id_elem, ei.gll_point_ids, G, GT,
                     ei.col_points_xi, ei.col_points_eta, ei.corner_points,
-                    ei.eltype, ei.axis, ei.xi, ei.eta)
+                    ei.eltype, ei.axis, ei.xi, ei.eta,
+                    element_cache=element_cache)
             elif (self.info.dump_type == 'fullfields' or
                   self.info.dump_type == 'strain_only'):  # pragma: no cover
                 # Merged databases currently not implemented for
@@ -174,7 +177,8 @@ class ReciprocalMergedInstaseisDB(BaseNetCDFInstaseisDB):
 
             displ_x, displ_z = self._get_displacement(
                 ei.id_elem, ei.gll_point_ids, ei.col_points_xi,
-                ei.col_points_eta, ei.xi, ei.eta)
+                ei.col_points_eta, ei.xi, ei.eta,
+                element_cache=element_cache)
 
             force = rotations.rotate_vector_xyz_src_to_xyz_earth(
                 source.force_tpr, np.deg2rad(source.longitude),
@@ -239,49 +243,80 @@ class ReciprocalMergedInstaseisDB(BaseNetCDFInstaseisDB):
 
     def _get_strain_interp(  # NOQA
             self, id_elem, gll_point_ids, G, GT, col_points_xi, col_points_eta,
-            corner_points, eltype, axis, xi, eta):
+            corner_points, eltype, axis, xi, eta, element_cache=None):
         mesh = self.meshes.merged
-        if id_elem not in mesh.strain_buffer:
-            utemp = self._get_and_reorder_utemp(id_elem)
+        cache_key = (mesh.filename, "strain")
+        displ_key = (mesh.filename, "displacement")
+        # Successive calls for the same point, e.g. for several sources at
+        # the same location, also share the interpolated strain.
+        point_key = (mesh.filename, "strain_at", xi, eta)
+        if element_cache is not None and point_key in element_cache:
+            return element_cache[point_key]
+
+        strains = None
+        if element_cache is not None:
+            strains = element_cache.get(cache_key)
+        # get() returns None if another thread removed the element from the
+        # buffer in the meanwhile.
+        if strains is None and id_elem in mesh.strain_buffer:
+            strains = mesh.strain_buffer.get(id_elem)
+
+        strain_cache = self._get_strain_cache(mesh)
+        if strains is None and strain_cache is not None:
+            strains = self._get_cached_strains(strain_cache, id_elem)
+            if strains is not None:
+                mesh.strain_buffer.add(id_elem, strains)
+
+        if strains is not None:
+            strain_x, strain_z = strains
+        else:
+            utemp = None
+            if element_cache is not None:
+                utemp = element_cache.get(displ_key)
+            if utemp is None:
+                utemp = self._get_and_reorder_utemp(id_elem)
+                if element_cache is not None:
+                    element_cache[displ_key] = utemp
+
+            utemp_x, utemp_z = self._split_utemp(utemp)
 
             strain_fct_map = {
                 "monopole": sem_derivatives.strain_monopole_td,
                 "dipole": sem_derivatives.strain_dipole_td,
                 "quadpole": sem_derivatives.strain_quadpole_td}
 
+            # Nothing would be buffered so only calculate the strain at the
+            # point of interest and not on all GLL points.
+            if strain_cache is None and mesh.strain_buffer.max_size_in_mb <= 0:
+                all_strains = {}
+                for name, u, fct in (
+                        ("strain_x", utemp_x, strain_fct_map["dipole"]),
+                        ("strain_z", utemp_z, strain_fct_map["monopole"])):
+                    if u is None:
+                        all_strains[name] = None
+                        continue
+                    final_strain = sem_derivatives.strain_at_point_td(
+                        fct, u, G, GT, col_points_xi, col_points_eta,
+                        mesh.npol, corner_points, eltype, axis, xi, eta)
+                    if not name == "strain_z":
+                        final_strain[:, 3] *= -1.0
+                        final_strain[:, 5] *= -1.0
+                    all_strains[name] = final_strain
+                if element_cache is not None:
+                    element_cache[point_key] = (all_strains["strain_x"],
+                                                all_strains["strain_z"])
+                return all_strains["strain_x"], all_strains["strain_z"]
+
             # We want the cache to work - thus we always have to
             # calculate both! Also I/O is the slow part here.
-
-            # Horizontal component is available if we have 3 or 5 components.
-            if utemp.shape[-1] >= 3:
-                utemp_x = utemp[:, :, :, :3]
-                utemp_x = np.require(utemp_x, requirements=["F"],
-                                     dtype=np.float64)
+            if utemp_x is not None:
                 strain_x = strain_fct_map["dipole"](
                     utemp_x, G, GT, col_points_xi, col_points_eta,
                     mesh.npol, mesh.ndumps, corner_points, eltype, axis)
             else:
                 strain_x = None
 
-            # Vertical component is available if we have 2 or 5 components.
-            if utemp.shape[-1] in (2, 5):
-                # Vertical expects disp_s at index 0 and disp_z at index 2.
-                # Expand if only vertical.
-                _s = list(utemp.shape)
-                if _s[-1] == 2:
-                    _s[-1] = 3
-                    utemp_new = np.zeros(_s, dtype=utemp.dtype)
-                    utemp_new[:, :, :, 0] = utemp[:, :, :, 0]
-                    utemp_new[:, :, :, 2] = utemp[:, :, :, 1]
-                    utemp_z = utemp_new
-                # Reform all others.
-                else:
-                    utemp_z = utemp[:, :, :, -3:]
-                    utemp_z[:, :, :, 0] = utemp_z[:, :, :, 1]
-                    utemp_z[:, :, :, 1][:] = 0
-                    utemp_z = np.require(utemp_z, requirements=["F"],
-                                         dtype=np.float64)
-
+            if utemp_z is not None:
                 strain_z = strain_fct_map["monopole"](
                     utemp_z, G, GT, col_points_xi, col_points_eta,
                     mesh.npol, mesh.ndumps, corner_points, eltype, axis)
@@ -289,19 +324,21 @@ class ReciprocalMergedInstaseisDB(BaseNetCDFInstaseisDB):
                 strain_z = None
 
             mesh.strain_buffer.add(id_elem, (strain_x, strain_z))
-        else:
-            strain_x, strain_z = mesh.strain_buffer.get(id_elem)
+            if strain_cache is not None:
+                for name, strain in (("x", strain_x), ("z", strain_z)):
+                    if strain is not None:
+                        strain_cache.add("%i_%s" % (id_elem, name), strain)
+
+        if element_cache is not None:
+            element_cache[cache_key] = (strain_x, strain_z)
 
         all_strains = {}
         for name, strain in (("strain_x", strain_x), ("strain_z", strain_z)):
             if strain is None:
                 all_strains[name] = None
                 continue
-            final_strain = np.empty((strain.shape[0], 6), order="F")
-
-            for i in range(6):
-                final_strain[:, i] = spectral_basis.lagrange_interpol_2D_td(
-                    col_points_xi, col_points_eta, strain[:, :, :, i], xi, eta)
+            final_strain = spectral_basis.lagrange_interpol_2D_td_multi(
+                col_points_xi, col_points_eta, strain, xi, eta)
 
             if not name == "strain_z":
                 final_strain[:, 3] *= -1.0
@@ -309,36 +346,95 @@ class ReciprocalMergedInstaseisDB(BaseNetCDFInstaseisDB):
 
             all_strains[name] = final_strain
 
+        if element_cache is not None:
+            element_cache[point_key] = (all_strains["strain_x"],
+                                        all_strains["strain_z"])
         return all_strains["strain_x"], all_strains["strain_z"]
 
+    def _get_cached_strains(self, strain_cache, id_elem):
+        """
+        Returns the horizontal and vertical strain of an element from the
+        on-disk cache or None if not all of the available ones are cached.
+        """
+        # Same logic as in _split_utemp().
+        nvars = self.meshes.merged.f["MergedSnapshots"].shape[1]
+        strains = []
+        for name, available in (("x", nvars >= 3), ("z", nvars in (2, 5))):
+            if not available:
+                strains.append(None)
+                continue
+            strain = strain_cache.get("%i_%s" % (id_elem, name))
+            if strain is None:
+                return None
+            strains.append(strain)
+        return tuple(strains)
+
+    @staticmethod
+    def _split_utemp(utemp):
+        """
+        Split the merged displacement into the horizontal and the vertical
+        part in the layout the strain routines expect. Either one is None if
+        not available in the database. Does not modify utemp.
+        """
+        # Horizontal component is available if we have 3 or 5 components.
+        if utemp.shape[-1] >= 3:
+            utemp_x = utemp[:, :, :, :3]
+            utemp_x = np.require(utemp_x, requirements=["F"],
+                                 dtype=np.float64)
+        else:
+            utemp_x = None
+
+        # Vertical component is available if we have 2 or 5 components.
+        if utemp.shape[-1] in (2, 5):
+            # Vertical expects disp_s at index 0 and disp_z at index 2.
+            # Expand if only vertical.
+            _s = list(utemp.shape)
+            if _s[-1] == 2:
+                _s[-1] = 3
+                utemp_new = np.zeros(_s, dtype=utemp.dtype)
+                utemp_new[:, :, :, 0] = utemp[:, :, :, 0]
+                utemp_new[:, :, :, 2] = utemp[:, :, :, 1]
+                utemp_z = utemp_new
+            # Reform all others.
+            else:
+                utemp_z = utemp[:, :, :, -3:].copy()
+                utemp_z[:, :, :, 0] = utemp_z[:, :, :, 1]
+                utemp_z[:, :, :, 1][:] = 0
+            utemp_z = np.require(utemp_z, requirements=["F"],
+                                 dtype=np.float64)
+        else:
+            utemp_z = None
+
+        return utemp_x, utemp_z
+
     def _get_displacement(self, id_elem, gll_point_ids,
-                          col_points_xi, col_points_eta, xi, eta):
+                          col_points_xi, col_points_eta, xi, eta,
+                          element_cache=None):
         mesh = self.meshes.merged
-        if id_elem not in mesh.displ_buffer:
+        cache_key = (mesh.filename, "displacement")
+        utemp = None
+        if element_cache is not None:
+            utemp = element_cache.get(cache_key)
+        if utemp is None and id_elem in mesh.displ_buffer:
+            utemp = mesh.displ_buffer.get(id_elem)
+
+        if utemp is None:
             utemp = self._get_and_reorder_utemp(id_elem)
             mesh.displ_buffer.add(id_elem, utemp)
-        else:
-            utemp = mesh.displ_buffer.get(id_elem)
 
-        final_displacement_x = np.empty((utemp.shape[0], 3), order="F")
-        utemp_x = utemp[:, :, :, :3]
-        utemp_x = np.require(utemp_x, requirements=["F"],
-                             dtype=np.float64)
-        for i in range(3):
-            final_displacement_x[:, i] = \
-                spectral_basis.lagrange_interpol_2D_td(
-                    col_points_xi, col_points_eta,
-                    utemp_x[:, :, :, i], xi, eta)
-
-        utemp_z = utemp[:, :, :, -3:]
-        utemp_z[:, :, :, 0] = utemp_z[:, :, :, 1]
-        utemp_z[:, :, :, 1][:] = 0
-        utemp_z = np.require(utemp_z, requirements=["F"], dtype=np.float64)
-        final_displacement_z = np.empty((utemp.shape[0], 3), order="F")
-        for i in range(3):
-            final_displacement_z[:, i] = \
-                spectral_basis.lagrange_interpol_2D_td(
-                    col_points_xi, col_points_eta,
-                    utemp_z[:, :, :, i], xi, eta)
+        if element_cache is not None:
+            element_cache[cache_key] = utemp
+
+        # The interpolation is linear so all components are interpolated in
+        # one go and rearranged afterwards.
+        displ = spectral_basis.lagrange_interpol_2D_td_multi(
+            col_points_xi, col_points_eta, utemp, xi, eta)
+
+        final_displacement_x = np.require(displ[:, :3], requirements=["F"])
+
+        # Vertical expects disp_s at index 0 and disp_z at index 2.
+        final_displacement_z = np.zeros((utemp.shape[0], 3), order="F")
+        final_displacement_z[:, 0] = displ[:, -2]
+        final_displacement_z[:, 2] = displ[:, -1]
 
         return final_displacement_x, final_displacement_z
@@ -12,13 +12,18 @@ Instaseis database class for remote access over HTTP.
 from __future__ import (absolute_import, division, print_function,
                         unicode_literals)
 
+import concurrent.futures
 import io
+import json
 import numpy as np
 import obspy
 import requests
+import requests.adapters
+import struct
 import warnings
 
 from .base_instaseis_db import BaseInstaseisDB, DEFAULT_MU
+from .seismogram_cache import SeismogramCache, get_info_fingerprint
 from .. import InstaseisError, InstaseisWarning, Source, ForceSource, \
     __version__
 
@@ -27,6 +32,42 @@ with standard_library.hooks():
     from urllib.parse import urlencode, urlparse
 
 
+# Maximum number of seismograms requested with a single bulk request.
+BULK_REQUEST_SIZE = 1000
+
+
+def _parse_bulk_response(content):
+    """
+    Parses the binary response of the /seismograms_bulk route.
+
+    :param content: The body of the response.
+    :returns: A list with a dictionary of mu and the float32 arrays for
+        each requested seismogram.
+    """
+    header_length = struct.unpack("<I", content[:4])[0]
+    header = json.loads(content[4:4 + header_length].decode())
+    npts = header["npts"]
+
+    offset = 4 + header_length
+    expected_length = offset + sum(8 + 4 * npts * len(_i)
+                                   for _i in header["components"])
+    if len(content) != expected_length:
+        raise InstaseisError("Bulk response is truncated. Expected %i "
+                             "bytes but got %i." % (expected_length,
+                                                    len(content)))
+
+    seismograms = []
+    for components in header["components"]:
+        d = {"mu": struct.unpack("<d", content[offset:offset + 8])[0]}
+        offset += 8
+        for comp in components:
+            d[comp] = np.frombuffer(content, dtype="<f4", count=npts,
+                                    offset=offset)
+            offset += 4 * npts
+        seismograms.append(d)
+    return seismograms
+
+
 class RemoteInstaseisDB(BaseInstaseisDB):
     """
     Remote Instaseis database interface.
@@ -35,11 +76,37 @@ class RemoteInstaseisDB(BaseInstaseisDB):
         """
         :param url: URL to the remote Instaseis server.
         :type db_path: str
+        :param pool_size: The number of persistent connections kept open to
+            the server. Also the default number of requests running at the
+            same time in :meth:`get_seismograms_concurrently`.
+        :type pool_size: int, optional
+        :param cache_dir: Directory to persistently cache the downloaded
+            seismograms in. Repeated requests are then answered without
+            contacting the server. The cache is invalidated if the database
+            on the server changes and can be shared by all remote databases.
+        :type cache_dir: str, optional
+        :param cache_size_in_mb: Maximum size of the seismogram cache.
+        :type cache_size_in_mb: float, optional
+
+        ``pool_size``, ``cache_dir``, and ``cache_size_in_mb`` can only be
+        passed as keyword arguments.
         """
+        pool_size = kwargs.pop("pool_size", 10)
+        cache_dir = kwargs.pop("cache_dir", None)
+        cache_size_in_mb = kwargs.pop("cache_size_in_mb", 1000)
+
         self.url = url
         self._scheme, self._netloc, self._path = urlparse(url)[:3]
         self._path = self._path.strip("/")
 
+        # Reuse connections for all requests to the server.
+        self.pool_size = pool_size
+        self._session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1,
+                                                pool_maxsize=pool_size)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+
         # Parse the root message of the server.
         try:
             root = self._download_url(self._get_url(path=""))
@@ -58,7 +125,16 @@ class RemoteInstaseisDB(BaseInstaseisDB):
                    "client (%s) differ and thus things might not work as "
                    "expected." % (root["version"], __version__))
             warnings.warn(msg, InstaseisWarning)
-        self._get_info()
+
+        # Download once to make sure it works.
+        self.info
+
+        if cache_dir:
+            self.seismogram_cache = SeismogramCache(
+                directory=cache_dir, fingerprint=get_info_fingerprint(
+                    self.info), max_size_in_mb=cache_size_in_mb)
+        else:
+            self.seismogram_cache = None
 
     def _get_seismograms(self, source, receiver, components=("Z", "N", "E")):
         """
@@ -73,6 +149,167 @@ class RemoteInstaseisDB(BaseInstaseisDB):
         :param components: a tuple containing any combination of the
             strings ``"Z"``, ``"N"``, ``"E"``, ``"R"``, and ``"T"``
         """
+        params = self._get_params(source=source, receiver=receiver,
+                                  components=components)
+
+        if self.seismogram_cache is not None:
+            key = self.seismogram_cache.get_key(params)
+            data = self.seismogram_cache.get(key)
+            if data is not None:
+                return data
+
+        url = self._get_url(path="seismograms_raw", **params)
+
+        r = self._session.get(url)
+        if "Instaseis-Mu" not in r.headers:  # pragma: no cover
+            warnings.warn("Mu is not passed via the HTTP headers. Maybe some "
+                          "proxy removed it? Mu is now always the default mu.",
+                          InstaseisWarning)
+            mu = DEFAULT_MU
+        else:
+            mu = float(r.headers["Instaseis-Mu"])
+
+        with io.BytesIO(r.content) as fh:
+            fh.seek(0, 0)
+            st = obspy.read(fh)
+
+        # Convert back to dictionary of numpy arrays...this is a bit
+        # redundant but plays nice with the rest of Instaseis and still
+        # enables a REST API that serves MiniSEED files.
+        data = {
+            "mu": mu
+        }
+
+        for tr in st:
+            data[tr.stats.channel[-1].upper()] = tr.data
+
+        if self.seismogram_cache is not None:
+            self.seismogram_cache.add(key, data)
+
+        return data
+
+    def get_seismograms_concurrently(self, sources, receivers,
+                                     max_in_flight=None, **kwargs):
+        """
+        Extract the seismograms of many source-receiver pairs with several
+        requests to the server running at the same time.
+
+        Each seismogram is the same as the one returned by
+        :meth:`get_seismograms` but the latency of the requests is hidden by
+        keeping up to ``max_in_flight`` of them running.
+
+        :param sources: The sources.
+        :type sources: list of :class:`instaseis.source.Source` or
+            :class:`instaseis.source.ForceSource`
+        :param receivers: The receivers. Must have the same length as
+            ``sources``.
+        :type receivers: list of :class:`instaseis.source.Receiver`
+        :param max_in_flight: The maximum number of requests running at the
+            same time. Defaults to the size of the connection pool.
+        :type max_in_flight: int, optional
+        :param kwargs: Passed on to :meth:`get_seismograms`.
+
+        :returns: The results of :meth:`get_seismograms` in the order of the
+            passed sources and receivers.
+        :rtype: list
+        """
+        if len(sources) != len(receivers):
+            raise ValueError("sources and receivers must have the same "
+                             "length.")
+        if max_in_flight is None:
+            max_in_flight = self.pool_size
+        max_in_flight = max(int(max_in_flight), 1)
+
+        results = [None] * len(sources)
+        pairs = iter(enumerate(zip(sources, receivers)))
+        pending = {}
+
+        executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max_in_flight)
+        try:
+            while True:
+                while len(pending) < max_in_flight:
+                    pair = next(pairs, None)
+                    if pair is None:
+                        break
+                    _i, (source, receiver) = pair
+                    future = executor.submit(
+                        self.get_seismograms, source=source,
+                        receiver=receiver, **kwargs)
+                    pending[future] = _i
+
+                if not pending:
+                    break
+
+                finished, _ = concurrent.futures.wait(
+                    pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in finished:
+                    results[pending.pop(future)] = future.result()
+        finally:
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=True)
+
+        return results
+
+    def _get_seismograms_many(self, source, receivers, components):
+        """
+        Extract the raw seismograms for many receivers with as few requests
+        to the /seismograms_bulk route of the server as possible.
+        """
+        data = {"mu": np.empty(len(receivers), dtype=np.float64)}
+        for comp in components:
+            data[comp] = np.empty((len(receivers), self.info.npts),
+                                  dtype=np.float64)
+
+        # Only download the ones not in the cache.
+        params = [self._get_params(source=source, receiver=receiver,
+                                   components=components)
+                  for receiver in receivers]
+        missing = []
+        for _i, p in enumerate(params):
+            seismograms = None
+            if self.seismogram_cache is not None:
+                seismograms = self.seismogram_cache.get(
+                    self.seismogram_cache.get_key(p))
+            if seismograms is None:
+                missing.append(_i)
+                continue
+            data["mu"][_i] = seismograms["mu"]
+            for comp in components:
+                data[comp][_i] = seismograms[comp]
+
+        url = self._get_url(path="seismograms_bulk")
+        for start in range(0, len(missing), BULK_REQUEST_SIZE):
+            chunk = missing[start:start + BULK_REQUEST_SIZE]
+            body = json.dumps([params[_i] for _i in chunk]).encode()
+            r = self._session.post(url, data=body)
+            # Servers not yet offering the route.
+            if r.status_code == 404:  # pragma: no cover
+                return BaseInstaseisDB._get_seismograms_many(
+                    self, source=source, receivers=receivers,
+                    components=components)
+            if r.status_code != 200:
+                raise InstaseisError(
+                    "Status code %i when downloading '%s': %s" % (
+                        r.status_code, url, r.reason))
+            for _i, seismograms in zip(chunk,
+                                       _parse_bulk_response(r.content)):
+                data["mu"][_i] = seismograms["mu"]
+                for comp in components:
+                    data[comp][_i] = seismograms[comp]
+                if self.seismogram_cache is not None:
+                    self.seismogram_cache.add(
+                        self.seismogram_cache.get_key(params[_i]),
+                        seismograms)
+
+        return data
+
+    def _get_params(self, source, receiver, components):
+        """
+        Returns the parameters of the /seismograms_raw and
+        /seismograms_bulk routes for a single seismogram.
+        """
         # Collect parameters.
         params = {"components": "".join(components).upper()}
 
@@ -105,32 +342,7 @@ class RemoteInstaseisDB(BaseInstaseisDB):
         else:
             raise NotImplementedError
 
-        url = self._get_url(path="seismograms_raw", **params)
-
-        r = requests.get(url)
-        if "Instaseis-Mu" not in r.headers:  # pragma: no cover
-            warnings.warn("Mu is not passed via the HTTP headers. Maybe some "
-                          "proxy removed it? Mu is now always the default mu.",
-                          InstaseisWarning)
-            mu = DEFAULT_MU
-        else:
-            mu = float(r.headers["Instaseis-Mu"])
-
-        with io.BytesIO(r.content) as fh:
-            fh.seek(0, 0)
-            st = obspy.read(fh)
-
-        # Convert back to dictionary of numpy arrays...this is a bit
-        # redundant but plays nice with the rest of Instaseis and still
-        # enables a REST API that serves MiniSEED files.
-        data = {
-            "mu": mu
-        }
-
-        for tr in st:
-            data[tr.stats.channel[-1].upper()] = tr.data
-
-        return data
+        return params
 
     def _get_url(self, path, **kwargs):
         # Not tested in the test-suite as it would be awkward to do with the
@@ -149,7 +361,7 @@ class RemoteInstaseisDB(BaseInstaseisDB):
         """
         Helper function downloading data from a URL.
         """
-        r = requests.get(url)
+        r = self._session.get(url)
         # Not tested in test suite as it would be awkward to do. Manually
         # tested and should be good.
         if r.status_code != 200:  # pragma: no cover
@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Persistent on-disk cache of the seismograms downloaded by the remote
+databases.
+
+Remote clients tend to request the same seismograms again in later sessions.
+This cache stores them in a local directory keyed by the request and the
+database on the server so repeated requests need no network access at all.
+
+:copyright:
+    The Instaseis Development Team, 2026
+:license:
+    GNU Lesser General Public License, Version 3 [non-commercial/academic use]
+    (http://www.gnu.org/copyleft/lgpl.html)
+"""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from .directory_cache import DirectoryCache
+
+
+# Increase if the layout of the stored files changes.
+SEISMOGRAM_CACHE_VERSION = 1
+
+
+def get_info_fingerprint(info):
+    """
+    Returns a string identifying a database from its information. Changes
+    if the database on a server is replaced.
+
+    :param info: The information dictionary of the database.
+    """
+    h = hashlib.sha1()
+    h.update(json.dumps([str(info[_i]) for _i in (
+        "velocity_model", "axisem_version", "datetime", "dt", "npts",
+        "is_reciprocal", "components")]).encode())
+    return h.hexdigest()[:16]
+
+
+class SeismogramCache(DirectoryCache):
+    """
+    Directory based cache of raw seismograms with a size limit.
+
+    Each seismogram is a dictionary of arrays stored in its own ``.npz``
+    file. Files are content addressed by the parameters of the request and
+    the fingerprint of the database. Once the cache exceeds its size limit,
+    the least recently used files are removed.
+
+    :param directory: The cache directory. Can be shared by all databases.
+    :type directory: str
+    :param fingerprint: Identifies the database. Part of all keys.
+    :type fingerprint: str
+    :param max_size_in_mb: The maximum size of all cached seismograms.
+    :type max_size_in_mb: float
+    """
+    extension = ".npz"
+
+    def __init__(self, directory, fingerprint, max_size_in_mb=1000):
+        self.fingerprint = fingerprint
+        super(SeismogramCache, self).__init__(
+            directory=os.path.join(
+                directory, "seismograms_v%i" % SEISMOGRAM_CACHE_VERSION),
+            max_size_in_mb=max_size_in_mb)
+
+    def get_key(self, params):
+        """
+        Returns the key of a request.
+
+        :param params: Dictionary of the parameters of the request.
+        """
+        h = hashlib.sha1()
+        h.update(self.fingerprint.encode())
+        h.update(json.dumps(params, sort_keys=True, default=str).encode())
+        return h.hexdigest()
+
+    def _load(self, filename):
+        try:
+            with np.load(filename) as f:
+                value = {_i: f[_i] for _i in f.files}
+        except Exception:
+            # get() treats missing, truncated, or otherwise broken files as
+            # not cached.
+            raise ValueError("Invalid file '%s'." % filename)
+        value["mu"] = float(value["mu"])
+        return value
+
+    def _save(self, fh, value):
+        np.savez(fh, **value)
@@ -0,0 +1,319 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Element buffer living in a shared memory segment so that all processes
+forked after its creation, e.g. the workers of a pre-forked server, share
+one pool of buffered elements.
+
+:copyright:
+    The Instaseis Development Team, 2026
+:license:
+    GNU Lesser General Public License, Version 3 [non-commercial/academic use]
+    (http://www.gnu.org/copyleft/lgpl.html)
+"""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import mmap
+import multiprocessing
+import os
+
+import numpy as np
+
+
+# Layout of the serialized values. Each value is either a single array or a
+# tuple of up to _MAX_PARTS arrays (or None).
+_MAX_PARTS = 4
+_MAX_NDIM = 5
+# present, fortran order, ndim, nbytes, dtype, shape
+_PART_HEADER = 5 + _MAX_NDIM
+# is_tuple, number of parts, part headers
+_VALUE_HEADER = 2 + _MAX_PARTS * _PART_HEADER
+
+# Global header of the segment. All numbers are int64.
+_HEADER = 8
+_SLOT_SIZE, _NSLOTS, _USED, _CLOCK, _HITS, _FAILS, _TOTAL_SIZE = range(7)
+
+# Per slot: key, last access, size of the value in bytes.
+_SLOT_META = 3
+
+
+def _serialize(value):
+    is_tuple = isinstance(value, (tuple, list))
+    parts = list(value) if is_tuple else [value]
+    if len(parts) > _MAX_PARTS:
+        raise ValueError("Can only buffer up to %i arrays per item." %
+                         _MAX_PARTS)
+
+    header = np.zeros(_VALUE_HEADER, dtype=np.int64)
+    header[0] = is_tuple
+    header[1] = len(parts)
+    chunks = []
+    for _i, part in enumerate(parts):
+        if part is None:
+            continue
+        part = np.asarray(part)
+        if part.ndim > _MAX_NDIM:
+            raise ValueError("Can only buffer arrays with up to %i "
+                             "dimensions." % _MAX_NDIM)
+        fortran = part.flags.f_contiguous and not part.flags.c_contiguous
+        data = part.tobytes(order="F" if fortran else "C")
+        h = header[2 + _i * _PART_HEADER:2 + (_i + 1) * _PART_HEADER]
+        h[0] = 1
+        h[1] = fortran
+        h[2] = part.ndim
+        h[3] = len(data)
+        h[4] = np.frombuffer(part.dtype.str.encode().ljust(8),
+                             dtype=np.int64)[0]
+        h[5:5 + part.ndim] = part.shape
+        chunks.append(data)
+    return header.tobytes() + b"".join(chunks)
+
+
+def _deserialize(raw):
+    header = np.frombuffer(raw, dtype=np.int64, count=_VALUE_HEADER)
+    offset = _VALUE_HEADER * 8
+    parts = []
+    for _i in range(header[1]):
+        h = header[2 + _i * _PART_HEADER:2 + (_i + 1) * _PART_HEADER]
+        if not h[0]:
+            parts.append(None)
+            continue
+        dtype = np.dtype(h[4:5].tobytes().rstrip(b" ").decode())
+        part = np.frombuffer(raw, dtype=dtype,
+                             count=int(h[3]) // dtype.itemsize,
+                             offset=offset)
+        parts.append(part.reshape(tuple(h[5:5 + h[2]]),
+                                  order="F" if h[1] else "C"))
+        offset += int(h[3])
+    if header[0]:
+        return tuple(parts)
+    return parts[0]
+
+
+class SharedMemoryBuffer(object):
+    """
+    A memory-limited buffer in a shared memory segment with the same
+    interface as :class:`~instaseis.database_interfaces.mesh.Buffer`.
+
+    The segment is split into fixed-size slots. The slot size is either
+    given or determined by the first item added to the buffer - all items
+    of one element buffer have the same size. Items larger than a slot are
+    not buffered. A hash table in the segment maps keys to slots and once
+    all slots are in use, the least recently accessed item of all processes
+    is replaced.
+
+    The segment and the lock protecting it are inherited by all processes
+    forked after creating the buffer. Pages of the segment are only
+    allocated once they are used.
+
+    Keys have to be non-negative integers, e.g. element ids. Values are
+    numpy arrays or tuples of arrays and ``None``. :meth:`get` always
+    returns copies.
+    """
+    def __init__(self, max_size_in_mb=100, slot_size_in_bytes=None):
+        self._max_size_in_bytes = int(max_size_in_mb * 1024 ** 2)
+        self._lock = multiprocessing.Lock()
+        # Anonymous memory maps are shared with forked child processes.
+        self._mmap = mmap.mmap(-1, max(self._max_size_in_bytes,
+                                       _HEADER * 8))
+        self._header = np.frombuffer(self._mmap, dtype=np.int64,
+                                     count=_HEADER)
+        self._layout = None
+        if slot_size_in_bytes:
+            with self._lock:
+                self._set_slot_size(slot_size_in_bytes)
+
+    def _set_slot_size(self, slot_size):
+        # Must be called with the lock held.
+        slot_size = int(-(-(slot_size + _VALUE_HEADER * 8) // 64) * 64)
+        nslots = (self._max_size_in_bytes - _HEADER * 8) // \
+            (slot_size + (_SLOT_META + 2) * 8)
+        self._header[_SLOT_SIZE] = slot_size
+        self._header[_NSLOTS] = max(nslots, 0)
+        self._get_layout()[0][:] = -1
+
+    def _get_layout(self):
+        """
+        Returns views of the hash table, the slot metadata and the slot
+        data. Only available once the slot size is known.
+        """
+        if self._layout is None and self._header[_SLOT_SIZE]:
+            slot_size = int(self._header[_SLOT_SIZE])
+            nslots = int(self._header[_NSLOTS])
+            offset = _HEADER * 8
+            table = np.frombuffer(self._mmap, dtype=np.int64,
+                                  count=2 * nslots, offset=offset)
+            offset += table.nbytes
+            meta = np.frombuffer(self._mmap, dtype=np.int64,
+                                 count=_SLOT_META * nslots,
+                                 offset=offset).reshape((nslots, _SLOT_META))
+            offset += meta.nbytes
+            data = np.frombuffer(self._mmap, dtype=np.uint8,
+                                 count=slot_size * nslots,
+                                 offset=offset).reshape((nslots, slot_size))
+            self._layout = (table, meta, data)
+        return self._layout
+
+    def _has_slots(self):
+        layout = self._get_layout()
+        return layout is not None and len(layout[2]) > 0
+
+    def _find(self, key):
+        """
+        Returns the position of the key in the hash table and its slot. The
+        slot is -1 if the key is not in the buffer in which case the
+        position is the free position the key would be inserted at.
+        """
+        table, meta, _ = self._layout
+        pos = key % len(table)
+        while True:
+            slot = table[pos]
+            if slot == -1 or meta[slot, 0] == key:
+                return pos, int(slot)
+            pos = (pos + 1) % len(table)
+
+    def _remove_from_table(self, pos):
+        # Linear probing without tombstones: Move all following entries of
+        # the same cluster that would no longer be found back.
+        table, meta, _ = self._layout
+        size = len(table)
+        table[pos] = -1
+        j = pos
+        while True:
+            j = (j + 1) % size
+            slot = table[j]
+            if slot == -1:
+                return
+            home = meta[slot, 0] % size
+            if (pos < j and pos < home <= j) or \
+                    (pos > j and (home > pos or home <= j)):
+                continue
+            table[pos] = slot
+            table[j] = -1
+            pos = j
+
+    def __contains__(self, key):
+        key = int(key)
+        with self._lock:
+            contains = self._has_slots() and self._find(key)[1] != -1
+            if contains:
+                self._header[_HITS] += 1
+            else:
+                self._header[_FAILS] += 1
+        return contains
+
+    def get(self, key, default=None):
+        """
+        Return a copy of an item from the buffer and mark it as recently
+        used. Returns ``default`` if the item is not in the buffer.
+        """
+        key = int(key)
+        with self._lock:
+            if not self._has_slots():
+                return default
+            _, slot = self._find(key)
+            if slot == -1:
+                return default
+            _, meta, data = self._layout
+            self._header[_CLOCK] += 1
+            meta[slot, 1] = self._header[_CLOCK]
+            raw = data[slot, :meta[slot, 2]].copy()
+        return _deserialize(raw)
+
+    def add(self, key, value):
+        """
+        Add an item to the buffer, replacing the least recently used item
+        if necessary.
+        """
+        key = int(key)
+        if key < 0:
+            raise ValueError("Keys must be non-negative integers.")
+        raw = np.frombuffer(_serialize(value), dtype=np.uint8)
+        with self._lock:
+            if not self._header[_SLOT_SIZE]:
+                self._set_slot_size(len(raw) - _VALUE_HEADER * 8)
+            if not self._has_slots():
+                return
+            table, meta, data = self._layout
+            if len(raw) > data.shape[1]:
+                return
+
+            pos, slot = self._find(key)
+            if slot == -1:
+                if self._header[_USED] < len(data):
+                    slot = int(self._header[_USED])
+                    self._header[_USED] += 1
+                else:
+                    # Replace the least recently used item.
+                    slot = int(np.argmin(meta[:, 1]))
+                    self._remove_from_table(self._find(meta[slot, 0])[0])
+                    self._header[_TOTAL_SIZE] -= meta[slot, 2]
+                    pos, _ = self._find(key)
+                table[pos] = slot
+                meta[slot, 0] = key
+            else:
+                self._header[_TOTAL_SIZE] -= meta[slot, 2]
+
+            self._header[_CLOCK] += 1
+            meta[slot, 1] = self._header[_CLOCK]
+            meta[slot, 2] = len(raw)
+            data[slot, :len(raw)] = raw
+            self._header[_TOTAL_SIZE] += len(raw)
+
+    def get_size_mb(self):
+        return float(self._header[_TOTAL_SIZE]) / 1024 ** 2
+
+    @property
+    def max_size_in_mb(self):
+        return float(self._max_size_in_bytes) / 1024 ** 2
+
+    @property
+    def efficiency(self):
+        """
+        Return the fraction of calls to the __contains__() routine of all
+        processes that returned True.
+        """
+        with self._lock:
+            hits = int(self._header[_HITS])
+            fails = int(self._header[_FAILS])
+        if (hits + fails) == 0:
+            return 0.0
+        else:
+            return float(hits) / float(hits + fails)
+
+
+# Shared buffers per file, filled by share_buffers().
+_SHARED_BUFFERS = {}
+
+
+def share_buffers(filename, max_size_in_mb):
+    """
+    Create shared strain and displacement buffers for a database file. All
+    meshes opened for this file afterwards - also in forked processes - use
+    them instead of their own buffers as long as their buffer size is
+    larger than zero.
+
+    :param filename: The netCDF file.
+    :type filename: str
+    :param max_size_in_mb: Size of each of the two buffers.
+    :type max_size_in_mb: float
+    """
+    _SHARED_BUFFERS[os.path.abspath(filename)] = {
+        "strain": SharedMemoryBuffer(max_size_in_mb),
+        "displ": SharedMemoryBuffer(max_size_in_mb)}
+
+
+def get_shared_buffer(filename, kind):
+    """
+    Returns the shared buffer of the given kind (``"strain"`` or
+    ``"displ"``) for a file or ``None`` if there is none.
+    """
+    return _SHARED_BUFFERS.get(os.path.abspath(filename), {}).get(kind)
+
+
+def clear_shared_buffers():
+    """
+    Forget all buffers registered with :func:`share_buffers`.
+    """
+    _SHARED_BUFFERS.clear()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Persistent on-disk cache of the strain on all GLL points of an element.
+
+For databases only storing the displacement, the strain has to be computed
+from the displacement of all GLL points of an element for every buffer miss.
+This cache stores these element strains in a local directory so they survive
+restarts and can be shared by all processes on a machine.
+
+:copyright:
+    The Instaseis Development Team, 2026
+:license:
+    GNU Lesser General Public License, Version 3 [non-commercial/academic use]
+    (http://www.gnu.org/copyleft/lgpl.html)
+"""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import os
+
+import numpy as np
+
+from ..helpers import get_file_fingerprint
+from .directory_cache import DirectoryCache
+
+
+# Increase if the layout of the stored arrays changes.
+STRAIN_CACHE_VERSION = 1
+
+
+class StrainCache(DirectoryCache):
+    """
+    Directory based cache of element strains with a size limit.
+
+    Each array is stored in its own ``.npy`` file which is memory mapped when
+    read. Once the cache exceeds its size limit, the least recently used
+    files are removed. Usage is tracked with the modification time of the
+    files so it is shared between all processes using the same directory.
+
+    :param directory: The cache directory. Each database file gets its own
+        subdirectory.
+    :type directory: str
+    :param filename: The database file the strains belong to.
+    :type filename: str
+    :param max_size_in_mb: The maximum size of all files in the
+        subdirectory of this database file.
+    :type max_size_in_mb: float
+    """
+    extension = ".npy"
+
+    def __init__(self, directory, filename, max_size_in_mb=1000):
+        super(StrainCache, self).__init__(
+            directory=os.path.join(
+                directory, "v%i_%s_%s" % (STRAIN_CACHE_VERSION,
+                                          os.path.basename(filename),
+                                          get_file_fingerprint(filename))),
+            max_size_in_mb=max_size_in_mb)
+
+    def _load(self, filename):
+        return np.load(filename, mmap_mode="r")
+
+    def _save(self, fh, value):
+        np.save(fh, value)
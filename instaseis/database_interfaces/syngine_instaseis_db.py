@@ -23,6 +23,8 @@ from instaseis import (InstaseisError, InstaseisWarning, Source, ForceSource,
                        __version__)
 from instaseis.database_interfaces.base_instaseis_db import (
     BaseInstaseisDB, DEFAULT_MU, STF_MAP, INV_KIND_MAP)
+from instaseis.database_interfaces.seismogram_cache import (
+    SeismogramCache, get_info_fingerprint)
 
 from instaseis.helpers import geocentric_to_elliptic_latitude
 
@@ -51,7 +53,20 @@ class SyngineInstaseisDB(BaseInstaseisDB):
         :type base_url: str
         :param debug: Debug messages on/off.
         :type debug: bool
+        :param cache_dir: Directory to persistently cache the downloaded
+            seismograms in. Repeated requests are then answered without
+            contacting the service. The cache is invalidated if the model
+            on the service changes.
+        :type cache_dir: str, optional
+        :param cache_size_in_mb: Maximum size of the seismogram cache.
+        :type cache_size_in_mb: float, optional
+
+        ``cache_dir`` and ``cache_size_in_mb`` can only be passed as keyword
+        arguments.
         """
+        cache_dir = kwargs.pop("cache_dir", None)
+        cache_size_in_mb = kwargs.pop("cache_size_in_mb", 1000)
+
         self.model = model
         self.debug = debug
         self.base_url = base_url.rstrip("/")
@@ -63,6 +78,13 @@ class SyngineInstaseisDB(BaseInstaseisDB):
         self.syngine_service_version = self._download_url(self._get_url(
             path="version"))
 
+        if cache_dir:
+            self.seismogram_cache = SeismogramCache(
+                directory=cache_dir, fingerprint=get_info_fingerprint(
+                    self.info), max_size_in_mb=cache_size_in_mb)
+        else:
+            self.seismogram_cache = None
+
     def _get_seismograms(self, source, receiver, components=("Z", "N", "E")):
         """
         Extract seismograms.
@@ -126,6 +148,12 @@ class SyngineInstaseisDB(BaseInstaseisDB):
         else:
             raise NotImplementedError
 
+        if self.seismogram_cache is not None:
+            key = self.seismogram_cache.get_key(params)
+            data = self.seismogram_cache.get(key)
+            if data is not None:
+                return data
+
         url = self._get_url(path="query", **params)
 
         if self.debug:  # pragma: no cover
@@ -167,6 +195,9 @@ class SyngineInstaseisDB(BaseInstaseisDB):
         for tr in st:
             data[tr.stats.channel[-1].upper()] = tr.data
 
+        if self.seismogram_cache is not None:
+            self.seismogram_cache.add(key, data)
+
         return data
 
     def _get_url(self, path, **kwargs):
@@ -33,3 +33,51 @@ def inside_element(s, z, nodes, element_type, tolerance):
                        C.byref(in_element), C.byref(xi), C.byref(eta))
 
     return in_element.value, xi.value, eta.value
+
+
+def inside_element_many(s, z, candidates, nodes, element_types, tolerance):
+    """
+    Find the elements containing many points in one go.
+
+    :param s: The s coordinates of the points, shape ``(npoints,)``.
+    :param z: The z coordinates of the points, shape ``(npoints,)``.
+    :param candidates: The ids of the candidate elements of each point,
+        shape ``(npoints, ncandidates)``. They are tested in order.
+    :param nodes: The corner points of the candidate elements, shape
+        ``(npoints, ncandidates, 4, 2)``.
+    :param element_types: The types of the candidate elements, shape
+        ``(npoints, ncandidates)``.
+    :param tolerance: Tolerance in reference coordinates.
+
+    Returns the ids of the elements containing the points (``-1`` for
+    points not in any of their candidates) and the reference coordinates
+    ``xi`` and ``eta`` of the points in them.
+    """
+    s = np.require(s, dtype=np.float64, requirements=["C_CONTIGUOUS"])
+    z = np.require(z, dtype=np.float64, requirements=["C_CONTIGUOUS"])
+    candidates = np.asarray(candidates)
+    npoints, ncandidates = candidates.shape
+    # Fortran expects nodes(4, 2, ncandidates, npoints).
+    nodes = np.require(np.asarray(nodes, dtype=np.float64).swapaxes(2, 3),
+                       requirements=["C_CONTIGUOUS"])
+    element_types = np.require(element_types, dtype=np.int32,
+                               requirements=["C_CONTIGUOUS"])
+
+    found = np.empty(npoints, dtype=np.int32)
+    xi = np.empty(npoints, dtype=np.float64)
+    eta = np.empty(npoints, dtype=np.float64)
+    lib.inside_element_many(
+        C.c_int(npoints), C.c_int(ncandidates),
+        s.ctypes.data_as(C.POINTER(C.c_double)),
+        z.ctypes.data_as(C.POINTER(C.c_double)),
+        nodes.ctypes.data_as(C.POINTER(C.c_double)),
+        element_types.ctypes.data_as(C.POINTER(C.c_int)),
+        C.c_double(float(tolerance)),
+        found.ctypes.data_as(C.POINTER(C.c_int)),
+        xi.ctypes.data_as(C.POINTER(C.c_double)),
+        eta.ctypes.data_as(C.POINTER(C.c_double)))
+
+    id_elem = np.where(
+        found >= 0,
+        candidates[np.arange(npoints), np.maximum(found, 0)], -1)
+    return id_elem, xi, eta
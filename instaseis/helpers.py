@@ -14,6 +14,7 @@ from __future__ import (absolute_import, division, print_function,
 
 import ctypes as C
 import glob
+import hashlib
 import inspect
 import math
 import os
@@ -37,6 +38,9 @@ def load_lib():
             raise ValueError("Could not find suitable instaseis shared "
                              "library.")
         filename = possible_files[0]
+        # Functions loaded via CDLL (as opposed to PyDLL) release the GIL
+        # for the duration of the call. None of the Fortran routines have
+        # any global state so they can run in parallel in multiple threads.
         lib = C.CDLL(filename)
         cache.append(lib)
         return lib
@@ -142,6 +146,23 @@ def sizeof_fmt(num):
     return "%3.1f %s" % (num, "TB")
 
 
+def get_file_fingerprint(filename, hash_size=1024 ** 2):
+    """
+    Returns a string identifying the given file in its current state. It is
+    derived from the size, the modification time, and a hash of the first
+    ``hash_size`` bytes of the file so it changes whenever the file is
+    replaced or modified. It does not depend on the path so the same file
+    opened via different paths has the same fingerprint.
+    """
+    stat = os.stat(filename)
+    h = hashlib.sha1()
+    h.update(("%i|%i" % (stat.st_size,
+                         int(stat.st_mtime * 1E6))).encode())
+    with open(filename, "rb") as fh:
+        h.update(fh.read(hash_size))
+    return h.hexdigest()[:16]
+
+
 def io_chunker(arr):
     """
     Assumes arr is an array of indices. Will return indices thus that
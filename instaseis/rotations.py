@@ -17,6 +17,9 @@ import numpy as np
 
 
 def rotate_frame_rd(x, y, z, phi, theta):
+    """
+    Works with scalars as well as with arrays of coordinates.
+    """
     phi = np.deg2rad(phi)
     theta = np.deg2rad(theta)
     # first rotation (longitude)
@@ -32,10 +35,10 @@ def rotate_frame_rd(x, y, z, phi, theta):
     srd = np.sqrt(xp ** 2 + yp ** 2)
     zrd = zp
     phi_cp = np.arctan2(yp, xp)
-    if phi_cp < 0.0:
-        phird = 2.0 * np.pi + phi_cp
-    else:
-        phird = phi_cp
+    phird = np.where(phi_cp < 0.0, 2.0 * np.pi + phi_cp, phi_cp)
+    # Keep returning scalars for scalar input.
+    if phird.ndim == 0:
+        phird = phird[()]
     return srd, phird, zrd
 
 
@@ -18,6 +18,7 @@ import ctypes as C
 import numpy as np
 
 from .helpers import load_lib
+from .spectral_basis import lagrange_weights_2D
 
 
 lib = load_lib()
@@ -67,3 +68,36 @@ def strain_quadpole_td(u, G, GT, xi, eta, npol, nsamp, nodes,  # NOQA
                        element_type, axial):  # pragma: no cover
     return _strain_td(u, G, GT, xi, eta, npol, nsamp, nodes, element_type,
                       axial, lib.strain_quadpole_td)
+
+
+def strain_at_point_td(strain_fct, u, G, GT, xi, eta, npol, nodes,  # NOQA
+                       element_type, axial, x1, x2):
+    """
+    Strain at the reference coordinates (x1, x2) of an element.
+
+    Gives the same result as calculating the strain on all GLL points with
+    ``strain_fct`` and interpolating it to (x1, x2) afterwards. As the strain
+    is linear in the displacement, ``strain_fct`` is only applied to unit
+    displacements on each GLL point which are then collapsed at (x1, x2).
+    The cost for each time sample is thus a single small matrix product
+    instead of the strain on all (npol + 1) ** 2 GLL points.
+
+    :param strain_fct: One of :func:`strain_monopole_td`,
+        :func:`strain_dipole_td`, or :func:`strain_quadpole_td`.
+    :param u: Displacement on all GLL points, shape
+        ``(nsamp, npol + 1, npol + 1, 3)``.
+    :param x1: Reference coordinate in xi direction.
+    :param x2: Reference coordinate in eta direction.
+
+    Returns the strain in Voigt notation with shape ``(nsamp, 6)``.
+    """
+    nbasis = (npol + 1) ** 2 * 3
+    basis = np.eye(nbasis).reshape((nbasis, npol + 1, npol + 1, 3))
+
+    strain = strain_fct(basis, G, GT, xi, eta, npol, nbasis, nodes,
+                        element_type, axial)
+
+    l_i, l_j = lagrange_weights_2D(xi, eta, x1, x2)
+    weights = np.einsum("bijc,i,j->bc", strain, l_i, l_j)
+    return np.tensordot(u, weights.reshape((npol + 1, npol + 1, 3, 6)),
+                        axes=3)
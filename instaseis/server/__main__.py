@@ -31,6 +31,42 @@ if __name__ == "__main__":
                              'a single finite source for the /finite_source '
                              'route.')
 
+    parser.add_argument('--max_workers', type=int, default=8,
+                        help='The maximum number of threads extracting '
+                             'seismograms.')
+    parser.add_argument('--max_queue_size', type=int, default=64,
+                        help='The maximum number of extraction tasks waiting '
+                             'for a free thread. Requests beyond that are '
+                             'answered with HTTP 503.')
+    parser.add_argument('--num_processes', type=int, default=1,
+                        help='The number of server processes sharing the '
+                             'port and the mesh indices. 0 starts one '
+                             'process per CPU.')
+    parser.add_argument('--shared_buffer', action='store_true',
+                        help='Share the buffers between all server '
+                             'processes. The buffer size then applies to '
+                             'all processes together.')
+    parser.add_argument('--index_cache', action='store_true',
+                        help='Store the mesh indices next to the database '
+                             'files and memory map them on subsequent '
+                             'starts.')
+    parser.add_argument('--finite_source_workers', type=int, default=1,
+                        help='The number of worker processes computing a '
+                             'single request to the /finite_source route. '
+                             'All requests share one pool of this size.')
+    parser.add_argument('--response_cache_size_in_mb', type=int, default=0,
+                        help='Memory used to cache the responses of the '
+                             '/seismograms and /greens_function routes. 0 '
+                             'disables the cache.')
+    parser.add_argument('--response_cache_directory', type=str,
+                        default=None,
+                        help='Directory to additionally cache the responses '
+                             'on disc.')
+    parser.add_argument('--response_cache_disk_size_in_mb', type=int,
+                        default=1000,
+                        help='The maximum size of the cached responses on '
+                             'disc.')
+
     parser.add_argument('db_path', type=str,
                         help='Database path')
     parser.add_argument(
@@ -47,4 +83,14 @@ if __name__ == "__main__":
     launch_io_loop(db_path=db_path, port=args.port,
                    buffer_size_in_mb=args.buffer_size_in_mb,
                    max_size_of_finite_sources=args.max_size_of_finite_sources,
+                   max_workers=args.max_workers,
+                   max_queue_size=args.max_queue_size,
+                   num_processes=args.num_processes,
+                   shared_buffer=args.shared_buffer,
+                   index_cache=args.index_cache,
+                   finite_source_workers=args.finite_source_workers,
+                   response_cache_size_in_mb=args.response_cache_size_in_mb,
+                   response_cache_directory=args.response_cache_directory,
+                   response_cache_disk_size_in_mb=(
+                       args.response_cache_disk_size_in_mb),
                    quiet=args.quiet, log_level=args.log_level)
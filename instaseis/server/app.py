@@ -9,14 +9,22 @@ Server offering a REST API for Instaseis.
     GNU Lesser General Public License, Version 3 [non-commercial/academic use]
     (http://www.gnu.org/copyleft/lgpl.html)
 """
+import concurrent.futures
 import logging
 
 import tornado.gen
+import tornado.httpserver
 import tornado.ioloop
+import tornado.netutil
+import tornado.process
 import tornado.web
 
 from ..database_interfaces import find_and_open_files
+from ..database_interfaces.mesh import share_indices
+from ..database_interfaces.shared_buffer import share_buffers
 
+from .response_cache import ResponseCache, get_db_fingerprint
+from .util import BoundedThreadPool
 from .routes.coordinates import CoordinatesHandler
 from .routes.events import EventHandler
 from .routes.travel_time import TravelTimeHandler
@@ -24,6 +32,7 @@ from .routes.index import IndexHandler
 from .routes.info import InfoHandler
 from .routes.seismograms import SeismogramsHandler
 from .routes.seismograms_raw import RawSeismogramsHandler
+from .routes.seismograms_bulk import BulkSeismogramsHandler
 from .routes.greens import GreensFunctionHandler
 from .routes.finite_source import FiniteSourceSeismogramsHandler
 
@@ -34,16 +43,22 @@ tornado.web.GZipContentEncoding.CONTENT_TYPES.add(
     "application/vnd.geo+json")
 
 
-def get_application():
+def get_application(max_workers=8, max_queue_size=64):
     """
     Return the tornado application.
 
     This is a seperate function to be able to get the same application
     objects for the tests.
+
+    :param max_workers: The maximum number of worker threads extracting
+        seismograms.
+    :param max_queue_size: The maximum number of tasks waiting for a free
+        worker. Further requests are answered with HTTP 503.
     """
-    return tornado.web.Application([
+    application = tornado.web.Application([
         (r"/seismograms", SeismogramsHandler),
         (r"/seismograms_raw", RawSeismogramsHandler),
+        (r"/seismograms_bulk", BulkSeismogramsHandler),
         (r"/finite_source", FiniteSourceSeismogramsHandler),
         (r"/greens_function", GreensFunctionHandler),
         (r"/info", InfoHandler),
@@ -52,13 +67,35 @@ def get_application():
         (r"/event", EventHandler),
         (r"/ttimes", TravelTimeHandler)
     ], compress_response=True)
+    application.executor = BoundedThreadPool(max_workers=max_workers,
+                                             max_queue_size=max_queue_size)
+    # Worker budget and process pool of a single finite source request.
+    # Finite sources are computed in the extraction thread if the budget is
+    # one.
+    application.finite_source_workers = 1
+    application.finite_source_executor = None
+    # Number of receivers of a single request extracted concurrently.
+    application.receiver_look_ahead = max_workers
+    # Maximum number of seismograms in a single request to the
+    # /seismograms_bulk route.
+    application.max_size_of_bulk_requests = 10000
+    # Cache of complete responses. Disabled if None.
+    application.response_cache = None
+    return application
 
 
 def launch_io_loop(db_path, port, buffer_size_in_mb, quiet, log_level,
                    max_size_of_finite_sources=1000,
                    station_coordinates_callback=None,
                    event_info_callback=None,
-                   travel_time_callback=None):  # pragma: no cover
+                   travel_time_callback=None, max_workers=8,
+                   max_queue_size=64, num_processes=1,
+                   shared_buffer=False,
+                   index_cache=False,
+                   finite_source_workers=1,
+                   response_cache_size_in_mb=0,
+                   response_cache_directory=None,
+                   response_cache_disk_size_in_mb=1000):  # pragma: no cover
     """
     Launch the instaseis server.
 
@@ -79,10 +116,55 @@ def launch_io_loop(db_path, port, buffer_size_in_mb, quiet, log_level,
         information. If not given, certain requests will not be available.
     :param travel_time_callback: A callback function returning the travel
         time for certain seismic phase and a given source/receiver geometry.
+    :param max_workers: The maximum number of worker threads extracting
+        seismograms.
+    :param max_queue_size: The maximum number of tasks waiting for a free
+        worker. Further requests are answered with HTTP 503 and a
+        Retry-After header.
+    :param num_processes: The number of server processes all listening on
+        the same port. ``0`` or ``None`` will start one process per CPU.
+    :param shared_buffer: If running more than one process, have all of
+        them share the element buffers in shared memory. The buffer size
+        is then the size of the buffers shared by all processes.
+    :param index_cache: Keep the mesh indices in a sidecar directory next
+        to the database files for faster startup.
+    :param finite_source_workers: The number of worker processes computing
+        a single finite source request. All requests of a server process
+        share one pool of this size.
+    :param response_cache_size_in_mb: Memory used by each process to cache
+        the responses of the /seismograms and /greens_function routes.
+        ``0`` disables the cache.
+    :param response_cache_directory: Directory to additionally cache the
+        responses on disc. Shared by all processes.
+    :param response_cache_disk_size_in_mb: The maximum size of the cached
+        responses on disc.
     """
-    application = get_application()
+    # The sockets have to be bound before forking.
+    sockets = tornado.netutil.bind_sockets(port)
+
+    if num_processes != 1:
+        # Parse the mesh and build the kd-tree only once. The forked
+        # processes share the memory of these read-only indices but reopen
+        # the database files as HDF5 handles must not be shared across
+        # processes.
+        db = find_and_open_files(path=db_path, buffer_size_in_mb=0,
+                                 index_cache=index_cache)
+        for mesh in db.meshes:
+            if mesh is None:
+                continue
+            share_indices(mesh)
+            # One buffer pool for all processes instead of one per process.
+            if shared_buffer:
+                share_buffers(mesh.filename, buffer_size_in_mb)
+            mesh.f.close()
+        del db
+        tornado.process.fork_processes(num_processes)
+
+    application = get_application(max_workers=max_workers,
+                                  max_queue_size=max_queue_size)
     application.db = find_and_open_files(
-        path=db_path, buffer_size_in_mb=buffer_size_in_mb)
+        path=db_path, buffer_size_in_mb=buffer_size_in_mb,
+        index_cache=index_cache)
     application.station_coordinates_callback = station_coordinates_callback
     application.event_info_callback = event_info_callback
 
@@ -96,6 +178,19 @@ def launch_io_loop(db_path, port, buffer_size_in_mb, quiet, log_level,
     # might take very long then so be aware!
     application.max_size_of_finite_sources = int(max_size_of_finite_sources)
 
+    if finite_source_workers > 1:
+        application.finite_source_workers = finite_source_workers
+        application.finite_source_executor = \
+            concurrent.futures.ProcessPoolExecutor(
+                max_workers=finite_source_workers)
+
+    if response_cache_size_in_mb:
+        application.response_cache = ResponseCache(
+            fingerprint=get_db_fingerprint(application.db),
+            max_size_in_mb=response_cache_size_in_mb,
+            directory=response_cache_directory,
+            max_disk_size_in_mb=response_cache_disk_size_in_mb)
+
     if not quiet:
         # Get all tornado loggers.
         access_log = logging.getLogger("tornado.access")
@@ -119,6 +214,9 @@ def launch_io_loop(db_path, port, buffer_size_in_mb, quiet, log_level,
         # Log the database information.
         app_log.info("Successfully opened DB")
         app_log.info(str(application.db))
+        app_log.info("Using up to %i worker threads with a queue of %i "
+                     "tasks." % (max_workers, max_queue_size))
 
-    application.listen(port)
-    tornado.ioloop.IOLoop.instance().start()
+    server = tornado.httpserver.HTTPServer(application)
+    server.add_sockets(sockets)
+    tornado.ioloop.IOLoop.current().start()
@@ -14,17 +14,167 @@ from future.utils import with_metaclass
 from abc import ABCMeta, abstractmethod
 import obspy
 import tornado
+import tornado.concurrent
+import tornado.gen
 from ..database_interfaces.base_instaseis_db import _get_seismogram_times
 from .. import Receiver, FiniteSource
 
 from .. import __version__
+from .response_cache import CACHED_HEADERS
+from .util import run_async, QueueFullError
+
+
+@run_async
+def _get_from_disk_cache(disk_cache, key, callback):
+    """
+    Look up a response in the disc tier of the response cache.
+
+    :param disk_cache: The disc tier of the response cache.
+    :param key: The key of the response.
+    :param callback: callback function of the coroutine.
+    """
+    callback(disk_cache.get(key))
 
 
 class InstaseisRequestHandler(tornado.web.RequestHandler):
+    # Key and body chunks of a response that is recorded for the response
+    # cache.
+    _cache_key = None
+    _cached_chunks = None
+    _cached_size = 0
+
     def set_default_headers(self):
         self.set_header("Access-Control-Allow-Origin", "*")
         self.set_header("Server", "InstaseisServer/%s" % __version__)
 
+    def write_error(self, status_code, **kwargs):
+        # Advise the client when to retry if the server is too busy.
+        if "exc_info" in kwargs:
+            retry_after = getattr(kwargs["exc_info"][1], "retry_after", None)
+            if retry_after is not None:
+                self.set_header("Retry-After", "%i" % retry_after)
+        super(InstaseisRequestHandler, self).write_error(status_code,
+                                                         **kwargs)
+
+    @tornado.gen.coroutine
+    def serve_from_cache(self, args):
+        """
+        Answer a GET request from the response cache of the application if
+        possible. Otherwise the response of the request is recorded and
+        added to the cache once it is finished.
+
+        Sets the ``Etag`` and ``Cache-Control`` headers and answers requests
+        with a matching ``If-None-Match`` header with 304. Waits for an
+        identical request that is currently being computed instead of
+        computing it again.
+
+        :param args: The parsed and validated arguments of the request.
+        :returns: ``True`` if the request has been answered.
+        """
+        cache = getattr(self.application, "response_cache", None)
+        if cache is None or self.request.method != "GET":
+            raise tornado.gen.Return(False)
+
+        key = cache.get_key(self.request.path, args)
+        self.set_header("Etag", '"%s"' % key)
+        self.set_header("Cache-Control",
+                        "public, max-age=%i" % cache.max_age_in_s)
+
+        # Responses only depend on the key so the client already has it.
+        if self.check_etag_header():
+            self.set_status(304)
+            self.finish()
+            raise tornado.gen.Return(True)
+
+        response = cache.get(key)
+        if response is None:
+            waiters = cache.start(key)
+            if waiters is not None:
+                future = tornado.concurrent.Future()
+                waiters.append(future.set_result)
+                response = yield future
+                # Compute it without the cache if the other request failed.
+                if response is None:
+                    raise tornado.gen.Return(False)
+            else:
+                # This request is responsible for the response so record
+                # it unless it is found on disc.
+                self._cache_key = key
+                self._cached_chunks = []
+                if cache.disk_cache is None:
+                    raise tornado.gen.Return(False)
+                # Reading a file is cheap compared to computing the
+                # response so it does not count against the queue limit.
+                response = yield tornado.gen.Task(
+                    _get_from_disk_cache, executor=self.application.executor,
+                    bypass_queue_limit=True, disk_cache=cache.disk_cache,
+                    key=key)
+                # The connection has been closed in the meanwhile.
+                if self._cache_key is None:
+                    raise tornado.gen.Return(True)
+                if response is None:
+                    raise tornado.gen.Return(False)
+                # Nothing to record but the waiters get the response and it
+                # is kept in memory.
+                self._cache_key = None
+                self._cached_chunks = None
+                cache.done(key, response)
+
+        for name, value in response["headers"]:
+            self.set_header(name, value)
+        self.write(response["body"])
+        self.finish()
+        raise tornado.gen.Return(True)
+
+    def _finish_caching(self, success):
+        if self._cache_key is None:
+            return
+        value = None
+        if success and self._cached_chunks is not None:
+            value = {
+                "body": b"".join(self._cached_chunks),
+                "headers": [(_i, self._headers[_i]) for _i in CACHED_HEADERS
+                            if _i in self._headers]}
+        key = self._cache_key
+        self._cache_key = None
+        self._cached_chunks = None
+        cache = self.application.response_cache
+        cache.done(key, value)
+        if value is None or cache.disk_cache is None:
+            return
+        # Written in the background so the IOLoop never blocks on the disc.
+        try:
+            self.application.executor.submit(cache.disk_cache.add, key,
+                                             value)
+        except QueueFullError:
+            # Not worth delaying any requests for.
+            pass
+
+    def write(self, chunk):
+        if self._cached_chunks is not None:
+            # Only record binary responses fitting into the cache.
+            if isinstance(chunk, bytes):
+                self._cached_size += len(chunk)
+            if not isinstance(chunk, bytes) or self._cached_size > \
+                    self.application.response_cache.max_entry_size_in_bytes:
+                self._cached_chunks = None
+            else:
+                self._cached_chunks.append(chunk)
+        super(InstaseisRequestHandler, self).write(chunk)
+
+    def send_error(self, status_code=500, **kwargs):
+        # Errors might happen after parts of the response have been sent.
+        self._cached_chunks = None
+        super(InstaseisRequestHandler, self).send_error(status_code,
+                                                        **kwargs)
+
+    def on_connection_close(self):
+        self._finish_caching(success=False)
+        super(InstaseisRequestHandler, self).on_connection_close()
+
+    def on_finish(self):
+        self._finish_caching(success=self.get_status() == 200)
+
 
 class InstaseisTimeSeriesHandler(with_metaclass(ABCMeta,
                                                 InstaseisRequestHandler)):
@@ -42,7 +192,7 @@ class InstaseisTimeSeriesHandler(with_metaclass(ABCMeta,
         requesting seismograms will stop.
         """
         InstaseisRequestHandler.on_connection_close(self)
-        self.__connection_closed = True
+        self.connection_closed = True
 
     def parse_arguments(self):
         # Make sure that no additional arguments are passed.
@@ -0,0 +1,216 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Cache of complete responses of the server.
+
+Dashboards and retrying clients tend to send the same requests over and
+over again. Responses are keyed by the parsed arguments of a request and
+the database they have been computed from so identical requests can be
+answered without extracting anything.
+
+:copyright:
+    The Instaseis Development Team, 2026
+:license:
+    GNU Lesser General Public License, Version 3 [non-commercial/academic use]
+    (http://www.gnu.org/copyleft/lgpl.html)
+"""
+from collections import OrderedDict
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from ..database_interfaces.directory_cache import DirectoryCache
+from ..helpers import get_file_fingerprint
+
+
+# Increase if the layout of the stored files changes.
+RESPONSE_CACHE_VERSION = 3
+
+# Headers of the original response that are replayed from the cache.
+CACHED_HEADERS = ("Content-Type", "Content-Disposition", "Instaseis-Mu")
+
+
+def get_db_fingerprint(db):
+    """
+    Returns a string identifying the files of the given database in their
+    current state.
+
+    :param db: An open netCDF based instaseis database.
+    """
+    return "_".join(get_file_fingerprint(_i.filename)
+                    for _i in db.meshes if _i is not None)
+
+
+class ResponseDiskCache(DirectoryCache):
+    """
+    Directory based cache of complete responses with a size limit.
+
+    Each response is stored with its headers in its own ``.npz`` file. Once
+    the cache exceeds its size limit, the least recently used files are
+    removed.
+
+    :param directory: The cache directory. Each version of the file layout
+        gets its own subdirectory.
+    :type directory: str
+    :param max_size_in_mb: The maximum size of all cached responses.
+    :type max_size_in_mb: float
+    """
+    extension = ".npz"
+
+    def __init__(self, directory, max_size_in_mb=1000):
+        super(ResponseDiskCache, self).__init__(
+            directory=os.path.join(directory,
+                                   "v%i" % RESPONSE_CACHE_VERSION),
+            max_size_in_mb=max_size_in_mb)
+
+    def _load(self, filename):
+        try:
+            with np.load(filename) as f:
+                body = f["body"].tobytes()
+                headers = json.loads(str(f["headers"]))
+        except Exception:
+            # get() treats missing, truncated, or otherwise broken files as
+            # not cached.
+            raise ValueError("Invalid file '%s'." % filename)
+        # Never replay anything else.
+        headers = [(str(name), str(value)) for name, value in headers
+                   if name in CACHED_HEADERS]
+        return {"body": body, "headers": headers}
+
+    def _save(self, fh, value):
+        np.savez(fh, body=np.frombuffer(value["body"], dtype=np.uint8),
+                 headers=np.array(json.dumps(value["headers"])))
+
+
+class ResponseCache(object):
+    """
+    Memory limited LRU cache of complete responses with an optional second
+    tier on disc.
+
+    Entries are dictionaries with the ``body`` as a bytestring and a list
+    of ``headers``. The cache is not thread-safe and must only be used from
+    the thread running the IOLoop. The disc tier in :attr:`disk_cache` is
+    not touched by any of its methods: it is thread-safe but blocks and
+    thus has to be used from the threads of the executor.
+
+    Concurrent identical requests are coalesced: the first one registers
+    itself with :meth:`start` and all others wait for its result.
+
+    :param fingerprint: Identifies the database. Part of all keys.
+    :type fingerprint: str
+    :param max_size_in_mb: Memory limit of the cache. Larger responses are
+        not cached.
+    :type max_size_in_mb: float
+    :param directory: Directory of the disc tier. Disabled if not given.
+    :type directory: str
+    :param max_disk_size_in_mb: The maximum size of all files in the
+        directory of the disc tier.
+    :type max_disk_size_in_mb: float
+    :param max_age_in_s: Time in seconds clients and proxies may reuse a
+        response without asking again. Sent as the ``Cache-Control`` header.
+    :type max_age_in_s: int
+    """
+    def __init__(self, fingerprint, max_size_in_mb=100, directory=None,
+                 max_disk_size_in_mb=1000, max_age_in_s=3600):
+        self.fingerprint = fingerprint
+        self._max_size_in_bytes = max_size_in_mb * 1024 ** 2
+        self.max_age_in_s = max_age_in_s
+        self._total_size = 0
+        self._cache = OrderedDict()
+        # Waiters of all requests currently being computed.
+        self._in_flight = {}
+        self.hits = 0
+        self.misses = 0
+
+        self.disk_cache = None
+        if directory is not None:
+            self.disk_cache = ResponseDiskCache(
+                directory=directory, max_size_in_mb=max_disk_size_in_mb)
+
+    @property
+    def max_entry_size_in_bytes(self):
+        return self._max_size_in_bytes
+
+    def get_key(self, route, args):
+        """
+        Returns the key of a request.
+
+        :param route: The path of the request.
+        :param args: The parsed and validated arguments of the request.
+        """
+        h = hashlib.sha1()
+        h.update(("%s|%s" % (self.fingerprint, route)).encode())
+        for name in sorted(args.keys()):
+            h.update(("|%s=%r" % (name, args[name])).encode())
+        return h.hexdigest()
+
+    def get(self, key):
+        """
+        Returns the response for the key from memory or ``None``.
+        """
+        if key not in self._cache:
+            self.misses += 1
+            return None
+        value = self._cache.pop(key)
+        self._cache[key] = value
+        self.hits += 1
+        return value
+
+    def add(self, key, value):
+        """
+        Add a response to memory, removing the least recently used entries
+        if the limit is exceeded.
+        """
+        if len(value["body"]) > self._max_size_in_bytes:
+            return
+        if key in self._cache:
+            self._total_size -= len(self._cache.pop(key)["body"])
+        self._cache[key] = value
+        self._total_size += len(value["body"])
+        while self._total_size > self._max_size_in_bytes:
+            _, v = self._cache.popitem(last=False)
+            self._total_size -= len(v["body"])
+
+    def start(self, key):
+        """
+        Register a request that is about to be computed.
+
+        :returns: ``None`` if no identical request is currently computed and
+            the caller is responsible for the response. Otherwise a list the
+            caller can append a callback to which is called with the
+            response or ``None`` if the computation failed.
+        """
+        if key in self._in_flight:
+            return self._in_flight[key]
+        self._in_flight[key] = []
+        return None
+
+    def done(self, key, value=None):
+        """
+        Mark a request registered with :meth:`start` as done. The response
+        is added to the cache and passed to all waiting requests.
+
+        :param value: The response or ``None`` if it failed.
+        """
+        if value is not None:
+            self.add(key, value)
+        for callback in self._in_flight.pop(key, []):
+            callback(value)
+
+    def __len__(self):
+        return len(self._cache)
+
+    def get_size_mb(self):
+        return float(self._total_size) / 1024 ** 2
+
+    @property
+    def efficiency(self):
+        """
+        Return the fraction of lookups that were answered from memory.
+        """
+        if (self.hits + self.misses) == 0:
+            return 0.0
+        else:
+            return float(self.hits) / float(self.hits + self.misses)
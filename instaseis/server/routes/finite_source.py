@@ -30,7 +30,7 @@ from ...database_interfaces.base_instaseis_db import (
 def _get_finite_source(db, finite_source, receiver, components, units, dt,
                        kernelwidth, scale, starttime, endtime,
                        time_of_first_sample, format, label,
-                       callback):
+                       callback, workers=1, process_pool=None):
     """
     Extract a seismogram from the passed db and write it either to a MiniSEED
     or a SACZIP file.
@@ -49,13 +49,20 @@ def _get_finite_source(db, finite_source, receiver, components, units, dt,
     :param format: The output format. Either "miniseed" or "saczip".
     :param label: Prefix for the filename within the SAC zip file.
     :param callback: callback function of the coroutine.
+    :param workers: The number of worker processes to use for this finite
+        source. Computed in the current thread if one.
+    :param process_pool: The process pool of the workers.
     """
+    if workers > 1:
+        parallel = {"workers": workers, "executor": process_pool}
+    else:
+        parallel = {}
     try:
         st = db.get_seismograms_finite_source(
             sources=finite_source, receiver=receiver, components=components,
             # Effectively results in nothing happening so we can perform the
             # differentiation here.
-            kind=INV_KIND_MAP[STF_MAP[db.info.stf]])
+            kind=INV_KIND_MAP[STF_MAP[db.info.stf]], **parallel)
     except Exception:
         msg = ("Could not extract finite source seismograms. Make sure, "
                "the parameters are valid, and the depth settings are correct.")
@@ -338,6 +345,7 @@ class FiniteSourceSeismogramsHandler(InstaseisTimeSeriesHandler):
         # Coroutine + thread as potentially pretty expensive.
         response = yield tornado.gen.Task(
             _parse_and_resample_finite_source,
+            executor=self.application.executor,
             request=self.request,
             max_size=self.application.max_size_of_finite_sources,
             db_info=self.application.db.info)
@@ -394,15 +402,20 @@ class FiniteSourceSeismogramsHandler(InstaseisTimeSeriesHandler):
             self.validate_geometry(source=finite_source, receiver=receiver)
 
             # Yield from the task. This enables a context switch and thus
-            # async behaviour.
+            # async behaviour. Once data has been streamed an error can no
+            # longer be sent so the task is queued even if the pool is busy.
             response, _ = yield tornado.gen.Task(
                 _get_finite_source,
+                executor=self.application.executor,
+                bypass_queue_limit=count > 0,
                 db=self.application.db, finite_source=finite_source,
                 receiver=receiver, components=list(args.components),
                 units=args.units, dt=args.dt, kernelwidth=args.kernelwidth,
                 scale=args.scale, starttime=starttime, endtime=endtime,
                 time_of_first_sample=time_of_first_sample, format=args.format,
-                label=args.label)
+                label=args.label,
+                workers=self.application.finite_source_workers,
+                process_pool=self.application.finite_source_executor)
 
             # Check connection once again.
             if self.connection_closed:  # pragma: no cover
@@ -142,6 +142,11 @@ class GreensFunctionHandler(InstaseisTimeSeriesHandler):
         # checks.
         args = self.parse_arguments()
 
+        # Identical requests are answered from the response cache.
+        served = yield self.serve_from_cache(args)
+        if served:
+            return
+
         min_starttime, max_endtime = self.parse_time_settings(args)
 
         self.set_headers(args)
@@ -175,6 +180,7 @@ class GreensFunctionHandler(InstaseisTimeSeriesHandler):
         # async behaviour.
         response, mu = yield tornado.gen.Task(
             _get_greens,
+            executor=self.application.executor,
             db=self.application.db,
             epicentral_distance_degree=args.sourcedistanceindegrees,
             source_depth_in_m=args.sourcedepthinmeters, units=args.units,
@@ -15,6 +15,9 @@ class IndexHandler(InstaseisRequestHandler):
     def get(self):
         response = {
             "type": "Instaseis Remote Server",
-            "version": __version__
+            "version": __version__,
+            # Current load as well as queue depth and wait time statistics
+            # of the worker pool.
+            "executor": self.application.executor.get_statistics()
         }
         self.write(response)
@@ -7,11 +7,13 @@
     GNU Lesser General Public License, Version 3 [non-commercial/academic use]
     (http://www.gnu.org/copyleft/lgpl.html)
 """
+import collections
 import inspect
 import io
 import json
 import os
 import re
+import threading
 import zipfile
 
 from jsonschema import validate as json_validate
@@ -23,6 +25,7 @@ import tornado.gen
 import tornado.web
 
 from ... import Source, ForceSource, Receiver
+from ...database_interfaces.base_instaseis_db import _get_seismogram_times
 from ..util import run_async, IOQueue, _validtimesetting, \
     _validate_and_write_waveforms, get_gaussian_source_time_function
 from ..instaseis_request import InstaseisTimeSeriesHandler
@@ -37,7 +40,8 @@ with io.open(os.path.join(DATA, "finite_source_schema.json"), "rt") as fh:
 
 @run_async
 def _get_seismogram(db, source, receiver, components, units, dt, kernelwidth,
-                    starttime, endtime, scale, format, label, callback):
+                    starttime, endtime, scale, format, label, callback,
+                    cancelled=None):
     """
     Extract a seismogram from the passed db and write it either to a MiniSEED
     or a SACZIP file.
@@ -57,18 +61,38 @@ def _get_seismogram(db, source, receiver, components, units, dt, kernelwidth,
     :param format: The output format. Either "miniseed" or "saczip".
     :param label: Prefix for the filename within the SAC zip file.
     :param callback: callback function of the coroutine.
+    :param cancelled: Optional :class:`threading.Event`. Nothing is
+        extracted if it is set once the task starts.
     """
+    if cancelled is not None and cancelled.is_set():
+        callback((None, None))
+        return
+
     if source.sliprate is not None:
         reconvolve_stf = True
     else:
         reconvolve_stf = False
 
+    # Only extract the requested time window. One more sample on each side
+    # makes sure the final trim results in exactly the same samples as
+    # trimming the full seismograms.
+    dt_out = dt or db.info.dt
+    ti = _get_seismogram_times(
+        info=db.info, origin_time=source.origin_time, dt=dt,
+        kernelwidth=kernelwidth, remove_source_shift=False,
+        reconvolve_stf=reconvolve_stf)
+    time_window = {}
+    if starttime - dt_out <= ti["endtime"] and \
+            endtime + dt_out >= ti["starttime"]:
+        time_window["starttime"] = starttime - dt_out
+        time_window["endtime"] = endtime + dt_out
+
     try:
         st = db.get_seismograms(
             source=source, receiver=receiver, components=components,
             kind=units, remove_source_shift=False,
             reconvolve_stf=reconvolve_stf, return_obspy_stream=True, dt=dt,
-            kernelwidth=kernelwidth)
+            kernelwidth=kernelwidth, **time_window)
     except Exception:
         msg = ("Could not extract seismogram. Make sure, the components "
                "are valid, and the depth settings are correct.")
@@ -490,6 +514,7 @@ class SeismogramsHandler(InstaseisTimeSeriesHandler):
         # Coroutine + thread as potentially pretty expensive.
         response = yield tornado.gen.Task(
             _parse_validate_and_resample_stf,
+            executor=self.application.executor,
             request=self.request,
             db_info=self.application.db.info)
 
@@ -508,6 +533,11 @@ class SeismogramsHandler(InstaseisTimeSeriesHandler):
         # checks.
         args = self.parse_arguments()
 
+        # Identical requests are answered from the response cache.
+        served = yield self.serve_from_cache(args)
+        if served:
+            return
+
         # We'll piggyback the sourcewidth on the implementation of the custom
         # STF. This is not super clean to be honest but its simple and it
         # works.
@@ -567,70 +597,113 @@ class SeismogramsHandler(InstaseisTimeSeriesHandler):
         # we would like to raise an error.
         count = 0
 
-        # Loop over each receiver, get the synthetics and stream it to the
-        # user.
-        for receiver in receivers:
+        # Extract the seismograms of up to look_ahead receivers at once but
+        # stream them in the order of the receivers. The queue holds the
+        # futures of the tasks (or an exception that is raised once all
+        # seismograms before it have been sent).
+        look_ahead = max(int(self.application.receiver_look_ahead), 1)
+        pending = collections.deque()
+        receivers = iter(receivers)
+        submitted = 0
+        # Stops all still queued tasks once the request is aborted.
+        cancelled = threading.Event()
 
-            # Check if the connection is still open. The connection_closed
-            # flag is set by the on_connection_close() method. This is
-            # pretty manual right now. Maybe there is a better way? This
-            # enables to server to stop serving if the connection has been
-            # cancelled on the client side.
-            if self.connection_closed:  # pragma: no cover
-                self.flush()
-                self.finish()
-                return
-
-            # Check if start- or end time are phase relative. If yes
-            # calculate the new start- and/or end time.
-            time_values = self.get_phase_relative_times(
-                args=args, source=source, receiver=receiver,
-                min_starttime=min_starttime, max_endtime=max_endtime)
-            if time_values is None:
-                continue
-            starttime, endtime = time_values
-
-            # Validate the source-receiver geometry.
-            self.validate_geometry(source=source, receiver=receiver)
-
-            # Yield from the task. This enables a context switch and thus
-            # async behaviour.
-            response, mu = yield tornado.gen.Task(
-                _get_seismogram,
-                db=self.application.db, source=source, receiver=receiver,
-                components=list(args.components), units=args.units, dt=args.dt,
-                kernelwidth=args.kernelwidth, starttime=starttime,
-                endtime=endtime, scale=args.scale, format=args.format,
-                label=args.label)
-
-            # Check connection once again.
-            if self.connection_closed:  # pragma: no cover
+        try:
+            while True:
+                while len(pending) < look_ahead:
+                    receiver = next(receivers, None)
+                    if receiver is None:
+                        break
+
+                    try:
+                        # Check if start- or end time are phase relative. If
+                        # yes calculate the new start- and/or end time.
+                        time_values = self.get_phase_relative_times(
+                            args=args, source=source, receiver=receiver,
+                            min_starttime=min_starttime,
+                            max_endtime=max_endtime)
+                        if time_values is None:
+                            continue
+                        starttime, endtime = time_values
+
+                        # Validate the source-receiver geometry.
+                        self.validate_geometry(source=source,
+                                               receiver=receiver)
+                    except tornado.web.HTTPError as e:
+                        # Raised once all previous seismograms are sent.
+                        pending.append(e)
+                        receivers = iter([])
+                        break
+
+                    # Once data has been streamed an error can no longer be
+                    # sent so only the first task is subject to the queue
+                    # limit of the pool.
+                    pending.append(tornado.gen.Task(
+                        _get_seismogram,
+                        executor=self.application.executor,
+                        bypass_queue_limit=submitted > 0,
+                        db=self.application.db, source=source,
+                        receiver=receiver, components=list(args.components),
+                        units=args.units, dt=args.dt,
+                        kernelwidth=args.kernelwidth, starttime=starttime,
+                        endtime=endtime, scale=args.scale,
+                        format=args.format, label=args.label,
+                        cancelled=cancelled))
+                    submitted += 1
+
+                if not pending:
+                    break
+
+                # Check if the connection is still open. The
+                # connection_closed flag is set by the on_connection_close()
+                # method. This is pretty manual right now. Maybe there is a
+                # better way? This enables to server to stop serving if the
+                # connection has been cancelled on the client side.
+                if self.connection_closed:  # pragma: no cover
+                    self.flush()
+                    self.finish()
+                    return
+
+                task = pending.popleft()
+                if isinstance(task, Exception):
+                    raise task
+
+                # Yield from the task. This enables a context switch and
+                # thus async behaviour.
+                response, mu = yield task
+
+                # Check connection once again.
+                if self.connection_closed:  # pragma: no cover
+                    self.flush()
+                    self.finish()
+                    return
+
+                # Set mu just from the first station.
+                if count == 0 and not isinstance(response, Exception):
+                    self.set_header("Instaseis-Mu", "%f" % mu)
+
+                # If an exception is returned from the task, re-raise it
+                # here.
+                if isinstance(response, Exception):
+                    raise response
+                # It might return a list, in that case each item is a
+                # bytestring of SAC file.
+                elif isinstance(response, list):
+                    assert args.format == "saczip"
+                    for filename, content in response:
+                        zip_file.writestr(filename, content)
+                    for data in buf:
+                        self.write(data)
+                # Otherwise it contain MiniSEED which can just directly be
+                # streamed.
+                else:
+                    self.write(response)
                 self.flush()
-                self.finish()
-                return
-
-            # Set mu just from the first station.
-            if count == 0 and not isinstance(response, Exception):
-                self.set_header("Instaseis-Mu", "%f" % mu)
-
-            # If an exception is returned from the task, re-raise it here.
-            if isinstance(response, Exception):
-                raise response
-            # It might return a list, in that case each item is a bytestring
-            # of SAC file.
-            elif isinstance(response, list):
-                assert args.format == "saczip"
-                for filename, content in response:
-                    zip_file.writestr(filename, content)
-                for data in buf:
-                    self.write(data)
-            # Otherwise it contain MiniSEED which can just directly be
-            # streamed.
-            else:
-                self.write(response)
-            self.flush()
-
-            count += 1
+
+                count += 1
+        finally:
+            # Tasks still waiting for a worker have nothing to do anymore.
+            cancelled.set()
 
         # If nothing is written, raise an error. This should really only
         # happen with phase relative offsets with phases not coinciding with
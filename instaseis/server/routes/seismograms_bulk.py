@@ -0,0 +1,242 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+:copyright:
+    The Instaseis Development Team, 2026
+:license:
+    GNU Lesser General Public License, Version 3 [non-commercial/academic use]
+    (http://www.gnu.org/copyleft/lgpl.html)
+"""
+import collections
+import json
+import struct
+import threading
+
+import numpy as np
+import obspy
+import tornado.gen
+import tornado.web
+
+from ..instaseis_request import InstaseisRequestHandler
+from ..util import run_async
+from .seismograms_raw import RawSeismogramsHandler, _get_source, \
+    _get_receiver
+
+
+# Number of seismograms extracted by a single task.
+BULK_CHUNK_SIZE = 100
+
+
+@run_async
+def _parse_bulk_request(db, body, max_size, callback):
+    """
+    Parses and validates the JSON body of a bulk request.
+
+    :param db: An open instaseis database.
+    :param body: The body of the request.
+    :param max_size: The maximum number of seismograms in a single request.
+    :param callback: The coroutine's callback. Called with a list of
+        (source, receiver, components) tuples or an exception.
+    """
+    try:
+        items = json.loads(body.decode())
+    except Exception:
+        msg = "The body of the request must be a JSON array."
+        callback(tornado.web.HTTPError(400, log_message=msg, reason=msg))
+        return
+
+    if not isinstance(items, list) or \
+            not all(isinstance(_i, dict) for _i in items):
+        msg = "The body of the request must be a JSON array of objects."
+        callback(tornado.web.HTTPError(400, log_message=msg, reason=msg))
+        return
+
+    if not items:
+        msg = "At least one seismogram must be requested."
+        callback(tornado.web.HTTPError(400, log_message=msg, reason=msg))
+        return
+
+    if max_size is not None and len(items) > max_size:
+        msg = ("The server only allows %i seismograms per bulk request. "
+               "Please split the request." % max_size)
+        callback(tornado.web.HTTPError(400, log_message=msg, reason=msg))
+        return
+
+    arguments = RawSeismogramsHandler.arguments
+    default_components = "".join(db.default_components)
+
+    parsed = []
+    for _i, item in enumerate(items):
+        try:
+            unknown_arguments = set(item.keys()).difference(arguments.keys())
+            if unknown_arguments:
+                msg = "The following unknown parameters have been passed: " \
+                      "%s" % ", ".join("'%s'" % _j
+                                       for _j in sorted(unknown_arguments))
+                raise tornado.web.HTTPError(400, log_message=msg, reason=msg)
+
+            args = obspy.core.AttribDict()
+            for name, properties in arguments.items():
+                if name in item:
+                    value = item[name]
+                elif "required" in properties:
+                    msg = "Required parameter '%s' not given." % name
+                    raise tornado.web.HTTPError(400, log_message=msg,
+                                                reason=msg)
+                elif name == "components":
+                    value = default_components
+                else:
+                    value = properties.get("default", None)
+                if value is not None:
+                    try:
+                        value = properties["type"](value)
+                    except Exception:
+                        msg = ("Parameter '%s' could not be converted to "
+                               "'%s'.") % (
+                            name, str(properties["type"].__name__))
+                        raise tornado.web.HTTPError(400, log_message=msg,
+                                                    reason=msg)
+                setattr(args, name, value)
+
+            components = list(args.components)
+            source = _get_source(args)
+            receiver = _get_receiver(args)
+
+            try:
+                source, receiver = db._get_seismograms_sanity_checks(
+                    source=source, receiver=receiver, components=components,
+                    kind="displacement", dt=None)
+            except Exception as e:
+                msg = "Invalid seismogram: %s" % str(e)
+                raise tornado.web.HTTPError(400, log_message=msg,
+                                            reason=msg)
+        except tornado.web.HTTPError as e:
+            msg = "Seismogram %i: %s" % (_i, e.reason)
+            callback(tornado.web.HTTPError(400, log_message=msg, reason=msg))
+            return
+        parsed.append((source, receiver, components))
+
+    callback(parsed)
+
+
+@run_async
+def _get_seismograms_bulk(db, items, callback, cancelled=None):
+    """
+    Extract the raw seismograms of a chunk of a bulk request.
+
+    :param db: An open instaseis database.
+    :param items: List of (source, receiver, components) tuples.
+    :param callback: callback function of the coroutine.
+    :param cancelled: Optional :class:`threading.Event`. Nothing is
+        extracted if it is set once the task starts.
+    """
+    if cancelled is not None and cancelled.is_set():
+        callback(None)
+        return
+
+    data = []
+    for source, receiver, components in items:
+        try:
+            d = db._get_seismograms(source=source, receiver=receiver,
+                                    components=components)
+        except Exception:
+            msg = ("Could not extract seismogram. Make sure, the components "
+                   "are valid, and the depth settings are correct.")
+            callback(tornado.web.HTTPError(400, log_message=msg, reason=msg))
+            return
+        data.append(struct.pack("<d", d["mu"]))
+        for comp in components:
+            data.append(np.require(d[comp], dtype="<f4").tobytes())
+    callback(b"".join(data))
+
+
+class BulkSeismogramsHandler(InstaseisRequestHandler):
+    """
+    Raw seismograms for many source-receiver pairs in a single request.
+
+    The body of the POST request is a JSON array of objects with the same
+    parameters as the /seismograms_raw route. The response is binary: a
+    little-endian uint32 with the length of a JSON index header, the header
+    with the keys ``npts``, ``dt``, and ``components`` (one string per
+    seismogram), followed by one record per seismogram in the order of the
+    request. Each record is mu as a little-endian float64 and ``npts``
+    little-endian float32 samples per component.
+    """
+    connection_closed = False
+
+    def on_connection_close(self):  # pragma: no cover
+        """
+        Called when the client cancels the connection. Then the loop
+        requesting seismograms will stop.
+        """
+        InstaseisRequestHandler.on_connection_close(self)
+        self.connection_closed = True
+
+    @tornado.web.asynchronous
+    @tornado.gen.coroutine
+    def post(self):
+        db = self.application.db
+
+        items = yield tornado.gen.Task(
+            _parse_bulk_request, executor=self.application.executor,
+            db=db, body=self.request.body,
+            max_size=self.application.max_size_of_bulk_requests)
+        if isinstance(items, Exception):
+            raise items
+
+        header = json.dumps({
+            "npts": int(db.info.npts),
+            "dt": float(db.info.dt),
+            "components": ["".join(_i[2]) for _i in items]}).encode()
+
+        self.set_header("Content-Type", "application/octet-stream")
+        self.write(struct.pack("<I", len(header)))
+        self.write(header)
+
+        # Extract several chunks at once but send them in order.
+        chunks = iter([items[_i:_i + BULK_CHUNK_SIZE]
+                       for _i in range(0, len(items), BULK_CHUNK_SIZE)])
+        look_ahead = max(int(self.application.receiver_look_ahead), 1)
+        pending = collections.deque()
+        submitted = 0
+        cancelled = threading.Event()
+
+        try:
+            while True:
+                while len(pending) < look_ahead:
+                    chunk = next(chunks, None)
+                    if chunk is None:
+                        break
+                    # Only the first task is subject to the queue limit of
+                    # the pool as nothing has been sent before it.
+                    pending.append(tornado.gen.Task(
+                        _get_seismograms_bulk,
+                        executor=self.application.executor,
+                        bypass_queue_limit=submitted > 0,
+                        db=db, items=chunk, cancelled=cancelled))
+                    submitted += 1
+
+                if not pending:
+                    break
+
+                response = yield pending.popleft()
+
+                # Stop serving if the client cancelled the connection.
+                if self.connection_closed:  # pragma: no cover
+                    self.flush()
+                    self.finish()
+                    return
+
+                # If an exception is returned from the task, re-raise it
+                # here. The client will notice the truncated response if
+                # data has already been sent.
+                if isinstance(response, Exception):
+                    raise response
+
+                self.write(response)
+                self.flush()
+        finally:
+            # Tasks still waiting for a worker have nothing to do anymore.
+            cancelled.set()
+
+        self.finish()
@@ -65,6 +65,102 @@ def _get_seismogram(db, source, receiver, components, callback):
     callback((binary_data, st[0].stats.instaseis.mu))
 
 
+def _get_source(args):
+    """
+    Construct the source from the parsed arguments of a raw seismogram
+    request.
+
+    :param args: The parsed arguments.
+    """
+    # Figure out the type of source and construct the source object.
+    src_params = {
+        "moment_tensor": set(["mrr", "mtt", "mpp", "mrt", "mrp",
+                              "mtp"]),
+        "strike_dip_rake": set(["strike", "dip", "rake", "M0"]),
+        "force_source": set(["fr", "ft", "fp"])
+    }
+
+    for src_type, params in src_params.items():
+        src_params = [getattr(args, _i) for _i in params]
+        if None in src_params:
+            continue
+        elif src_type == "moment_tensor":
+            try:
+                source = Source(latitude=args.sourcelatitude,
+                                longitude=args.sourcelongitude,
+                                depth_in_m=args.sourcedepthinmeters,
+                                m_rr=args.mrr, m_tt=args.mtt,
+                                m_pp=args.mpp, m_rt=args.mrt,
+                                m_rp=args.mrp, m_tp=args.mtp,
+                                origin_time=args.origintime)
+            except Exception:
+                msg = ("Could not construct moment tensor source with "
+                       "passed parameters. Check parameters for sanity.")
+                raise tornado.web.HTTPError(400, log_message=msg,
+                                            reason=msg)
+            break
+        elif src_type == "strike_dip_rake":
+            try:
+                source = Source.from_strike_dip_rake(
+                    latitude=args.sourcelatitude,
+                    longitude=args.sourcelongitude,
+                    depth_in_m=args.sourcedepthinmeters,
+                    strike=args.strike, dip=args.dip, rake=args.rake,
+                    M0=args.M0, origin_time=args.origintime)
+            except Exception:
+                msg = ("Could not construct the source from the passed "
+                       "strike/dip/rake parameters. Check parameter for "
+                       "sanity.")
+                raise tornado.web.HTTPError(400, log_message=msg,
+                                            reason=msg)
+            break
+        elif src_type == "force_source":
+            try:
+                source = ForceSource(latitude=args.sourcelatitude,
+                                     longitude=args.sourcelongitude,
+                                     depth_in_m=args.sourcedepthinmeters,
+                                     f_r=args.fr, f_t=args.ft,
+                                     f_p=args.fp,
+                                     origin_time=args.origintime)
+            except Exception:
+                msg = ("Could not construct force source with passed "
+                       "parameters. Check parameters for sanity.")
+                raise tornado.web.HTTPError(400, log_message=msg,
+                                            reason=msg)
+            break
+        else:
+            # Cannot really happen.
+            raise NotImplementedError
+    else:
+        msg = "No/insufficient source parameters specified"
+        raise tornado.web.HTTPError(400, log_message=msg, reason=msg)
+
+    return source
+
+
+def _get_receiver(args):
+    """
+    Construct the receiver from the parsed arguments of a raw seismogram
+    request.
+
+    :param args: The parsed arguments.
+    """
+    # Construct the receiver object.
+    try:
+        receiver = Receiver(latitude=args.receiverlatitude,
+                            longitude=args.receiverlongitude,
+                            network=args.networkcode,
+                            station=args.stationcode,
+                            location=args.locationcode,
+                            depth_in_m=args.receiverdepthinmeters)
+    except Exception:
+        msg = ("Could not construct receiver with passed parameters. "
+               "Check parameters for sanity.")
+        raise tornado.web.HTTPError(400, log_message=msg, reason=msg)
+
+    return receiver
+
+
 class RawSeismogramsHandler(InstaseisTimeSeriesHandler):
     # Define the arguments for the seismogram endpoint.
     arguments = {
@@ -119,86 +215,14 @@ class RawSeismogramsHandler(InstaseisTimeSeriesHandler):
     def get(self):
         args = self.parse_arguments()
 
-        # Figure out the type of source and construct the source object.
-        src_params = {
-            "moment_tensor": set(["mrr", "mtt", "mpp", "mrt", "mrp",
-                                  "mtp"]),
-            "strike_dip_rake": set(["strike", "dip", "rake", "M0"]),
-            "force_source": set(["fr", "ft", "fp"])
-        }
-
         components = list(args.components)
-        for src_type, params in src_params.items():
-            src_params = [getattr(args, _i) for _i in params]
-            if None in src_params:
-                continue
-            elif src_type == "moment_tensor":
-                try:
-                    source = Source(latitude=args.sourcelatitude,
-                                    longitude=args.sourcelongitude,
-                                    depth_in_m=args.sourcedepthinmeters,
-                                    m_rr=args.mrr, m_tt=args.mtt,
-                                    m_pp=args.mpp, m_rt=args.mrt,
-                                    m_rp=args.mrp, m_tp=args.mtp,
-                                    origin_time=args.origintime)
-                except Exception:
-                    msg = ("Could not construct moment tensor source with "
-                           "passed parameters. Check parameters for sanity.")
-                    raise tornado.web.HTTPError(400, log_message=msg,
-                                                reason=msg)
-                break
-            elif src_type == "strike_dip_rake":
-                try:
-                    source = Source.from_strike_dip_rake(
-                        latitude=args.sourcelatitude,
-                        longitude=args.sourcelongitude,
-                        depth_in_m=args.sourcedepthinmeters,
-                        strike=args.strike, dip=args.dip, rake=args.rake,
-                        M0=args.M0, origin_time=args.origintime)
-                except Exception:
-                    msg = ("Could not construct the source from the passed "
-                           "strike/dip/rake parameters. Check parameter for "
-                           "sanity.")
-                    raise tornado.web.HTTPError(400, log_message=msg,
-                                                reason=msg)
-                break
-            elif src_type == "force_source":
-                try:
-                    source = ForceSource(latitude=args.sourcelatitude,
-                                         longitude=args.sourcelongitude,
-                                         depth_in_m=args.sourcedepthinmeters,
-                                         f_r=args.fr, f_t=args.ft,
-                                         f_p=args.fp,
-                                         origin_time=args.origintime)
-                except Exception:
-                    msg = ("Could not construct force source with passed "
-                           "parameters. Check parameters for sanity.")
-                    raise tornado.web.HTTPError(400, log_message=msg,
-                                                reason=msg)
-                break
-            else:
-                # Cannot really happen.
-                raise NotImplementedError
-        else:
-            msg = "No/insufficient source parameters specified"
-            raise tornado.web.HTTPError(400, log_message=msg, reason=msg)
-
-        # Construct the receiver object.
-        try:
-            receiver = Receiver(latitude=args.receiverlatitude,
-                                longitude=args.receiverlongitude,
-                                network=args.networkcode,
-                                station=args.stationcode,
-                                location=args.locationcode,
-                                depth_in_m=args.receiverdepthinmeters)
-        except Exception:
-            msg = ("Could not construct receiver with passed parameters. "
-                   "Check parameters for sanity.")
-            raise tornado.web.HTTPError(400, log_message=msg, reason=msg)
+        source = _get_source(args)
+        receiver = _get_receiver(args)
 
         response = yield tornado.gen.Task(
-            _get_seismogram, db=self.application.db, source=source,
-            receiver=receiver, components=components)
+            _get_seismogram, executor=self.application.executor,
+            db=self.application.db, source=source, receiver=receiver,
+            components=components)
 
         # If an exception is returned from the task, re-raise it here.
         if isinstance(response, Exception):
@@ -7,11 +7,13 @@
     GNU Lesser General Public License, Version 3 [non-commercial/academic use]
     (http://www.gnu.org/copyleft/lgpl.html)
 """
+import collections
 import io
 import math
 import re
 import functools
 import threading
+import time
 
 # This is needed for the gps2dist_azimuth() function to always be stable. We
 # thus enforce an import here.
@@ -21,6 +23,7 @@ import numpy as np
 import obspy
 from obspy.geodetics import gps2dist_azimuth, locations2degrees
 from obspy.io.sac.util import utcdatetime_to_sac_nztimes
+from tornado.log import app_log
 import tornado.web
 
 from .. import ForceSource, FiniteSource
@@ -32,17 +35,157 @@ from .. import __version__
 PHASE_OFFSET_PATTERN = re.compile(r"(^[A-Za-z0-9^]+)([\+-])([\deE\.\-\+]+$)")
 
 
+class QueueFullError(Exception):
+    """
+    Raised when a task is submitted to a full :class:`BoundedThreadPool`.
+    """
+    pass
+
+
+class ServiceUnavailableError(tornado.web.HTTPError):
+    """
+    HTTP 503 error carrying the number of seconds after which the client
+    should retry. Sent as the ``Retry-After`` header.
+    """
+    def __init__(self, retry_after, *args, **kwargs):
+        self.retry_after = retry_after
+        super(ServiceUnavailableError, self).__init__(503, *args, **kwargs)
+
+
+class BoundedThreadPool(object):
+    """
+    Thread pool with a bounded number of worker threads and a bounded queue
+    of pending tasks.
+
+    Worker threads are started on demand and exit once the queue has been
+    drained so an idle pool does not hold on to any threads. Tasks submitted
+    while all workers are busy are queued; once ``max_queue_size`` tasks
+    are pending further submissions raise a :class:`QueueFullError`.
+
+    :param max_workers: Maximum number of concurrently running worker
+        threads.
+    :type max_workers: int
+    :param max_queue_size: Maximum number of pending tasks. ``None`` results
+        in an unbounded queue.
+    :type max_queue_size: int
+    :param retry_after: Seconds after which a rejected client is advised to
+        retry.
+    :type retry_after: int
+    """
+    def __init__(self, max_workers=8, max_queue_size=64, retry_after=5):
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1.")
+        if max_queue_size is not None and max_queue_size < 0:
+            raise ValueError("max_queue_size must not be negative.")
+        self.max_workers = int(max_workers)
+        self.max_queue_size = max_queue_size
+        self.retry_after = int(retry_after)
+
+        self._lock = threading.Lock()
+        self._queue = collections.deque()
+        self._worker_count = 0
+
+        self._submitted = 0
+        self._completed = 0
+        self._rejected = 0
+        self._max_queue_depth = 0
+        self._total_wait_time = 0.0
+        self._max_wait_time = 0.0
+
+    def submit(self, func, *args, **kwargs):
+        """
+        Schedule ``func(*args, **kwargs)`` to be run in a worker thread.
+
+        :param bypass_queue_limit: Queue the task even if the queue is full.
+            Used for follow-up tasks of requests that already started
+            streaming their response and thus can no longer be answered
+            with an error.
+        :type bypass_queue_limit: bool
+        """
+        bypass_queue_limit = kwargs.pop("bypass_queue_limit", False)
+
+        with self._lock:
+            start_worker = self._worker_count < self.max_workers
+            if not start_worker and not bypass_queue_limit and \
+                    self.max_queue_size is not None and \
+                    len(self._queue) >= self.max_queue_size:
+                self._rejected += 1
+                raise QueueFullError(
+                    "All %i workers are busy and %i tasks are already "
+                    "queued." % (self.max_workers, len(self._queue)))
+            self._queue.append((time.time(), func, args, kwargs))
+            self._submitted += 1
+            self._max_queue_depth = max(self._max_queue_depth,
+                                        len(self._queue))
+            if start_worker:
+                self._worker_count += 1
+
+        if start_worker:
+            worker = threading.Thread(target=self._worker)
+            worker.daemon = True
+            worker.start()
+
+    def _worker(self):
+        while True:
+            with self._lock:
+                if not self._queue:
+                    self._worker_count -= 1
+                    return
+                submitted_at, func, args, kwargs = self._queue.popleft()
+                wait_time = time.time() - submitted_at
+                self._total_wait_time += wait_time
+                self._max_wait_time = max(self._max_wait_time, wait_time)
+            try:
+                func(*args, **kwargs)
+            except Exception:
+                app_log.exception("Uncaught exception in worker thread.")
+            finally:
+                with self._lock:
+                    self._completed += 1
+
+    def get_statistics(self):
+        """
+        Returns a dictionary with the current state of the pool as well as
+        cumulative queue depth and wait time statistics.
+        """
+        with self._lock:
+            started = self._submitted - len(self._queue)
+            return {
+                "max_workers": self.max_workers,
+                "max_queue_size": self.max_queue_size,
+                "active_workers": self._worker_count,
+                "queue_depth": len(self._queue),
+                "max_queue_depth": self._max_queue_depth,
+                "submitted_tasks": self._submitted,
+                "completed_tasks": self._completed,
+                "rejected_tasks": self._rejected,
+                "mean_wait_time_in_s":
+                    self._total_wait_time / started if started else 0.0,
+                "max_wait_time_in_s": self._max_wait_time}
+
+
 def run_async(func):
     """
-    Decorator executing a function in a thread.
+    Decorator executing a function in a thread of a
+    :class:`BoundedThreadPool`.
 
-    Adapted from http://stackoverflow.com/a/15952516/1657047
+    The decorated function requires an ``executor`` keyword argument and
+    optionally accepts ``bypass_queue_limit``. If the pool's queue is full a
+    :class:`ServiceUnavailableError` is raised.
     """
     @functools.wraps(func)
     def async_func(*args, **kwargs):
-        func_hl = threading.Thread(target=func, args=args, kwargs=kwargs)
-        func_hl.start()
-        return func_hl
+        executor = kwargs.pop("executor")
+        bypass_queue_limit = kwargs.pop("bypass_queue_limit", False)
+        try:
+            executor.submit(func, bypass_queue_limit=bypass_queue_limit,
+                            *args, **kwargs)
+        except QueueFullError:
+            msg = ("The server is currently too busy to handle the request. "
+                   "Please try again later.")
+            raise ServiceUnavailableError(
+                retry_after=executor.retry_after, log_message=msg,
+                reason=msg)
     return async_func
 
 
@@ -14,7 +14,10 @@ AxiSEM's kernel module.
 from __future__ import (absolute_import, division, print_function,
                         unicode_literals)
 
+from collections import OrderedDict
 import ctypes as C
+import threading
+
 import numpy as np
 
 from .helpers import load_lib
@@ -22,6 +25,12 @@ from .helpers import load_lib
 
 lib = load_lib()
 
+# Cache for the Lagrange weights at a point. Mainly useful to avoid
+# recomputing them for repeated extractions at the same receiver.
+LAGRANGE_WEIGHTS_CACHE_SIZE = 4096
+_lagrange_weights_cache = OrderedDict()
+_lagrange_weights_cache_lock = threading.Lock()
+
 
 def lagrange_interpol_2D_td(points1, points2, coefficients, x1, x2):  # NOQA
     points1 = np.require(points1, dtype=np.float64,
@@ -50,3 +59,71 @@ def lagrange_interpol_2D_td(points1, points2, coefficients, x1, x2):  # NOQA
         C.c_double(x2),
         interpolant.ctypes.data_as(C.POINTER(C.c_double)))
     return interpolant
+
+
+def lagrange_basis(points, x):
+    """
+    Values of all Lagrange basis polynomials defined by the collocation
+    points at the position x.
+    """
+    points = np.require(points, dtype=np.float64)
+    num = np.tile(x - points, (len(points), 1))
+    denom = points[:, np.newaxis] - points[np.newaxis, :]
+    np.fill_diagonal(num, 1.0)
+    np.fill_diagonal(denom, 1.0)
+    return np.prod(num / denom, axis=1)
+
+
+def lagrange_weights_2D(points1, points2, x1, x2):  # NOQA
+    """
+    Values of the 1D Lagrange basis polynomials of both collocation point sets
+    at (x1, x2). Results are cached.
+    """
+    points1 = np.require(points1, dtype=np.float64)
+    points2 = np.require(points2, dtype=np.float64)
+    key = (points1.tobytes(), points2.tobytes(), float(x1), float(x2))
+
+    with _lagrange_weights_cache_lock:
+        weights = _lagrange_weights_cache.pop(key, None)
+        if weights is None:
+            weights = (lagrange_basis(points1, x1),
+                       lagrange_basis(points2, x2))
+        _lagrange_weights_cache[key] = weights
+        while len(_lagrange_weights_cache) > LAGRANGE_WEIGHTS_CACHE_SIZE:
+            _lagrange_weights_cache.popitem(last=False)
+
+    return weights
+
+
+def lagrange_interpol_2D_td_multi(points1, points2, coefficients,  # NOQA
+                                  x1, x2):
+    """
+    Same as :func:`lagrange_interpol_2D_td` but interpolates all components
+    of ``coefficients`` with shape ``(nsamp, N + 1, N + 1, ncomp)`` in one go.
+
+    Returns an array of shape ``(nsamp, ncomp)``.
+    """
+    l_i, l_j = lagrange_weights_2D(points1, points2, x1, x2)
+
+    # Should be safe enough. This was never raised while extracting a lot of
+    # seismograms.
+    assert len(l_i) == len(l_j)
+
+    coefficients = np.require(coefficients, dtype=np.float64,
+                              requirements=["F_CONTIGUOUS"])
+
+    n = len(l_i) - 1
+    nsamp = coefficients.shape[0]
+    ncomp = coefficients.shape[3]
+
+    interpolant = np.zeros((nsamp, ncomp), dtype="float64", order="F")
+
+    lib.lagrange_interpol_2D_td_weights(
+        C.c_int(n),
+        C.c_int(nsamp),
+        C.c_int(ncomp),
+        l_i.ctypes.data_as(C.POINTER(C.c_double)),
+        l_j.ctypes.data_as(C.POINTER(C.c_double)),
+        coefficients.ctypes.data_as(C.POINTER(C.c_double)),
+        interpolant.ctypes.data_as(C.POINTER(C.c_double)))
+    return interpolant
@@ -53,6 +53,7 @@ module finite_elem_mapping
     private
 
     public  :: inside_element
+    public  :: inside_element_many
 
     public  :: mapping
     public  :: inv_mapping
@@ -123,6 +124,45 @@ subroutine inside_element(s, z, nodes, element_type, tolerance, in_element, xi,
 end subroutine inside_element
 !-----------------------------------------------------------------------------------------
 
+!-----------------------------------------------------------------------------------------
+subroutine inside_element_many(npoints, ncandidates, s, z, nodes, element_types, &
+                               tolerance, found, xi, eta) &
+    bind(c, name="inside_element_many")
+!< for each of the npoints points test the candidate elements in order and return the
+!< index (starting at 0) of the first one containing the point together with the
+!< reference coordinates xi and eta in it. found is -1 if no candidate contains the point.
+
+  integer(c_int), intent(in), value             :: npoints, ncandidates
+  real(c_double), intent(in)                    :: s(npoints), z(npoints)
+  real(c_double), intent(in)                    :: nodes(4, 2, ncandidates, npoints)
+  integer(c_int), intent(in)                    :: element_types(ncandidates, npoints)
+  real(c_double), intent(in), value             :: tolerance
+  integer(c_int), intent(out)                   :: found(npoints)
+  real(c_double), intent(out)                   :: xi(npoints), eta(npoints)
+  logical(c_bool)                               :: in_element
+  real(c_double)                                :: xi_loc, eta_loc
+  integer                                       :: ipoint, icand
+
+  do ipoint = 1, npoints
+     found(ipoint) = -1
+     xi(ipoint) = 0
+     eta(ipoint) = 0
+     do icand = 1, ncandidates
+        call inside_element(s(ipoint), z(ipoint), nodes(:, :, icand, ipoint), &
+                            element_types(icand, ipoint), tolerance, in_element, &
+                            xi_loc, eta_loc)
+        if (in_element) then
+           found(ipoint) = icand - 1
+           xi(ipoint) = xi_loc
+           eta(ipoint) = eta_loc
+           exit
+        endif
+     enddo
+  enddo
+
+end subroutine inside_element_many
+!-----------------------------------------------------------------------------------------
+
 !!!!!!! WRAPPING ROUTINES FOR MAPPING !!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!
 
 !-----------------------------------------------------------------------------------------
@@ -14,6 +14,7 @@ module spectral_basis
     private
 
     public :: lagrange_interpol_2D_td
+    public :: lagrange_interpol_2D_td_weights
 
 contains
 
@@ -34,6 +35,20 @@ subroutine lagrange_interpol_2D_td_wrapped(N, nsamp, points1, points2, coefficie
 end subroutine
 !-----------------------------------------------------------------------------------------
 
+!-----------------------------------------------------------------------------------------
+subroutine lagrange_interpol_2D_td_weights_wrapped(N, nsamp, ncomp, l_i, l_j, &
+                                                   coefficients, interpolant) &
+  bind(c, name="lagrange_interpol_2D_td_weights")
+
+  integer(c_int), intent(in), value  :: N, nsamp, ncomp
+  real(c_double), intent(in)         :: l_i(0:N), l_j(0:N)
+  real(c_double), intent(in)         :: coefficients(1:nsamp, 0:N, 0:N, 1:ncomp)
+  real(c_double), intent(out)        :: interpolant(nsamp, ncomp)
+
+  interpolant = lagrange_interpol_2D_td_weights(l_i, l_j, coefficients)
+end subroutine
+!-----------------------------------------------------------------------------------------
+
 !== END  C Wrappers ======================================================================
 
 !-----------------------------------------------------------------------------------------
@@ -81,5 +96,35 @@ function lagrange_interpol_2D_td(points1, points2, coefficients, x1, x2)
 end function lagrange_interpol_2D_td
 !-----------------------------------------------------------------------------------------
 
+!-----------------------------------------------------------------------------------------
+!> same as lagrange_interpol_2D_td, but for several components at once and with the
+!  values of the 1D Lagrange polynomials at the interpolation point precomputed
+function lagrange_interpol_2D_td_weights(l_i, l_j, coefficients)
+
+  real(dp), intent(in)  :: l_i(0:), l_j(0:)
+  real(dp), intent(in)  :: coefficients(:,0:,0:,:)
+  real(dp)              :: lagrange_interpol_2D_td_weights(size(coefficients,1), &
+                                                           size(coefficients,4))
+
+  integer               :: i, j, icomp, n1, n2
+
+  n1 = size(l_i) - 1
+  n2 = size(l_j) - 1
+
+  lagrange_interpol_2D_td_weights(:,:) = 0
+
+  do icomp=1, size(coefficients,4)
+     do i=0, n1
+        do j=0, n2
+           lagrange_interpol_2D_td_weights(:,icomp) = &
+                lagrange_interpol_2D_td_weights(:,icomp) &
+                + coefficients(:,i,j,icomp) * l_i(i) * l_j(j)
+        enddo
+     enddo
+  enddo
+
+end function lagrange_interpol_2D_td_weights
+!-----------------------------------------------------------------------------------------
+
 end module
 !=========================================================================================
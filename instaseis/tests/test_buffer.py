@@ -11,9 +11,16 @@ Tests for the array buffer.
 """
 from __future__ import absolute_import, division
 
+import collections
+import multiprocessing
+import os
+
 import numpy as np
+import pytest
 
+from instaseis.database_interfaces.element_info_cache import ElementInfoCache
 from instaseis.database_interfaces.mesh import Buffer
+from instaseis.database_interfaces.shared_buffer import SharedMemoryBuffer
 
 
 def test_buffer():
@@ -42,3 +49,195 @@ def test_buffer():
     # Once more not in.
     assert "d" not in buf
     assert buf.efficiency == 2.0 / 4.0
+
+
+def test_buffer_get_missing_item():
+    buf = Buffer(max_size_in_mb=1.0)
+    assert buf.get("a") is None
+    assert buf.get("a", 1) == 1
+
+
+def test_buffer_adding_same_item_twice():
+    """
+    Multiple threads might add the same item - the size accounting must
+    not be affected by that.
+    """
+    buf = Buffer(max_size_in_mb=1.0)
+    buf.add("a", np.empty(10, dtype=np.int8))
+    buf.add("a", np.empty(20, dtype=np.int8))
+    assert buf._total_size == 20
+    assert len(buf._buffer) == 1
+
+
+def test_buffer_thread_safety():
+    """
+    Hammer the buffer from a couple of threads and make sure the size
+    accounting is still correct afterwards.
+    """
+    import threading
+
+    buf = Buffer(max_size_in_mb=0.01)
+    errors = []
+
+    def work(seed):
+        rng = np.random.RandomState(seed)
+        try:
+            for _ in range(2000):
+                key = rng.randint(0, 50)
+                if key in buf:
+                    value = buf.get(key)
+                    assert value is None or value.shape == (100 + key,)
+                else:
+                    buf.add(key, np.empty(100 + key, dtype=np.int8))
+        except Exception as e:  # pragma: no cover
+            errors.append(e)
+
+    threads = [threading.Thread(target=work, args=(_i,)) for _i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert not errors
+    assert buf._total_size == sum(_i.nbytes for _i in buf._buffer.values())
+    assert buf._total_size <= 0.01 * 1024 ** 2
+
+
+def test_shared_memory_buffer():
+    buf = SharedMemoryBuffer(max_size_in_mb=1.0)
+    assert buf.efficiency == 0.0
+    assert buf.max_size_in_mb == 1.0
+    assert 1 not in buf
+    assert buf.get(1) is None
+    assert buf.get(1, 2) == 2
+
+    # Fortran order and tuples with missing parts survive the round trip.
+    a = np.asfortranarray(np.arange(24, dtype=np.float64).reshape((2, 3, 4)))
+    buf.add(1, a)
+    assert 1 in buf
+    value = buf.get(1)
+    np.testing.assert_array_equal(value, a)
+    assert value.flags.f_contiguous
+    assert value.dtype == np.float64
+    # It is a copy.
+    value[:] = 0
+    np.testing.assert_array_equal(buf.get(1), a)
+
+    b = np.arange(24, dtype=np.float32)
+    buf.add(2, (None, b))
+    value = buf.get(2)
+    assert isinstance(value, tuple)
+    assert value[0] is None
+    np.testing.assert_array_equal(value[1], b)
+
+    # Replacing an item does not change the size accounting.
+    size = buf.get_size_mb()
+    buf.add(1, a + 1)
+    np.testing.assert_array_equal(buf.get(1), a + 1)
+    assert buf.get_size_mb() == size
+
+    # Larger than the slot size - not buffered.
+    buf.add(3, np.zeros(100))
+    assert 3 not in buf
+
+    assert buf.efficiency == 1.0 / 3.0
+
+
+def test_shared_memory_buffer_eviction():
+    """
+    Compare against a simple LRU model. Lots of collisions in the hash
+    table as the keys are spaced by its size.
+    """
+    buf = SharedMemoryBuffer(max_size_in_mb=0.05, slot_size_in_bytes=800)
+    nslots = len(buf._get_layout()[2])
+    table_size = len(buf._get_layout()[0])
+    assert nslots > 10
+
+    model = collections.OrderedDict()
+    rng = np.random.RandomState(12345)
+    keys = [_i * table_size + rng.randint(0, 5)
+            for _i in range(3 * nslots)]
+    for _ in range(5000):
+        key = keys[rng.randint(0, len(keys))]
+        if rng.rand() < 0.5:
+            value = np.ones(100) * key
+            buf.add(key, value)
+            model.pop(key, None)
+            model[key] = value
+            if len(model) > nslots:
+                model.popitem(last=False)
+        else:
+            value = buf.get(key)
+            if key in model:
+                np.testing.assert_array_equal(value, model[key])
+                model[key] = model.pop(key)
+            else:
+                assert value is None
+
+    for key in keys:
+        assert (key in buf) == (key in model)
+    # All items have the same size.
+    item_size = buf._get_layout()[1][0, 2]
+    assert buf.get_size_mb() == len(model) * item_size / 1024 ** 2
+
+
+def _add_to_shared_buffer(buf, offset):
+    for _i in range(offset, offset + 50):
+        buf.add(_i, np.ones(10) * _i)
+    for _i in range(200):
+        if _i in buf:
+            value = buf.get(_i)
+            assert value is None or (value == _i).all()
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="Requires os.fork().")
+def test_shared_memory_buffer_multiple_processes():
+    """
+    Items added by one process can be retrieved by all others.
+    """
+    # Python 2 always forks.
+    if hasattr(multiprocessing, "get_context"):
+        ctx = multiprocessing.get_context("fork")
+    else:  # pragma: no cover
+        ctx = multiprocessing
+
+    buf = SharedMemoryBuffer(max_size_in_mb=1.0)
+    processes = [ctx.Process(target=_add_to_shared_buffer, args=(buf, _i))
+                 for _i in range(0, 200, 50)]
+    for p in processes:
+        p.start()
+    for p in processes:
+        p.join()
+        assert p.exitcode == 0
+
+    for _i in range(200):
+        np.testing.assert_array_equal(buf.get(_i), np.ones(10) * _i)
+    assert buf.get_size_mb() > 0
+    assert 0.0 < buf.efficiency <= 1.0
+
+
+def test_element_info_cache():
+    """
+    Points are matched at the resolution of the cache and the least
+    recently used entries are removed once the memory limit is exceeded.
+    """
+    entry = (1, np.zeros((5, 5), dtype=np.int32), 0.1, 0.2)
+    nbytes = ElementInfoCache._get_nbytes(entry)
+    cache = ElementInfoCache(max_size_in_mb=3.5 * nbytes / 1024 ** 2,
+                             resolution_in_m=1.0)
+
+    assert cache.get(0.0, 0.0) is None
+    cache.add(0.0, 0.0, entry)
+    assert cache.get(0.3, -0.4) is entry
+    assert cache.get(0.6, 0.0) is None
+    assert (cache.hits, cache.misses) == (1, 2)
+    assert cache.efficiency == 1.0 / 3.0
+
+    for _i in range(1, 4):
+        cache.add(10.0 * _i, 0.0, entry)
+        # Keep the first entry recently used.
+        cache.get(0.0, 0.0)
+    assert len(cache) == 3
+    assert cache.get(10.0, 0.0) is None
+    assert cache.get(0.0, 0.0) is entry
+    assert cache.get_size_mb() <= 3.5 * nbytes / 1024 ** 2
@@ -15,18 +15,23 @@ from __future__ import absolute_import
 import inspect
 import io
 import math
+import multiprocessing
 import numpy as np
 import obspy
 import os
 import pytest
 import shutil
+import threading
 
 import instaseis
 from instaseis import InstaseisError, InstaseisNotFoundError
-from instaseis.database_interfaces import find_and_open_files
+from instaseis.database_interfaces import (find_and_open_files, mesh,
+                                           shared_buffer)
 from instaseis.database_interfaces.base_instaseis_db import \
-    _get_seismogram_times
-from instaseis import Source, Receiver, ForceSource
+    _get_seismogram_times, _lanczos_interpolation, INV_KIND_MAP, STF_MAP
+from instaseis.database_interfaces.base_netcdf_instaseis_db import (
+    Coordinates, ElementInfo)
+from instaseis import Source, Receiver, ForceSource, rotations
 from instaseis.helpers import (get_band_code, elliptic_to_geocentric_latitude,
                                geocentric_to_elliptic_latitude, sizeof_fmt)
 
@@ -1930,3 +1935,974 @@ def test_no_downsampling(bwd_db):
         "The database is sampled with a sample spacing of 24.725 seconds. You "
         "must not pass a 'dt' larger than that as that would be a "
         "downsampling operation which Instaseis does not do.")
+
+
+@pytest.mark.parametrize("db", DBS + [
+    os.path.join(DATA, "100s_db_bwd_strain_only")])
+def test_get_seismograms_many(db):
+    """
+    Batched extraction must give the same result as extracting each
+    receiver separately.
+    """
+    instaseis_db = instaseis.open_db(db, buffer_size_in_mb=0)
+    components = instaseis_db.available_components
+
+    src = Source(latitude=4., longitude=3.0, depth_in_m=None,
+                 m_rr=4.71e+17, m_tt=3.81e+15, m_pp=-4.74e+17,
+                 m_rt=3.99e+16, m_rp=-8.05e+16, m_tp=-1.23e+17)
+    # Includes a duplicate so at least two receivers share an element.
+    receivers = [Receiver(latitude=10.0 + _i * 3.0,
+                          longitude=20.0 - _i * 5.0,
+                          network="XX", station="S%i" % _i)
+                 for _i in range(6)]
+    receivers.append(Receiver(latitude=10.0, longitude=20.0,
+                              network="XX", station="DUP"))
+
+    for kwargs in [{}, {"dt": 3.0, "kind": "velocity"},
+                   {"remove_source_shift": False}]:
+        data = instaseis_db.get_seismograms_many(
+            source=src, receivers=receivers, components=components,
+            **kwargs)
+        assert data["mu"].shape == (len(receivers),)
+        for _i, rec in enumerate(receivers):
+            single = instaseis_db.get_seismograms(
+                source=src, receiver=rec, components=components,
+                return_obspy_stream=False, **kwargs)
+            assert data["mu"][_i] == single["mu"]
+            for comp in components:
+                assert data[comp].shape[0] == len(receivers)
+                np.testing.assert_allclose(data[comp][_i], single[comp],
+                                           rtol=1E-7, atol=1E-30)
+
+
+@pytest.mark.parametrize("db", BW_DISPL_DBS)
+def test_get_seismograms_many_force_source(db):
+    """
+    Batched extraction for force sources.
+    """
+    instaseis_db = instaseis.open_db(db)
+    components = [_i for _i in "ZNERT"
+                  if _i in instaseis_db.available_components]
+
+    src = ForceSource(latitude=4., longitude=3.0, f_r=1E10, f_t=2E10,
+                      f_p=3E10)
+    receivers = [Receiver(latitude=10.0 + _i * 3.0,
+                          longitude=20.0 - _i * 5.0)
+                 for _i in range(4)]
+
+    data = instaseis_db.get_seismograms_many(
+        source=src, receivers=receivers, components=components)
+    for _i, rec in enumerate(receivers):
+        single = instaseis_db.get_seismograms(
+            source=src, receiver=rec, components=components,
+            return_obspy_stream=False)
+        for comp in components:
+            np.testing.assert_allclose(data[comp][_i], single[comp],
+                                       rtol=1E-7, atol=1E-30)
+
+
+def test_lanczos_interpolation_of_many_rows():
+    """
+    Many rows are resampled at once and must be identical to resampling
+    each row on its own.
+    """
+    data = np.random.RandomState(12345).randn(2, 30, 500)
+    for new_start, new_dt, new_npts, kernelwidth in (
+            (0.0, 1.0, 997, 12), (3.3, 0.7, 1400, 12), (10.2, 6.1, 150, 5),
+            (0.0, 2.0, 500, 1)):
+        kwargs = {"old_dt": 2.0, "new_start": new_start, "new_dt": new_dt,
+                  "new_npts": new_npts, "kernelwidth": kernelwidth}
+        resampled = _lanczos_interpolation(data=data, **kwargs)
+        assert resampled.shape == (2, 30, new_npts)
+        for _i in range(2):
+            for _j in range(30):
+                np.testing.assert_allclose(
+                    resampled[_i, _j],
+                    _lanczos_interpolation(data=data[_i, _j], **kwargs),
+                    rtol=1E-12, atol=1E-12)
+
+
+def test_get_seismograms_many_failures():
+    """
+    Tests the error handling of the batched extraction.
+    """
+    db = instaseis.open_db(os.path.join(DATA, "100s_db_bwd_displ_only"))
+    src = Source(latitude=4., longitude=3.0, depth_in_m=None,
+                 m_rr=4.71e+17, m_tt=3.81e+15, m_pp=-4.74e+17,
+                 m_rt=3.99e+16, m_rp=-8.05e+16, m_tp=-1.23e+17)
+
+    with pytest.raises(ValueError) as err:
+        db.get_seismograms_many(source=src, receivers=[])
+    assert err.value.args[0] == "At least one receiver is required."
+
+    # The receiver depth must be checked for all receivers, not just the
+    # first one.
+    db = instaseis.open_db(os.path.join(DATA, "100s_db_fwd"))
+    receivers = [Receiver(latitude=10.0, longitude=20.0),
+                 Receiver(latitude=10.0, longitude=20.0,
+                          depth_in_m=1000000)]
+    with pytest.raises(ValueError) as err:
+        db.get_seismograms_many(source=src, receivers=receivers)
+    assert err.value.args[0].startswith("Receiver too deep.")
+
+
+@pytest.mark.parametrize("db", [_i for _i in DBS if "fwd" not in _i])
+def test_unbuffered_strain_at_point(db):
+    """
+    Without a buffer the strain is only evaluated at the point of interest.
+    Must give the same result as the buffered path.
+    """
+    unbuffered_db = instaseis.open_db(db, buffer_size_in_mb=0)
+    buffered_db = instaseis.open_db(db, buffer_size_in_mb=10)
+    components = unbuffered_db.available_components
+
+    src = Source(latitude=4., longitude=3.0, depth_in_m=None,
+                 m_rr=4.71e+17, m_tt=3.81e+15, m_pp=-4.74e+17,
+                 m_rt=3.99e+16, m_rp=-8.05e+16, m_tp=-1.23e+17)
+    for rec in [Receiver(latitude=10., longitude=20.),
+                Receiver(latitude=89.9, longitude=20.),
+                Receiver(latitude=4.0, longitude=3.0)]:
+        unbuffered = unbuffered_db.get_seismograms(
+            source=src, receiver=rec, components=components,
+            return_obspy_stream=False)
+        buffered = buffered_db.get_seismograms(
+            source=src, receiver=rec, components=components,
+            return_obspy_stream=False)
+        for comp in components:
+            np.testing.assert_allclose(
+                unbuffered[comp], buffered[comp], rtol=1E-7,
+                atol=1E-7 * np.abs(buffered[comp]).max())
+
+
+@pytest.mark.parametrize("db", DBS + [
+    os.path.join(DATA, "100s_db_bwd_strain_only")])
+def test_concurrent_extraction(db):
+    """
+    Extract seismograms from a single database object in many threads at
+    once and compare to the serially extracted ones. The buffer is small so
+    elements are constantly added and removed.
+    """
+    instaseis_db = instaseis.open_db(db, buffer_size_in_mb=0.5)
+    components = instaseis_db.available_components
+
+    rng = np.random.RandomState(12345)
+    pairs = []
+    for _ in range(20):
+        src = Source(latitude=rng.uniform(-10, 10),
+                     longitude=rng.uniform(-10, 10),
+                     m_rr=4.71e+17, m_tt=3.81e+15, m_pp=-4.74e+17,
+                     m_rt=3.99e+16, m_rp=-8.05e+16, m_tp=-1.23e+17)
+        rec = Receiver(latitude=rng.uniform(0, 30),
+                       longitude=rng.uniform(0, 30))
+        pairs.append((src, rec))
+
+    def extract(src, rec):
+        return instaseis_db.get_seismograms(
+            source=src, receiver=rec, components=components,
+            return_obspy_stream=False)
+
+    expected = [extract(*_i) for _i in pairs]
+
+    results = {}
+    errors = []
+
+    def work(thread_id):
+        try:
+            order = np.random.RandomState(thread_id).permutation(len(pairs))
+            for _i in order:
+                results[(thread_id, _i)] = extract(*pairs[_i])
+        except Exception as e:  # pragma: no cover
+            errors.append(e)
+
+    threads = [threading.Thread(target=work, args=(_i,)) for _i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert not errors
+    assert len(results) == 8 * len(pairs)
+    for (_, _i), data in results.items():
+        for comp in components:
+            np.testing.assert_array_equal(data[comp], expected[_i][comp])
+
+
+def _extract_in_child_process(db, src, rec, components, queue):
+    queue.put(instaseis.open_db(db).get_seismograms(
+        source=src, receiver=rec, components=components,
+        return_obspy_stream=False))
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="Requires os.fork().")
+@pytest.mark.parametrize("db", DBS + [
+    os.path.join(DATA, "100s_db_bwd_strain_only")])
+def test_shared_mesh_indices(db):
+    """
+    Databases opened after sharing the indices of a mesh reuse the very same
+    index objects - also in forked processes which reopen the files.
+    """
+    parent_db = instaseis.open_db(db)
+    components = parent_db.available_components
+    src = Source(latitude=4., longitude=3.0, depth_in_m=0.0,
+                 m_rr=4.71e+17, m_tt=3.81e+15, m_pp=-4.74e+17,
+                 m_rt=3.99e+16, m_rp=-8.05e+16, m_tp=-1.23e+17)
+    rec = Receiver(latitude=10., longitude=20.)
+    if not parent_db.info.is_reciprocal:
+        src.depth_in_m = parent_db.info.source_depth * 1000
+    expected = parent_db.get_seismograms(
+        source=src, receiver=rec, components=components,
+        return_obspy_stream=False)
+
+    try:
+        for m in parent_db.meshes:
+            if m is not None:
+                mesh.share_indices(m)
+
+        new_db = instaseis.open_db(db)
+        assert new_db.parsed_mesh.kdtree is parent_db.parsed_mesh.kdtree
+        assert new_db.parsed_mesh.mesh is parent_db.parsed_mesh.mesh
+        assert new_db.parsed_mesh.f is not parent_db.parsed_mesh.f
+        assert not new_db.parsed_mesh.mesh.flags.writeable
+        if parent_db.info.dump_type == "displ_only":
+            assert new_db.parsed_mesh.sem_mesh is \
+                parent_db.parsed_mesh.sem_mesh
+
+        data = new_db.get_seismograms(
+            source=src, receiver=rec, components=components,
+            return_obspy_stream=False)
+        for comp in components:
+            np.testing.assert_array_equal(data[comp], expected[comp])
+
+        # Python 2 always forks.
+        if hasattr(multiprocessing, "get_context"):
+            ctx = multiprocessing.get_context("fork")
+        else:  # pragma: no cover
+            ctx = multiprocessing
+        queue = ctx.Queue()
+        p = ctx.Process(target=_extract_in_child_process,
+                        args=(db, src, rec, components, queue))
+        p.start()
+        data = queue.get(timeout=60)
+        p.join()
+        assert p.exitcode == 0
+        for comp in components:
+            np.testing.assert_array_equal(data[comp], expected[comp])
+    finally:
+        mesh.clear_shared_indices()
+
+
+@pytest.mark.parametrize("db", DBS + [
+    os.path.join(DATA, "100s_db_bwd_strain_only")])
+def test_shared_buffers(db):
+    """
+    Extraction with buffers in shared memory yields the same results.
+    """
+    reference_db = instaseis.open_db(db, buffer_size_in_mb=0)
+    components = reference_db.available_components
+    src = Source(latitude=4., longitude=3.0, depth_in_m=0.0,
+                 m_rr=4.71e+17, m_tt=3.81e+15, m_pp=-4.74e+17,
+                 m_rt=3.99e+16, m_rp=-8.05e+16, m_tp=-1.23e+17)
+    if not reference_db.info.is_reciprocal:
+        src.depth_in_m = reference_db.info.source_depth * 1000
+    receivers = [Receiver(latitude=10., longitude=20.),
+                 Receiver(latitude=10.1, longitude=20.1)]
+
+    try:
+        for m in reference_db.meshes:
+            if m is not None:
+                shared_buffer.share_buffers(m.filename, 2)
+
+        buffered_db = instaseis.open_db(db, buffer_size_in_mb=2)
+        for m in buffered_db.meshes:
+            if m is None:
+                continue
+            assert isinstance(m.displ_buffer,
+                              shared_buffer.SharedMemoryBuffer)
+        # Twice to also read from the buffers.
+        for _ in range(2):
+            for rec in receivers:
+                expected = reference_db.get_seismograms(
+                    source=src, receiver=rec, components=components,
+                    return_obspy_stream=False)
+                data = buffered_db.get_seismograms(
+                    source=src, receiver=rec, components=components,
+                    return_obspy_stream=False)
+                for comp in components:
+                    np.testing.assert_allclose(
+                        data[comp], expected[comp], rtol=1E-7,
+                        atol=1E-7 * np.abs(expected[comp]).max())
+        assert any(m.displ_buffer.efficiency > 0 or
+                   m.strain_buffer.efficiency > 0
+                   for m in buffered_db.meshes if m is not None)
+    finally:
+        shared_buffer.clear_shared_buffers()
+
+
+@pytest.mark.parametrize("db", [_i for _i in DBS if "bwd" in _i or
+                                "horizontal_only" in _i or
+                                "vertical_only" in _i])
+def test_strain_cache(db, tmpdir):
+    """
+    The on-disk strain cache yields the same results and is used by newly
+    opened databases.
+    """
+    reference_db = instaseis.open_db(db, buffer_size_in_mb=0)
+    components = reference_db.available_components
+    src = Source(latitude=4., longitude=3.0, depth_in_m=0.0,
+                 m_rr=4.71e+17, m_tt=3.81e+15, m_pp=-4.74e+17,
+                 m_rt=3.99e+16, m_rp=-8.05e+16, m_tp=-1.23e+17)
+    rec = Receiver(latitude=10., longitude=20.)
+    expected = reference_db.get_seismograms(
+        source=src, receiver=rec, components=components,
+        return_obspy_stream=False)
+
+    for _ in range(2):
+        cached_db = instaseis.open_db(db, buffer_size_in_mb=0,
+                                      strain_cache_dir=tmpdir.strpath)
+        data = cached_db.get_seismograms(
+            source=src, receiver=rec, components=components,
+            return_obspy_stream=False)
+        for comp in components:
+            np.testing.assert_allclose(
+                data[comp], expected[comp], rtol=1E-7,
+                atol=1E-7 * np.abs(expected[comp]).max())
+
+    # The second database read everything from the cache.
+    # One cache per netCDF file.
+    caches = list(cached_db._strain_caches.values())
+    assert caches
+    for cache in caches:
+        assert cache.efficiency == 1.0
+        assert cache.get_size_mb() > 0
+
+
+@pytest.mark.parametrize("db", DBS + [
+    os.path.join(DATA, "100s_db_bwd_strain_only")])
+def test_index_cache(db, tmpdir):
+    """
+    The mesh indices are stored next to the netCDF files and memory mapped
+    on the next opening.
+    """
+    db_path = os.path.join(tmpdir.strpath, "db")
+    shutil.copytree(db, db_path)
+
+    reference_db = instaseis.open_db(db_path)
+    components = reference_db.available_components
+    src = Source(latitude=4., longitude=3.0, depth_in_m=0.0,
+                 m_rr=4.71e+17, m_tt=3.81e+15, m_pp=-4.74e+17,
+                 m_rt=3.99e+16, m_rp=-8.05e+16, m_tp=-1.23e+17)
+    rec = Receiver(latitude=10., longitude=20.)
+    if not reference_db.info.is_reciprocal:
+        src.depth_in_m = reference_db.info.source_depth * 1000
+    expected = reference_db.get_seismograms(
+        source=src, receiver=rec, components=components,
+        return_obspy_stream=False)
+
+    # First one writes the cache, second one reads it.
+    for _i in range(2):
+        cached_db = instaseis.open_db(db_path, index_cache=True)
+        m = cached_db.parsed_mesh
+        assert isinstance(m.mesh, np.memmap) == bool(_i)
+        if m.dump_type == "displ_only":
+            assert isinstance(m.sem_mesh, np.memmap) == bool(_i)
+        np.testing.assert_array_equal(m.mesh, reference_db.parsed_mesh.mesh)
+        np.testing.assert_array_equal(m.kdtree.data,
+                                      reference_db.parsed_mesh.kdtree.data)
+        data = cached_db.get_seismograms(
+            source=src, receiver=rec, components=components,
+            return_obspy_stream=False)
+        for comp in components:
+            np.testing.assert_array_equal(data[comp], expected[comp])
+
+    # Nothing is pickled.
+    sidecar = m.filename + ".index_cache"
+    old_cache = os.listdir(sidecar)
+    assert len(old_cache) == 1
+    assert all(_i.endswith(".npy") for _i in
+               os.listdir(os.path.join(sidecar, old_cache[0])))
+
+    # The same file opened via another path uses the same cache.
+    link_path = os.path.join(tmpdir.strpath, "link")
+    os.symlink(db_path, link_path)
+    cached_db = instaseis.open_db(link_path, index_cache=True)
+    assert isinstance(cached_db.parsed_mesh.mesh, np.memmap)
+    assert os.listdir(sidecar) == old_cache
+
+    # Modifying the file invalidates the cache. Caches of the current
+    # version might still be in use by other processes and are kept, older
+    # versions are removed.
+    os.makedirs(os.path.join(sidecar, "v0_abc"))
+    st = os.stat(m.filename)
+    os.utime(m.filename, (st.st_atime, st.st_mtime + 10))
+    cached_db = instaseis.open_db(db_path, index_cache=True)
+    assert not isinstance(cached_db.parsed_mesh.mesh, np.memmap)
+    new_cache = sorted(os.listdir(sidecar))
+    assert len(new_cache) == 2
+    assert old_cache[0] in new_cache
+
+
+def test_paged_mesh():
+    """
+    The page cache used for the read on demand mode returns the same
+    values as reading from the file and respects its memory limit.
+    """
+    db = instaseis.open_db(os.path.join(DATA, "100s_db_bwd_displ_only"),
+                           read_on_demand=True, page_cache_size_in_mb=0.1)
+    paged = db.parsed_mesh.paged_mesh
+    group = db.parsed_mesh.f["Mesh"]
+
+    rng = np.random.RandomState(12345)
+    for name in ("fem_mesh", "eltype", "mesh_S", "mesh_Z", "sem_mesh",
+                 "axis", "mesh_mu"):
+        ds = group[name]
+        for idx in rng.randint(0, ds.shape[0], 20):
+            np.testing.assert_array_equal(paged[name][idx], ds[idx])
+        idx = rng.randint(0, ds.shape[0], 30)
+        np.testing.assert_array_equal(paged[name][idx],
+                                      ds[:][idx])
+        assert paged[name][idx].dtype == ds.dtype
+
+    assert paged.pages.get_size_mb() <= 0.1
+    assert paged.pages.efficiency > 0.0
+
+
+@pytest.mark.parametrize("db", DBS)
+def test_element_info_cache(db, tmpdir):
+    """
+    Repeated geometries are served from the element location cache which
+    can be written to and initialized from a file.
+    """
+    reference_db = instaseis.open_db(db)
+    components = reference_db.available_components
+    src = Source(latitude=4., longitude=3.0, depth_in_m=0.0,
+                 m_rr=4.71e+17, m_tt=3.81e+15, m_pp=-4.74e+17,
+                 m_rt=3.99e+16, m_rp=-8.05e+16, m_tp=-1.23e+17)
+    receivers = [Receiver(latitude=10., longitude=20.),
+                 Receiver(latitude=-5., longitude=40.)]
+    expected = [reference_db.get_seismograms(
+        source=src, receiver=rec, components=components,
+        return_obspy_stream=False) for rec in receivers]
+
+    filename = os.path.join(tmpdir.strpath, "element_info_cache.npz")
+    cached_db = instaseis.open_db(db, element_info_cache_size_in_mb=1,
+                                  element_info_cache_file=filename)
+    assert reference_db.element_info_cache is None
+    for _ in range(2):
+        for rec, exp in zip(receivers, expected):
+            data = cached_db.get_seismograms(
+                source=src, receiver=rec, components=components,
+                return_obspy_stream=False)
+            for comp in components:
+                np.testing.assert_allclose(data[comp], exp[comp])
+    cache = cached_db.element_info_cache
+    assert len(cache) == 2
+    assert (cache.hits, cache.misses) == (2, 2)
+    assert cache.efficiency == 0.5
+    cached_db.save_element_info_cache()
+
+    # The next instance starts with the cache from the file.
+    cached_db = instaseis.open_db(db, element_info_cache_size_in_mb=1,
+                                  element_info_cache_file=filename)
+    for rec, exp in zip(receivers, expected):
+        data = cached_db.get_seismograms(
+            source=src, receiver=rec, components=components,
+            return_obspy_stream=False)
+        for comp in components:
+            np.testing.assert_allclose(data[comp], exp[comp])
+    assert cached_db.element_info_cache.efficiency == 1.0
+
+    # Caches of other meshes are not loaded.
+    other = [_i for _i in DBS if _i != db][0]
+    other_db = instaseis.open_db(other, element_info_cache_size_in_mb=1,
+                                 element_info_cache_file=filename)
+    assert len(other_db.element_info_cache) == 0
+
+    # Stored without pickle. Unreadable files are ignored.
+    with np.load(filename, allow_pickle=False) as f:
+        assert len(f["keys"]) == 2
+    with open(filename, "wb") as fh:
+        fh.write(b"1234")
+    cached_db = instaseis.open_db(db, element_info_cache_size_in_mb=1,
+                                  element_info_cache_file=filename)
+    assert len(cached_db.element_info_cache) == 0
+
+
+@pytest.mark.parametrize("db", DBS)
+def test_get_element_info_many(db):
+    """
+    Locating many points at once yields the same as locating them one by
+    one.
+    """
+    db = instaseis.open_db(db)
+    np.random.seed(12345)
+    lat = np.random.uniform(-89, 89, 50)
+    lng = np.random.uniform(-180, 180, 50)
+    src = Source(latitude=4., longitude=3.0, depth_in_m=0.0)
+    planet_radius = db.info.planet_radius
+    coordinates = Coordinates(*rotations.rotate_frame_rd(
+        src.x(planet_radius=planet_radius),
+        src.y(planet_radius=planet_radius),
+        src.z(planet_radius=planet_radius), lng, 90.0 - lat))
+
+    element_infos = db._get_element_info_many(coordinates=coordinates)
+    for _i, ei in enumerate(element_infos):
+        expected = db._get_element_info(coordinates=Coordinates(
+            s=coordinates.s[_i], phi=coordinates.phi[_i],
+            z=coordinates.z[_i]))
+        for name in ElementInfo._fields:
+            np.testing.assert_array_equal(getattr(ei, name),
+                                          getattr(expected, name))
+
+
+def test_spectral_cache():
+    """
+    The spectra used to reconvolve source time functions are computed once
+    per source time function and time shift and are read-only.
+    """
+    from obspy.signal.filter import lowpass
+    db = instaseis.open_db(os.path.join(DATA, "100s_db_bwd_displ_only"))
+
+    # All threads get the same cache.
+    caches = []
+    threads = [threading.Thread(
+        target=lambda: caches.append(db._spectral_cache)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(set(id(_i) for _i in caches + [db._spectral_cache])) == 1
+
+    receiver = Receiver(latitude=42.6390, longitude=74.4940)
+    dt = db.info.dt
+    sliprate = np.zeros(1000)
+    sliprate[0] = 1.
+    sliprate = lowpass(sliprate, 1. / 100., 1. / dt, corners=4)
+
+    def _get_source(latitude, time_shift):
+        source = Source(latitude=latitude, longitude=12., depth_in_m=1000,
+                        m_rr=4.71e+17, m_tt=3.81e+15, m_pp=-4.74e+17,
+                        m_rt=3.99e+16, m_rp=-8.05e+16, m_tp=-1.23e+17)
+        source.set_sliprate(sliprate, dt, time_shift=time_shift,
+                            normalize=True)
+        return source
+
+    def _get_filter_keys():
+        return [_i for _i in db._spectral_cache._buffer
+                if _i[0] == "filter"]
+
+    st = db.get_seismograms(source=_get_source(10., 0.), receiver=receiver,
+                            reconvolve_stf=True, remove_source_shift=False)
+    assert len(_get_filter_keys()) == 1
+
+    # Same source time function - the filter is reused and the result
+    # does not change.
+    st_2 = db.get_seismograms(source=_get_source(10., 0.), receiver=receiver,
+                              reconvolve_stf=True, remove_source_shift=False)
+    db.get_seismograms(source=_get_source(20., 0.), receiver=receiver,
+                       reconvolve_stf=True, remove_source_shift=False)
+    assert len(_get_filter_keys()) == 1
+    for tr, tr_2 in zip(st, st_2):
+        np.testing.assert_array_equal(tr.data, tr_2.data)
+
+    # A different time shift requires a new one.
+    db.get_seismograms(source=_get_source(10., 10.), receiver=receiver,
+                       reconvolve_stf=True, remove_source_shift=False)
+    assert len(_get_filter_keys()) == 2
+
+    f = db._get_stf_reconvolution_filter(_get_source(10., 0.))
+    assert not f.flags.writeable
+
+
+def test_finite_source_frequency_domain_summation():
+    """
+    Summing the spectra of all point sources and transforming once yields
+    the same as summing the reconvolved seismograms of all point sources.
+    """
+    from obspy.signal.filter import lowpass
+    db = instaseis.open_db(os.path.join(DATA, "100s_db_bwd_displ_only"))
+    receiver = Receiver(latitude=42.6390, longitude=74.4940)
+    dt = db.info.dt
+    components = ("Z", "N", "E", "R", "T")
+
+    sources = []
+    for _i in range(5):
+        source = Source(latitude=10. + _i * 0.1, longitude=12.,
+                        depth_in_m=1000 + _i * 2000,
+                        m_rr=4.71e+17, m_tt=3.81e+15, m_pp=-4.74e+17,
+                        m_rt=3.99e+16, m_rp=-8.05e+16, m_tp=-1.23e+17)
+        sliprate = np.zeros(1000)
+        sliprate[0] = 1.
+        sliprate = lowpass(sliprate, 1. / (100. + 10 * _i), 1. / dt,
+                           corners=4)
+        source.set_sliprate(sliprate, dt, time_shift=_i * 15.0,
+                            normalize=True)
+        sources.append(source)
+
+    expected = {}
+    for source in sources:
+        data = db.get_seismograms(
+            source=source, receiver=receiver, components=components,
+            reconvolve_stf=True, remove_source_shift=False,
+            return_obspy_stream=False,
+            kind=INV_KIND_MAP[STF_MAP[db.info.stf]])
+        for comp in components:
+            expected[comp] = expected.get(comp, 0) + data[comp]
+
+    st = db.get_seismograms_finite_source(
+        sources=sources, receiver=receiver, components=components)
+    for comp in components:
+        np.testing.assert_allclose(
+            st.select(component=comp)[0].data, expected[comp],
+            rtol=1E-7, atol=1E-7 * np.abs(expected[comp]).max())
+
+
+def test_finite_source_with_force_sources():
+    """
+    Force sources require one more time derivative than moment tensor
+    sources. Finite sources made of them, also mixed with moment tensor
+    sources, must be the sum of the single seismograms.
+    """
+    import concurrent.futures
+    from obspy.signal.filter import lowpass
+    db = instaseis.open_db(os.path.join(DATA, "100s_db_bwd_displ_only"))
+    receiver = Receiver(latitude=42.6390, longitude=74.4940)
+    components = ("Z", "N", "E")
+    dt = db.info.dt
+    sliprate = np.zeros(db.info.npts)
+    sliprate[0] = 1.0 / dt
+    sliprate = lowpass(sliprate, 1.0 / 200.0, 1.0 / dt, corners=4)
+
+    forces = []
+    for _i in range(3):
+        source = ForceSource(latitude=10. + _i * 0.5, longitude=12.,
+                             depth_in_m=1000 + _i * 2000, f_r=1.23E10,
+                             f_t=2.55E10 * (_i + 1), f_p=1.73E10,
+                             sliprate=sliprate)
+        source.dt = dt
+        source.time_shift = _i * 5 * dt
+        forces.append(source)
+    moment_tensor = Source(latitude=11., longitude=13., depth_in_m=3000,
+                           m_rr=4.71e+17, m_tt=3.81e+15, m_pp=-4.74e+17,
+                           m_rt=3.99e+16, m_rp=-8.05e+16, m_tp=-1.23e+17,
+                           sliprate=sliprate, dt=dt)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+        for sources in (forces, forces + [moment_tensor]):
+            for kind in ("displacement", "velocity"):
+                expected = {}
+                for source in sources:
+                    data = db.get_seismograms(
+                        source=source, receiver=receiver,
+                        components=components, reconvolve_stf=True,
+                        remove_source_shift=False, return_obspy_stream=False,
+                        kind=kind)
+                    for comp in components:
+                        expected[comp] = expected.get(comp, 0) + data[comp]
+
+                for kwargs in ({}, {"workers": 2, "executor": executor}):
+                    st = db.get_seismograms_finite_source(
+                        sources=sources, receiver=receiver,
+                        components=components, kind=kind, **kwargs)
+                    for comp in components:
+                        np.testing.assert_allclose(
+                            st.select(component=comp)[0].data,
+                            expected[comp], rtol=1E-7,
+                            atol=1E-7 * np.abs(expected[comp]).max())
+
+
+def test_finite_source_grouped_by_element():
+    """
+    Point sources are processed grouped by element so each element is only
+    read once even without a buffer and independent of their order.
+    """
+    db = instaseis.open_db(os.path.join(DATA, "100s_db_bwd_displ_only"),
+                           buffer_size_in_mb=0)
+    receiver = Receiver(latitude=42.6390, longitude=74.4940)
+    components = ("Z", "N", "E")
+
+    # Alternate between two elements.
+    sources = []
+    for _i in range(10):
+        source = Source(latitude=10. + (_i % 2) * 20.0 + _i * 1E-4,
+                        longitude=12., depth_in_m=1000,
+                        m_rr=4.71e+17, m_tt=3.81e+15, m_pp=-4.74e+17,
+                        m_rt=3.99e+16, m_rp=-8.05e+16, m_tp=-1.23e+17)
+        source.set_sliprate_lp(dt=db.info.dt, nsamp=db.info.npts,
+                               freq=1.0 / 200.0)
+        source.time_shift = _i * db.info.dt
+        sources.append(source)
+
+    expected = {}
+    for source in sources:
+        data = db.get_seismograms(
+            source=source, receiver=receiver, components=components,
+            reconvolve_stf=True, remove_source_shift=False,
+            return_obspy_stream=False,
+            kind=INV_KIND_MAP[STF_MAP[db.info.stf]])
+        for comp in components:
+            expected[comp] = expected.get(comp, 0) + data[comp]
+
+    reads = []
+    read_element_displacement = db._read_element_displacement
+
+    def _read(mesh, gll_point_ids):
+        reads.append((mesh.filename, gll_point_ids[0, 0]))
+        return read_element_displacement(mesh, gll_point_ids)
+
+    db._read_element_displacement = _read
+    progress = []
+    st = db.get_seismograms_finite_source(
+        sources=sources, receiver=receiver, components=components,
+        progress_callback=lambda i, n: progress.append((i, n)))
+
+    # Two elements in two files.
+    assert len(reads) == len(set(reads)) == 4
+    assert progress == [(_i, 10) for _i in range(1, 11)]
+    for comp in components:
+        np.testing.assert_allclose(
+            st.select(component=comp)[0].data, expected[comp],
+            rtol=1E-7, atol=1E-7 * np.abs(expected[comp]).max())
+
+    # Cancelling still works.
+    assert db.get_seismograms_finite_source(
+        sources=sources, receiver=receiver, components=components,
+        progress_callback=lambda i, n: i == 3) is None
+
+
+def test_finite_source_parallel():
+    """
+    The parallel finite source engine yields the same as the serial one and
+    still reports progress and can be cancelled.
+    """
+    import concurrent.futures
+    db = instaseis.open_db(os.path.join(DATA, "100s_db_bwd_displ_only"))
+    receiver = Receiver(latitude=42.6390, longitude=74.4940)
+    components = ("Z", "N", "E")
+
+    sources = []
+    for _i in range(20):
+        source = Source(latitude=10. + (_i % 5) * 2.0,
+                        longitude=12. + (_i // 5) * 2.0,
+                        depth_in_m=1000 + _i * 500,
+                        m_rr=4.71e+17, m_tt=3.81e+15, m_pp=-4.74e+17,
+                        m_rt=3.99e+16, m_rp=-8.05e+16, m_tp=-1.23e+17)
+        source.set_sliprate_lp(dt=db.info.dt, nsamp=db.info.npts,
+                               freq=1.0 / 200.0)
+        source.time_shift = _i * db.info.dt
+        sources.append(source)
+
+    expected = db.get_seismograms_finite_source(
+        sources=sources, receiver=receiver, components=components)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+        for kwargs in ({"workers": 2}, {"workers": 3, "executor": executor},
+                       {"executor": executor}):
+            progress = []
+            st = db.get_seismograms_finite_source(
+                sources=sources, receiver=receiver, components=components,
+                progress_callback=lambda i, n: progress.append((i, n)),
+                **kwargs)
+            for comp in components:
+                e = expected.select(component=comp)[0].data
+                np.testing.assert_allclose(
+                    st.select(component=comp)[0].data, e, rtol=1E-7,
+                    atol=1E-7 * np.abs(e).max())
+            assert progress[-1] == (20, 20)
+            assert [_i[0] for _i in progress] == \
+                sorted(set(_i[0] for _i in progress))
+
+        # Cancelling after the first chunk.
+        assert db.get_seismograms_finite_source(
+            sources=sources, receiver=receiver, components=components,
+            progress_callback=lambda i, n: True, workers=2,
+            executor=executor) is None
+
+
+@pytest.mark.parametrize("db", DBS + [
+    os.path.join(DATA, "100s_db_bwd_strain_only")])
+def test_get_moment_tensor_kernels(db):
+    """
+    Any moment tensor seismogram must be the linear combination of the
+    moment tensor kernels.
+    """
+    instaseis_db = instaseis.open_db(db, buffer_size_in_mb=0)
+    components = instaseis_db.available_components
+
+    src = Source(latitude=4., longitude=3.0, depth_in_m=None,
+                 m_rr=4.71e+17, m_tt=3.81e+15, m_pp=-4.74e+17,
+                 m_rt=3.99e+16, m_rp=-8.05e+16, m_tp=-1.23e+17)
+    rec = Receiver(latitude=10., longitude=20.)
+
+    for kwargs in [{}, {"dt": 3.0, "kind": "velocity"},
+                   {"remove_source_shift": False}]:
+        kernels = instaseis_db.get_moment_tensor_kernels(
+            source=src, receiver=rec, components=components, **kwargs)
+        st = instaseis_db.get_seismograms(
+            source=src, receiver=rec, components=components, **kwargs)
+        assert kernels.shape == (6, len(components), st[0].stats.npts)
+        data = np.tensordot(src.tensor, kernels, axes=1)
+        for _i, comp in enumerate(components):
+            expected = st.select(component=comp)[0].data
+            np.testing.assert_allclose(
+                data[_i], expected, rtol=1E-7,
+                atol=1E-7 * np.abs(expected).max())
+
+    # Only works for moment tensor sources.
+    with pytest.raises(ValueError) as err:
+        instaseis_db.get_moment_tensor_kernels(
+            source=ForceSource(latitude=4., longitude=3.0, f_r=1E10),
+            receiver=rec, components=components)
+    assert err.value.args[0] == ("Moment tensor kernels can only be "
+                                 "calculated for moment tensor sources.")
+
+
+@pytest.mark.parametrize("db", BW_DISPL_DBS + [
+    os.path.join(DATA, "100s_db_bwd_strain_only")])
+def test_scan_source_grid(db):
+    """
+    Scanning a source grid must give the same kernels as extracting them
+    for each location and receiver separately.
+    """
+    instaseis_db = instaseis.open_db(db, buffer_size_in_mb=0)
+    components = instaseis_db.available_components
+
+    sources = [Source(latitude=lat, longitude=lng, depth_in_m=depth)
+               for depth in (10000.0, 50000.0)
+               for lat in (4.0, 5.0, 6.0)
+               for lng in (3.0, 3.5)]
+    receivers = [Receiver(latitude=10.0, longitude=20.0),
+                 Receiver(latitude=-30.0, longitude=40.0)]
+
+    kwargs = {"dt": 3.0, "kind": "velocity"}
+    results = list(instaseis_db.scan_source_grid(
+        sources=sources, receivers=receivers, components=components,
+        **kwargs))
+    assert sorted(_i[0] for _i in results) == list(range(len(sources)))
+    for index, kernels in results:
+        for _r, rec in enumerate(receivers):
+            expected = instaseis_db.get_moment_tensor_kernels(
+                source=sources[index], receiver=rec, components=components,
+                **kwargs)
+            assert kernels[_r].shape == expected.shape
+            np.testing.assert_allclose(kernels[_r], expected, rtol=1E-7,
+                                       atol=1E-7 * np.abs(expected).max())
+
+    # Only the return values of the misfit function are returned.
+    results = dict(instaseis_db.scan_source_grid(
+        sources=sources, receivers=receivers, components=components,
+        misfit=lambda src, k: (src.depth_in_m, k.shape), **kwargs))
+    assert len(results) == len(sources)
+    for index, value in results.items():
+        assert value[0] == sources[index].depth_in_m
+        assert value[1][:3] == (2, 6, len(components))
+
+
+def test_scan_source_grid_failures():
+    """
+    Tests the failures of scanning source grids.
+    """
+    receiver = Receiver(latitude=10.0, longitude=20.0)
+
+    db = instaseis.open_db(os.path.join(DATA, "100s_db_fwd"))
+    with pytest.raises(ValueError) as err:
+        db.scan_source_grid(sources=[Source(latitude=4.0, longitude=3.0)],
+                            receivers=[receiver])
+    assert err.value.args[0] == ("forward DB cannot be used with "
+                                 "scan_source_grid()")
+
+    db = instaseis.open_db(os.path.join(DATA, "100s_db_bwd_displ_only"))
+    with pytest.raises(ValueError) as err:
+        db.scan_source_grid(
+            sources=[ForceSource(latitude=4.0, longitude=3.0)],
+            receivers=[receiver])
+    assert err.value.args[0] == ("Source grids can only consist of moment "
+                                 "tensor sources.")
+
+    # Checked before the generator is returned.
+    with pytest.raises(ValueError):
+        db.scan_source_grid(
+            sources=[Source(latitude=4.0, longitude=3.0,
+                            depth_in_m=1E9)],
+            receivers=[receiver])
+
+
+@pytest.mark.parametrize("db", DBS + [
+    os.path.join(DATA, "100s_db_bwd_strain_only")])
+def test_get_seismograms_time_window(db):
+    """
+    Extracting a time window must give the same samples as trimming the
+    full seismograms.
+    """
+    instaseis_db = instaseis.open_db(db, buffer_size_in_mb=0)
+    components = instaseis_db.available_components
+    dt = instaseis_db.info.dt
+
+    src = Source(latitude=4., longitude=3.0, depth_in_m=None,
+                 m_rr=4.71e+17, m_tt=3.81e+15, m_pp=-4.74e+17,
+                 m_rt=3.99e+16, m_rp=-8.05e+16, m_tp=-1.23e+17)
+    rec = Receiver(latitude=10., longitude=20.)
+
+    for kwargs in [{}, {"dt": dt / 3.3, "kind": "velocity"},
+                   {"dt": dt, "kind": "acceleration"},
+                   {"dt": dt / 5.0, "remove_source_shift": False}]:
+        full = instaseis_db.get_seismograms(
+            source=src, receiver=rec, components=components, **kwargs)
+        start = full[0].stats.starttime
+        end = full[0].stats.endtime
+        for starttime, endtime in [(start + 100.0, start + 600.3),
+                                   (start - 500.0, start + 200.0),
+                                   (end - 50.0, end + 500.0),
+                                   (start + 333.3, None),
+                                   (None, start + 333.3)]:
+            st = instaseis_db.get_seismograms(
+                source=src, receiver=rec, components=components,
+                starttime=starttime, endtime=endtime, **kwargs)
+            expected = full.slice(starttime, endtime, nearest_sample=False)
+            for tr, tr_expected in zip(st, expected):
+                assert tr.stats.starttime == tr_expected.stats.starttime
+                assert tr.stats.npts == tr_expected.stats.npts
+                np.testing.assert_allclose(
+                    tr.data, tr_expected.data, rtol=1E-9,
+                    atol=1E-9 * np.abs(tr_expected.data).max())
+
+    with pytest.raises(ValueError) as err:
+        instaseis_db.get_seismograms(
+            source=src, receiver=rec, components=components,
+            starttime=end + 1000.0)
+    assert err.value.args[0] == ("No samples of the seismograms are between "
+                                 "starttime and endtime.")
+
+
+def test_get_seismograms_time_window_partial_reads():
+    """
+    Only the required samples are read from time-major databases.
+    """
+    db = instaseis.open_db(os.path.join(DATA, "100s_db_bwd_displ_only"),
+                           buffer_size_in_mb=0)
+    src = Source(latitude=4., longitude=3.0, depth_in_m=None,
+                 m_rr=4.71e+17, m_tt=3.81e+15, m_pp=-4.74e+17,
+                 m_rt=3.99e+16, m_rp=-8.05e+16, m_tp=-1.23e+17)
+    rec = Receiver(latitude=10., longitude=20.)
+
+    reads = []
+    read_element_displacement = db._read_element_displacement
+
+    def _read(mesh, gll_point_ids, time_window=None):
+        reads.append(time_window)
+        return read_element_displacement(mesh, gll_point_ids,
+                                         time_window=time_window)
+
+    db._read_element_displacement = _read
+    full = db.get_seismograms(source=src, receiver=rec, components=["Z"],
+                              kind="velocity")
+    assert reads == [None]
+
+    reads = []
+    starttime = full[0].stats.starttime + 10 * db.info.dt
+    st = db.get_seismograms(source=src, receiver=rec, components=["Z"],
+                            kind="velocity", starttime=starttime,
+                            endtime=starttime + 4 * db.info.dt)
+    # One additional sample on each side for the differentiation.
+    assert reads == [(db.info.src_shift_samples + 9,
+                      db.info.src_shift_samples + 16)]
+    np.testing.assert_allclose(st[0].data, full[0].data[10:15])
@@ -12,8 +12,10 @@ Tests for the instaseis remote database.
 from __future__ import absolute_import
 
 import copy
+import json
 import numpy as np
 import responses
+import threading
 import warnings
 import pytest
 
@@ -135,6 +137,160 @@ def test_seismogram_extraction(all_remote_dbs):
     _compare_streams(r_db, l_db, kwargs)
 
 
+@responses.activate
+def test_get_seismograms_many(all_remote_dbs):
+    """
+    Seismograms for many receivers are downloaded with bulk requests and
+    must be identical to the ones of the local database.
+    """
+    r_db = all_remote_dbs
+    l_db = instaseis.open_db(r_db._client.filepath)
+    _add_callback(r_db._client)
+
+    source = instaseis.Source(
+        latitude=4., longitude=3.0, depth_in_m=0, m_rr=4.71e+17, m_tt=3.81e+17,
+        m_pp=-4.74e+17, m_rt=3.99e+17, m_rp=-8.05e+17, m_tp=-1.23e+17)
+    if not r_db.info.is_reciprocal:
+        source.depth_in_m = r_db.info.source_depth * 1000
+    receivers = [instaseis.Receiver(latitude=10. + _i, longitude=20. - _i)
+                 for _i in range(5)]
+    components = r_db.available_components
+
+    # Also test the splitting into several requests.
+    with mock.patch("instaseis.database_interfaces.remote_instaseis_db"
+                    ".BULK_REQUEST_SIZE", 2):
+        r_data = r_db.get_seismograms_many(
+            source=source, receivers=receivers, components=components,
+            kind="velocity")
+    l_data = l_db.get_seismograms_many(
+        source=source, receivers=receivers, components=components,
+        kind="velocity")
+
+    assert sorted(r_data.keys()) == sorted(l_data.keys())
+    np.testing.assert_allclose(r_data["mu"], l_data["mu"], rtol=1E-6)
+    for comp in components:
+        assert r_data[comp].shape == l_data[comp].shape
+        np.testing.assert_allclose(r_data[comp], l_data[comp],
+                                   atol=1E-6 * np.ptp(l_data[comp]))
+
+
+@responses.activate
+def test_seismogram_cache(all_remote_dbs, tmpdir):
+    """
+    Seismograms are cached on disc and repeated requests are served without
+    contacting the server.
+    """
+    r_db = all_remote_dbs
+    _add_callback(r_db._client)
+
+    db = instaseis.open_db(r_db.url, cache_dir=tmpdir.strpath, pool_size=2)
+    assert r_db.seismogram_cache is None
+    assert db.seismogram_cache is not None
+    assert db.pool_size == 2
+
+    source = instaseis.Source(
+        latitude=4., longitude=3.0, depth_in_m=0, m_rr=4.71e+17, m_tt=3.81e+17,
+        m_pp=-4.74e+17, m_rt=3.99e+17, m_rp=-8.05e+17, m_tp=-1.23e+17)
+    if not db.info.is_reciprocal:
+        source.depth_in_m = db.info.source_depth * 1000
+    receivers = [instaseis.Receiver(latitude=10. + _i, longitude=20. - _i)
+                 for _i in range(3)]
+
+    n_calls = len(responses.calls)
+    st = db.get_seismograms(source=source, receiver=receivers[0])
+    assert len(responses.calls) == n_calls + 1
+
+    # Cached - also for other instances using the same directory.
+    db = instaseis.open_db(r_db.url, cache_dir=tmpdir.strpath)
+    n_calls = len(responses.calls)
+    assert db.get_seismograms(source=source, receiver=receivers[0]) == st
+    assert len(responses.calls) == n_calls
+
+    # Bulk requests only download the missing seismograms.
+    data = db.get_seismograms_many(source=source, receivers=receivers)
+    assert len(responses.calls) == n_calls + 1
+    assert len(json.loads(responses.calls[-1].request.body)) == 2
+    cached = db.get_seismograms_many(source=source, receivers=receivers)
+    assert len(responses.calls) == n_calls + 1
+    for key, value in data.items():
+        np.testing.assert_array_equal(cached[key], value)
+
+    # The server's database is part of the key.
+    other = instaseis.open_db(r_db.url, cache_dir=tmpdir.strpath)
+    other.seismogram_cache.fingerprint = "other"
+    n_calls = len(responses.calls)
+    other.get_seismograms(source=source, receiver=receivers[0])
+    assert len(responses.calls) == n_calls + 1
+
+
+def test_get_seismograms_concurrently(all_remote_dbs):
+    """
+    Many seismograms are requested from a local server at the same time over
+    a pool of persistent connections and returned in order.
+    """
+    r_db = all_remote_dbs
+    l_db = instaseis.open_db(r_db._client.filepath)
+
+    adapter = r_db._session.get_adapter(r_db.url)
+    assert adapter._pool_maxsize == r_db.pool_size == 10
+
+    source = instaseis.Source(
+        latitude=4., longitude=3.0, depth_in_m=0, m_rr=4.71e+17, m_tt=3.81e+17,
+        m_pp=-4.74e+17, m_rt=3.99e+17, m_rp=-8.05e+17, m_tp=-1.23e+17)
+    if not l_db.info.is_reciprocal:
+        source.depth_in_m = l_db.info.source_depth * 1000
+    sources = [source] * 8
+    receivers = [instaseis.Receiver(latitude=10. + _i, longitude=20. - _i)
+                 for _i in range(8)]
+
+    lock = threading.Lock()
+    state = {"running": 0, "max_running": 0}
+    original = r_db._get_seismograms
+
+    def _get_seismograms(*args, **kwargs):
+        with lock:
+            state["running"] += 1
+            state["max_running"] = max(state["running"],
+                                       state["max_running"])
+        try:
+            return original(*args, **kwargs)
+        finally:
+            with lock:
+                state["running"] -= 1
+
+    # Real HTTP requests to the local server. Its IOLoop runs in another
+    # thread for the duration of the requests.
+    io_loop = r_db._client.io_loop
+    thread = threading.Thread(target=io_loop.start)
+    thread.start()
+    try:
+        with mock.patch.object(r_db, "_get_seismograms",
+                               side_effect=_get_seismograms):
+            results = r_db.get_seismograms_concurrently(
+                sources=sources, receivers=receivers, max_in_flight=4,
+                kind="velocity", dt=2.0)
+    finally:
+        io_loop.add_callback(io_loop.stop)
+        thread.join()
+
+    assert 1 < state["max_running"] <= 4
+    assert len(results) == len(receivers)
+    for receiver, r_st in zip(receivers, results):
+        l_st = l_db.get_seismograms(source=source, receiver=receiver,
+                                    kind="velocity", dt=2.0)
+        assert len(r_st) == len(l_st)
+        for r_tr, l_tr in zip(r_st, l_st):
+            assert r_tr.stats.__dict__ == l_tr.stats.__dict__
+            np.testing.assert_allclose(r_tr.data, l_tr.data,
+                                       atol=1E-6 * r_tr.data.ptp())
+
+    with pytest.raises(ValueError) as err:
+        r_db.get_seismograms_concurrently(sources=sources,
+                                          receivers=receivers[:2])
+    assert err.value.args[0] == ("sources and receivers must have the same "
+                                 "length.")
+
+
 def test_initialization_failures():
     """
     Tests various initialization failures for the remote instaseis db.
@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Tests for the response cache of the server.
+
+:copyright:
+    The Instaseis Development Team, 2026
+:license:
+    GNU Lesser General Public License, Version 3 [non-commercial/academic use]
+    (http://www.gnu.org/copyleft/lgpl.html)
+"""
+from __future__ import absolute_import, division
+
+import os
+
+import obspy
+
+from instaseis.server.response_cache import ResponseCache
+
+
+def test_response_cache(tmpdir):
+    cache_dir = os.path.join(tmpdir.strpath, "cache")
+
+    def _entry(i):
+        return {"body": bytes(bytearray([i])) * 400 * 1024,
+                "headers": [("Instaseis-Mu", "%f" % i)]}
+
+    # Room for two entries in memory.
+    cache = ResponseCache(fingerprint="a", max_size_in_mb=0.8,
+                          directory=cache_dir)
+
+    # Keys depend on the route, the arguments, and the fingerprint.
+    args = obspy.core.AttribDict(dt=2.0, origintime=obspy.UTCDateTime(0))
+    key = cache.get_key("/seismograms", args)
+    assert key == cache.get_key("/seismograms", obspy.core.AttribDict(
+        origintime=obspy.UTCDateTime(0), dt=2.0))
+    assert key != cache.get_key("/greens_function", args)
+    assert key != cache.get_key("/seismograms", obspy.core.AttribDict(
+        dt=2.5, origintime=obspy.UTCDateTime(0)))
+    assert key != ResponseCache(fingerprint="b").get_key("/seismograms",
+                                                         args)
+
+    assert cache.get("1") is None
+    for i in range(1, 4):
+        cache.add(str(i), _entry(i))
+        # Done by the server in a thread of the executor.
+        cache.disk_cache.add(str(i), _entry(i))
+    assert len(cache) == 2
+    assert 0.78 < cache.get_size_mb() < 0.79
+    assert cache.get("3") == _entry(3)
+
+    # The first one has been removed from memory but is still on disc.
+    assert cache.get("1") is None
+    assert cache.efficiency == 1.0 / 3.0
+    assert cache.disk_cache.get("1") == _entry(1)
+
+    # Persistent across instances with one file per response.
+    cache = ResponseCache(fingerprint="a", max_size_in_mb=0.8,
+                          directory=cache_dir)
+    assert cache.get("2") is None
+    assert cache.disk_cache.get("2") == _entry(2)
+    assert sorted(os.listdir(cache.disk_cache.directory)) == [
+        "1.npz", "2.npz", "3.npz"]
+
+    # Only the known headers are ever replayed.
+    cache.disk_cache.add("2", {
+        "body": _entry(2)["body"],
+        "headers": [("Instaseis-Mu", "2.000000"), ("Set-Cookie", "a")]})
+    assert cache.disk_cache.get("2") == _entry(2)
+
+    # Too large responses are not cached.
+    cache.add("4", {"body": b"1" * 1024 ** 2, "headers": []})
+    assert cache.get("4") is None
+
+    # Coalescing of identical requests.
+    results = []
+    assert cache.start("5") is None
+    waiters = cache.start("5")
+    waiters.append(results.append)
+    cache.start("5").append(results.append)
+    cache.done("5", _entry(5))
+    assert results == [_entry(5), _entry(5)]
+    assert cache.get("5") == _entry(5)
+
+    # Failed requests are not cached but the waiters are informed.
+    assert cache.start("6") is None
+    cache.start("6").append(results.append)
+    cache.done("6")
+    assert results[-1] is None
+    assert cache.get("6") is None
+    assert cache.start("6") is None
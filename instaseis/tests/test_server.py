@@ -14,6 +14,8 @@ from __future__ import absolute_import
 import copy
 import io
 import json
+import threading
+import time
 import zipfile
 
 import obspy
@@ -25,7 +27,11 @@ from .tornado_testing_fixtures import _assemble_url
 
 import instaseis
 from instaseis.helpers import geocentric_to_elliptic_latitude
+from instaseis.database_interfaces.remote_instaseis_db import \
+    _parse_bulk_response
 from instaseis.server import util
+from instaseis.server.response_cache import ResponseCache, \
+    get_db_fingerprint
 
 # Conditionally import mock either from the stdlib or as a separate library.
 import sys
@@ -52,10 +58,26 @@ def test_root_route(all_clients):
     request = client.fetch("/")
     assert request.code == 200
     result = json.loads(str(request.body.decode("utf8")))
+    executor = result.pop("executor")
     assert result == {
         "type": "Instaseis Remote Server", "version": instaseis.__version__}
     assert request.headers["Content-Type"] == "application/json; charset=UTF-8"
 
+    # Statistics of the worker pool.
+    assert executor["max_workers"] == client.application.executor.max_workers
+    assert executor["queue_depth"] == 0
+    assert executor["rejected_tasks"] == 0
+    assert executor["mean_wait_time_in_s"] >= 0.0
+    n_tasks = executor["submitted_tasks"]
+    params = {"sourcelatitude": 10, "sourcelongitude": 10,
+              "receiverlatitude": -10, "receiverlongitude": -10,
+              "mtt": "100000", "mpp": "200000", "mrr": "300000",
+              "mrt": "400000", "mrp": "500000", "mtp": "600000"}
+    assert client.fetch(_assemble_url("seismograms_raw",
+                                      **params)).code == 200
+    executor = json.loads(client.fetch("/").body.decode("utf8"))["executor"]
+    assert executor["submitted_tasks"] > n_tasks
+
 
 def test_info_route(all_clients):
     """
@@ -3424,6 +3446,361 @@ def test_time_settings_for_seismograms_route(all_clients):
         np.testing.assert_allclose(tr.data[:100], np.zeros(100))
 
 
+def test_time_window_is_pushed_into_extraction(all_clients):
+    """
+    Only the requested time window is extracted but the results must be
+    identical to trimming the full seismograms.
+    """
+    client = all_clients
+    db = instaseis.open_db(client.filepath)
+
+    origin_time = obspy.UTCDateTime(2015, 1, 1)
+    params = {
+        "sourcelatitude": 10, "sourcelongitude": 10, "receiverlatitude": -10,
+        "receiverlongitude": -10, "sourcedepthinmeters": client.source_depth,
+        "sourcemomenttensor": "100000,100000,100000,100000,100000,100000",
+        "dt": 2.0, "kernelwidth": 4, "origintime": str(origin_time),
+        "format": "miniseed"}
+
+    source = instaseis.Source(
+        latitude=10, longitude=10, depth_in_m=client.source_depth,
+        m_rr=100000, m_tt=100000, m_pp=100000, m_rt=100000, m_rp=100000,
+        m_tp=100000, origin_time=origin_time)
+    receiver = instaseis.Receiver(latitude=-10, longitude=-10)
+    full = db.get_seismograms(
+        source=source, receiver=receiver,
+        components=db.default_components, remove_source_shift=False,
+        dt=2.0, kernelwidth=4)
+
+    for starttime, endtime in [(origin_time + 101, origin_time + 400),
+                               (origin_time - 100, origin_time + 33)]:
+        p = copy.deepcopy(params)
+        p["starttime"] = str(starttime)
+        p["endtime"] = str(endtime)
+        with mock.patch.object(db.__class__, "get_seismograms",
+                               autospec=True,
+                               side_effect=db.__class__.get_seismograms) \
+                as get_seismograms:
+            request = client.fetch(_assemble_url('seismograms', **p))
+        assert request.code == 200
+        kwargs = get_seismograms.call_args[1]
+        assert kwargs["starttime"] == starttime - 2.0
+        assert kwargs["endtime"] == endtime + 2.0
+
+        st = obspy.read(request.buffer)
+        expected = full.copy().trim(starttime, endtime, pad=True,
+                                    fill_value=0.0, nearest_sample=False)
+        for tr in expected:
+            tr.data = np.require(tr.data, dtype=np.float32)
+        for tr, tr_expected in zip(st, expected):
+            assert tr.stats.starttime == tr_expected.stats.starttime
+            assert tr.stats.npts == tr_expected.stats.npts
+            np.testing.assert_allclose(
+                tr.data, tr_expected.data, rtol=1E-6,
+                atol=1E-6 * np.abs(tr_expected.data).max())
+
+
+def test_receivers_are_extracted_concurrently_but_sent_in_order(
+        all_clients_station_coordinates_callback):
+    """
+    The seismograms of several receivers are extracted at the same time but
+    must still be returned in the order of the receivers and be identical to
+    extracting them one after the other.
+    """
+    client = all_clients_station_coordinates_callback
+    db = instaseis.open_db(client.filepath)
+
+    station_list = [{"latitude": 10.0 * _i - 30.0, "longitude": 5.0 * _i,
+                     "network": "XX", "station": "S%02i" % _i}
+                    for _i in range(6)]
+
+    def station_coordinates_callback(networks, stations):
+        return copy.deepcopy(station_list)
+
+    origin_time = obspy.UTCDateTime(2015, 1, 1)
+    params = {
+        "sourcelatitude": 10, "sourcelongitude": 10,
+        "sourcedepthinmeters": client.source_depth,
+        "sourcemomenttensor": "100000,100000,100000,100000,100000,100000",
+        "network": "XX", "station": "*", "origintime": str(origin_time),
+        "format": "miniseed"}
+
+    lock = threading.Lock()
+    state = {"running": 0, "max_running": 0}
+
+    def get_seismograms(self, *args, **kwargs):
+        with lock:
+            state["running"] += 1
+            state["max_running"] = max(state["running"],
+                                       state["max_running"])
+        try:
+            # Make the first receiver finish last.
+            if kwargs["receiver"].station == "S00":
+                time.sleep(0.3)
+            else:
+                time.sleep(0.05)
+            return get_seismograms.original(self, *args, **kwargs)
+        finally:
+            with lock:
+                state["running"] -= 1
+
+    get_seismograms.original = db.__class__.get_seismograms
+
+    original_callback = client.application.station_coordinates_callback
+    original_look_ahead = client.application.receiver_look_ahead
+    client.application.station_coordinates_callback = \
+        station_coordinates_callback
+    streams = []
+    try:
+        for look_ahead, concurrent in [(4, True), (1, False)]:
+            client.application.receiver_look_ahead = look_ahead
+            state["max_running"] = 0
+            with mock.patch.object(db.__class__, "get_seismograms",
+                                   get_seismograms):
+                request = client.fetch(_assemble_url('seismograms', **params))
+            assert request.code == 200
+            if concurrent:
+                assert state["max_running"] > 1
+            else:
+                assert state["max_running"] == 1
+
+            st = obspy.read(request.buffer)
+            ncomp = len(db.default_components)
+            assert len(st) == 6 * ncomp
+            assert [tr.stats.station for tr in st[::ncomp]] == \
+                [_i["station"] for _i in station_list]
+            streams.append(st)
+    finally:
+        client.application.station_coordinates_callback = original_callback
+        client.application.receiver_look_ahead = original_look_ahead
+
+    # Same results as extracting one receiver after the other.
+    _compare_streams(*streams)
+
+
+def test_response_cache(all_clients, tmpdir):
+    """
+    Identical requests are answered from the response cache, can be
+    revalidated with their ETag, and are only computed once if they arrive
+    at the same time. Responses are shared with other processes on disc.
+    """
+    client = all_clients
+    db = instaseis.open_db(client.filepath)
+
+    basic_parameters = {
+        "sourcelatitude": 10, "sourcelongitude": 10,
+        "sourcedepthinmeters": client.source_depth,
+        "receiverlatitude": -10, "receiverlongitude": -10,
+        "sourcemomenttensor": "100000,100000,100000,100000,100000,100000",
+        "format": "miniseed"}
+    url = _assemble_url('seismograms', **basic_parameters)
+    greens_url = _assemble_url(
+        'greens_function', sourcedistanceindegrees=20,
+        sourcedepthinmeters=client.source_depth, format="miniseed")
+
+    def get_seismograms(self, *args, **kwargs):
+        # Make sure concurrent requests overlap.
+        time.sleep(0.2)
+        return get_seismograms.original(self, *args, **kwargs)
+
+    get_seismograms.original = db.__class__.get_seismograms
+
+    # No caching headers without a cache.
+    request = client.fetch(url)
+    assert request.code == 200
+    assert "Etag" not in request.headers
+    assert "Cache-Control" not in request.headers
+
+    client.application.response_cache = ResponseCache(
+        fingerprint=get_db_fingerprint(client.application.db))
+    try:
+        with mock.patch.object(db.__class__, "get_seismograms",
+                               autospec=True,
+                               side_effect=get_seismograms) as p:
+            request = client.fetch(url)
+            assert request.code == 200
+            assert p.call_count == 1
+            etag = request.headers["Etag"]
+            assert request.headers["Cache-Control"] == \
+                "public, max-age=3600"
+
+            # Same body and headers but nothing is computed.
+            cached = client.fetch(url)
+            assert cached.code == 200
+            assert p.call_count == 1
+            assert cached.body == request.body
+            for key in ("Etag", "Content-Type", "Content-Disposition",
+                        "Instaseis-Mu"):
+                assert cached.headers[key] == request.headers[key]
+
+            # Revalidation.
+            cached = client.fetch(url, headers={"If-None-Match": etag})
+            assert cached.code == 304
+            assert not cached.body
+            assert p.call_count == 1
+
+            # Different requests are computed.
+            request = client.fetch(url + "&dt=2.0")
+            assert request.code == 200
+            assert request.headers["Etag"] != etag
+            assert p.call_count == 2
+
+            # Concurrent identical requests are only computed once.
+            responses = []
+
+            def callback(response):
+                responses.append(response)
+                if len(responses) == 2:
+                    client.stop()
+
+            full_url = "http://localhost:%i%s&dt=3.0" % (
+                client._get_port(), url)
+            client.httpclient.fetch(full_url, callback)
+            client.httpclient.fetch(full_url, callback)
+            client.wait()
+            assert [_i.code for _i in responses] == [200, 200]
+            assert responses[0].body == responses[1].body
+            assert p.call_count == 3
+
+            # Errors are not cached.
+            request = client.fetch(url + "&components=X")
+            assert request.code == 400
+            assert request.code == client.fetch(url + "&components=X").code
+
+        # The Green's function route is cached as well.
+        if "db_bwd" in client.filepath:
+            request = client.fetch(greens_url)
+            assert request.code == 200
+            cached = client.fetch(greens_url)
+            assert cached.body == request.body
+            assert client.application.response_cache.hits == 2
+
+        # The disc tier is written in the background and read by other
+        # caches using the same directory.
+        client.application.response_cache = ResponseCache(
+            fingerprint=get_db_fingerprint(client.application.db),
+            directory=tmpdir.strpath)
+        with mock.patch.object(db.__class__, "get_seismograms",
+                               autospec=True,
+                               side_effect=get_seismograms) as p:
+            request = client.fetch(url)
+            assert request.code == 200
+            assert p.call_count == 1
+            disk_cache = client.application.response_cache.disk_cache
+            for _ in range(100):
+                if disk_cache.get_size_mb() > 0:
+                    break
+                time.sleep(0.05)
+
+            client.application.response_cache = ResponseCache(
+                fingerprint=get_db_fingerprint(client.application.db),
+                directory=tmpdir.strpath)
+            cached = client.fetch(url)
+            assert cached.code == 200
+            assert p.call_count == 1
+            assert cached.body == request.body
+            for key in ("Etag", "Content-Type", "Content-Disposition",
+                        "Instaseis-Mu"):
+                assert cached.headers[key] == request.headers[key]
+            # Now in memory as well.
+            assert len(client.application.response_cache) == 1
+    finally:
+        client.application.response_cache = None
+
+
+def test_seismograms_bulk_route(all_clients):
+    """
+    Raw seismograms of many source-receiver pairs in one binary response.
+    """
+    client = all_clients
+    db = instaseis.open_db(client.filepath)
+
+    items = [{"sourcelatitude": 10 + _i, "sourcelongitude": 10,
+              "sourcedepthinmeters": client.source_depth,
+              "mrr": 1E17, "mtt": 2E17, "mpp": -1E17, "mrt": 3E16,
+              "mrp": -1E16, "mtp": 5E16,
+              "receiverlatitude": -10, "receiverlongitude": -10 - _i}
+             for _i in range(3)]
+    # Force source and only a single component.
+    if "displ_only" in client.filepath:
+        items.append({"sourcelatitude": 1, "sourcelongitude": 2,
+                      "sourcedepthinmeters": client.source_depth,
+                      "fr": 1E10, "ft": 2E10, "fp": 3E10,
+                      "receiverlatitude": 3, "receiverlongitude": 4,
+                      "components": db.default_components[0]})
+
+    # Split into several tasks.
+    with mock.patch("instaseis.server.routes.seismograms_bulk"
+                    ".BULK_CHUNK_SIZE", 2):
+        request = client.fetch("/seismograms_bulk", method="POST",
+                               body=json.dumps(items))
+    assert request.code == 200
+    assert request.headers["Content-Type"] == "application/octet-stream"
+
+    seismograms = _parse_bulk_response(request.body)
+    assert len(seismograms) == len(items)
+    for item, seismogram in zip(items, seismograms):
+        if "fr" in item:
+            source = instaseis.ForceSource(
+                latitude=item["sourcelatitude"],
+                longitude=item["sourcelongitude"],
+                depth_in_m=item["sourcedepthinmeters"], f_r=item["fr"],
+                f_t=item["ft"], f_p=item["fp"])
+        else:
+            source = instaseis.Source(
+                latitude=item["sourcelatitude"],
+                longitude=item["sourcelongitude"],
+                depth_in_m=item["sourcedepthinmeters"], m_rr=item["mrr"],
+                m_tt=item["mtt"], m_pp=item["mpp"], m_rt=item["mrt"],
+                m_rp=item["mrp"], m_tp=item["mtp"])
+        receiver = instaseis.Receiver(latitude=item["receiverlatitude"],
+                                      longitude=item["receiverlongitude"],
+                                      depth_in_m=0.0)
+        components = list(item.get("components", db.default_components))
+        expected = db._get_seismograms(source=source, receiver=receiver,
+                                       components=components)
+        assert sorted(seismogram.keys()) == sorted(components + ["mu"])
+        np.testing.assert_allclose(seismogram["mu"], expected["mu"])
+        for comp in components:
+            assert seismogram[comp].dtype == np.dtype("<f4")
+            np.testing.assert_allclose(
+                seismogram[comp], expected[comp], rtol=1E-6,
+                atol=1E-6 * np.abs(expected[comp]).max())
+
+    # Invalid requests.
+    request = client.fetch("/seismograms_bulk", method="POST", body="[1, 2")
+    assert request.code == 400
+    assert request.reason == "The body of the request must be a JSON array."
+
+    request = client.fetch("/seismograms_bulk", method="POST", body="[]")
+    assert request.code == 400
+    assert request.reason == "At least one seismogram must be requested."
+
+    request = client.fetch("/seismograms_bulk", method="POST",
+                           body=json.dumps(items[:1] + [{"a": 1}]))
+    assert request.code == 400
+    assert request.reason == ("Seismogram 1: The following unknown "
+                              "parameters have been passed: 'a'")
+
+    p = copy.deepcopy(items[:2])
+    del p[1]["mrr"]
+    request = client.fetch("/seismograms_bulk", method="POST",
+                           body=json.dumps(p))
+    assert request.code == 400
+    assert request.reason == ("Seismogram 1: No/insufficient source "
+                              "parameters specified")
+
+    client.application.max_size_of_bulk_requests = 2
+    try:
+        request = client.fetch("/seismograms_bulk", method="POST",
+                               body=json.dumps(items))
+    finally:
+        client.application.max_size_of_bulk_requests = 10000
+    assert request.code == 400
+    assert request.reason == ("The server only allows 2 seismograms per bulk "
+                              "request. Please split the request.")
+
+
 def test_event_route_with_no_event_callback(all_clients):
     """
     If no event information callback has been set, the event route should
@@ -5230,3 +5607,90 @@ def test_sourcewidth_parameter(all_clients):
         d = st.select(component=comp)[0].data
         d_re = st_re.select(component=comp)[0].data
         assert np.abs(np.fft.rfft(d)).sum() > np.abs(np.fft.rfft(d_re)).sum()
+
+
+def test_bounded_thread_pool():
+    """
+    Tests the bounded thread pool executing the extraction tasks.
+    """
+    pool = util.BoundedThreadPool(max_workers=1, max_queue_size=1,
+                                  retry_after=3)
+    event = threading.Event()
+    done = []
+
+    # The first task occupies the single worker, the second is queued.
+    pool.submit(event.wait)
+    pool.submit(done.append, 1)
+    stats = pool.get_statistics()
+    assert stats["active_workers"] == 1
+    assert stats["queue_depth"] == 1
+    assert stats["max_queue_depth"] == 1
+
+    # The queue is full now.
+    with pytest.raises(util.QueueFullError):
+        pool.submit(done.append, 2)
+    # Unless the limit is explicitly bypassed.
+    pool.submit(done.append, 3, bypass_queue_limit=True)
+
+    event.set()
+    for _ in range(100):
+        if pool.get_statistics()["active_workers"] == 0:
+            break
+        time.sleep(0.05)
+
+    stats = pool.get_statistics()
+    assert done == [1, 3]
+    assert stats["queue_depth"] == 0
+    assert stats["max_queue_depth"] == 2
+    assert stats["submitted_tasks"] == 3
+    assert stats["completed_tasks"] == 3
+    assert stats["rejected_tasks"] == 1
+    assert stats["max_wait_time_in_s"] > 0.0
+    assert stats["mean_wait_time_in_s"] > 0.0
+
+    with pytest.raises(ValueError):
+        util.BoundedThreadPool(max_workers=0)
+
+
+def test_busy_server_returns_503(all_clients):
+    """
+    Requests exceeding the capacity of the worker pool are answered with
+    HTTP 503 and a Retry-After header.
+    """
+    client = all_clients
+    client.application.executor = util.BoundedThreadPool(
+        max_workers=1, max_queue_size=0, retry_after=7)
+
+    basic_parameters = {
+        "sourcelatitude": 10,
+        "sourcelongitude": 10,
+        "sourcedepthinmeters": client.source_depth,
+        "receiverlatitude": -10,
+        "receiverlongitude": -10}
+    raw_params = copy.deepcopy(basic_parameters)
+    raw_params.update({"mtt": "100000", "mpp": "100000", "mrr": "100000",
+                       "mrt": "100000", "mrp": "100000", "mtp": "100000"})
+    params = copy.deepcopy(basic_parameters)
+    params["sourcemomenttensor"] = "100000,100000,100000,100000,100000,100000"
+
+    # Block the only worker.
+    event = threading.Event()
+    client.application.executor.submit(event.wait)
+
+    for route, p in (("seismograms", params),
+                     ("seismograms_raw", raw_params)):
+        request = client.fetch(_assemble_url(route, **p))
+        assert request.code == 503
+        assert request.headers["Retry-After"] == "7"
+
+    event.set()
+    # Wait until the worker has finished as nothing can be queued.
+    for _ in range(1000):
+        if not client.application.executor.get_statistics()[
+                "active_workers"]:
+            break
+        time.sleep(0.01)
+    request = client.fetch(_assemble_url("seismograms_raw", **raw_params))
+    assert request.code == 200
+    assert client.application.executor.get_statistics()[
+        "rejected_tasks"] == 2
@@ -23,6 +23,8 @@ from .tornado_testing_fixtures import *  # NOQA
 from .tornado_testing_fixtures import _assemble_url
 
 import instaseis
+from instaseis.database_interfaces.base_netcdf_instaseis_db import \
+    BaseNetCDFInstaseisDB
 
 # Conditionally import mock either from the stdlib or as a separate library.
 import sys
@@ -353,6 +355,57 @@ def test_finite_source_retrieval(reciprocal_clients, usgs_param):
                                    atol=1E-6 * tr_db.data.ptp())
 
 
+def test_finite_source_retrieval_with_workers(reciprocal_clients):
+    """
+    Finite sources computed by worker processes are the same as the ones
+    computed in the extraction thread.
+    """
+    import concurrent.futures
+    client = reciprocal_clients
+
+    params = {
+        "receiverlongitude": 11,
+        "receiverlatitude": 22,
+        "receiverdepthinmeters": 0,
+        "format": "miniseed"}
+
+    with io.open(USGS_PARAM_FILE_1, "rb") as fh:
+        body = fh.read()
+
+    request = client.fetch(_assemble_url('finite_source', **params),
+                           method="POST", body=body)
+    assert request.code == 200
+    st_serial = obspy.read(request.buffer)
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=2) as executor:
+        client.application.finite_source_workers = 2
+        client.application.finite_source_executor = executor
+        try:
+            method = BaseNetCDFInstaseisDB._get_finite_source_spectra_parallel
+            with mock.patch.object(
+                    BaseNetCDFInstaseisDB,
+                    "_get_finite_source_spectra_parallel", autospec=True,
+                    side_effect=method) as p:
+                request = client.fetch(
+                    _assemble_url('finite_source', **params),
+                    method="POST", body=body)
+        finally:
+            client.application.finite_source_workers = 1
+            client.application.finite_source_executor = None
+    assert request.code == 200
+    assert p.call_count == 1
+    assert p.call_args[1]["workers"] == 2
+    assert p.call_args[1]["executor"] is executor
+    st_parallel = obspy.read(request.buffer)
+
+    assert len(st_serial) == len(st_parallel)
+    for tr_serial, tr_parallel in zip(st_serial, st_parallel):
+        assert tr_serial.stats == tr_parallel.stats
+        np.testing.assert_allclose(tr_parallel.data, tr_serial.data,
+                                   rtol=1E-5,
+                                   atol=1E-5 * np.abs(tr_serial.data).max())
+
+
 @pytest.mark.parametrize("usgs_param", [USGS_PARAM_FILE_1, USGS_PARAM_FILE_2])
 def test_more_complex_queries(reciprocal_clients_all_callbacks,
                               usgs_param):
@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Tests for the on-disk strain and seismogram caches.
+
+:copyright:
+    The Instaseis Development Team, 2026
+:license:
+    GNU Lesser General Public License, Version 3 [non-commercial/academic use]
+    (http://www.gnu.org/copyleft/lgpl.html)
+"""
+from __future__ import absolute_import, division
+
+import os
+import time
+
+import numpy as np
+
+from instaseis.database_interfaces.seismogram_cache import \
+    SeismogramCache, get_info_fingerprint
+from instaseis.database_interfaces.strain_cache import StrainCache
+
+
+def test_strain_cache(tmpdir):
+    db_file = os.path.join(tmpdir.strpath, "ordered_output.nc4")
+    with open(db_file, "wb") as fh:
+        fh.write(b"1")
+    cache_dir = os.path.join(tmpdir.strpath, "cache")
+
+    # Each file is a bit more than 78 kB.
+    cache = StrainCache(cache_dir, db_file, max_size_in_mb=0.3)
+    assert cache.get(1) is None
+    assert cache.efficiency == 0.0
+
+    data = np.asfortranarray(np.random.random((10, 5, 5, 40)))
+    cache.add(1, data)
+    value = cache.get(1)
+    np.testing.assert_array_equal(value, data)
+    assert value.flags.f_contiguous
+    assert not value.flags.writeable
+    assert cache.efficiency == 0.5
+
+    # Persistent across instances.
+    cache = StrainCache(cache_dir, db_file, max_size_in_mb=0.3)
+    np.testing.assert_array_equal(cache.get(1), data)
+    assert 0.076 < cache.get_size_mb() < 0.077
+
+    # Adding an existing item, e.g. by two threads missing the same one,
+    # does not count its size twice.
+    cache.add(1, data)
+    assert 0.076 < cache.get_size_mb() < 0.077
+
+    # Least recently used ones are removed. Reading an item marks it as
+    # used. Sleep to make sure the file times differ.
+    time.sleep(0.01)
+    cache.add(2, data)
+    time.sleep(0.01)
+    assert cache.get(1) is not None
+    for key in (3, 4):
+        time.sleep(0.01)
+        cache.add(key, data)
+    assert cache.get(2) is None
+    for key in (1, 3, 4):
+        assert cache.get(key) is not None
+    assert cache.get_size_mb() <= 0.3
+    assert sorted(os.listdir(cache.directory)) == ["1.npy", "3.npy",
+                                                   "4.npy"]
+
+    # A modified database file results in a new cache.
+    time.sleep(0.01)
+    with open(db_file, "wb") as fh:
+        fh.write(b"12")
+    new_cache = StrainCache(cache_dir, db_file)
+    assert new_cache.directory != cache.directory
+    assert new_cache.get(1) is None
+
+
+def test_seismogram_cache(tmpdir):
+    cache_dir = os.path.join(tmpdir.strpath, "cache")
+    info = {"velocity_model": "ak135f", "axisem_version": "7", "dt": 2.0,
+            "datetime": "2015-01-01T00:00:00", "npts": 100,
+            "is_reciprocal": True, "components": "vertical only"}
+    fingerprint = get_info_fingerprint(info)
+    assert fingerprint == get_info_fingerprint(dict(info))
+    assert fingerprint != get_info_fingerprint(
+        dict(info, datetime="2016-01-01T00:00:00"))
+
+    # Each file is a bit more than 80 kB.
+    cache = SeismogramCache(cache_dir, fingerprint, max_size_in_mb=0.2)
+    params = {"sourcelatitude": 1.0, "receiverlatitude": 2.0,
+              "components": "ZNE"}
+    key = cache.get_key(params)
+    assert key == cache.get_key(dict(params))
+    assert key != cache.get_key(dict(params, components="Z"))
+    assert key != SeismogramCache(cache_dir, "other").get_key(params)
+
+    data = {"mu": 1.5, "Z": np.random.random(20000).astype(np.float32)}
+    assert cache.get(key) is None
+    cache.add(key, data)
+    value = cache.get(key)
+    assert sorted(value.keys()) == ["Z", "mu"]
+    assert value["mu"] == 1.5
+    np.testing.assert_array_equal(value["Z"], data["Z"])
+    assert value["Z"].dtype == np.float32
+
+    # Persistent across instances and least recently used ones are removed.
+    cache = SeismogramCache(cache_dir, fingerprint, max_size_in_mb=0.2)
+    for k in ("2", "3"):
+        time.sleep(0.01)
+        cache.add(k, data)
+    assert cache.get(key) is None
+    assert cache.get("2") is not None
+    assert cache.get("3") is not None
+
+    # Broken files are treated as missing.
+    with open(cache._get_filename("3"), "wb") as fh:
+        fh.write(b"1234")
+    assert cache.get("3") is None
@@ -14,7 +14,8 @@ from __future__ import absolute_import
 import numpy as np
 
 
-from instaseis import finite_elem_mapping, rotations
+from instaseis import (finite_elem_mapping, rotations, sem_derivatives,
+                       spectral_basis)
 
 
 def test_rotate_frame_rd():
@@ -41,3 +42,109 @@ def test_inside_element():
     assert is_in
     assert abs(xi - -0.68507753579755248 < 1E-5)
     assert abs(eta - -0.60000654152462352 < 1E-5)
+
+
+def test_inside_element_many():
+    """
+    The batched version must return the first candidate containing each
+    point and the same reference coordinates as the single point version.
+    """
+    nodes = np.array([
+        [4668274.5, 4313461.5],
+        [4703863.5, 4274623.],
+        [4714964.5, 4284711.],
+        [4679291.5,  4323641.]], dtype=np.float64)
+    # The same element shifted far away so it never contains the points.
+    far_nodes = nodes + 1E6
+
+    np.random.seed(12345)
+    s = 4676105.76848 + np.random.uniform(-1000, 1000, 10)
+    z = 4309398.54759 + np.random.uniform(-1000, 1000, 10)
+    # The last point is in none of its candidates.
+    s[-1] += 1E5
+    candidates = np.array([[7, 3]] * 10)
+    candidates[::2] = [[3, 7]]
+    all_nodes = np.empty((10, 2, 4, 2))
+    all_nodes[:, 0] = far_nodes
+    all_nodes[:, 1] = nodes
+    all_nodes[::2, 0] = nodes
+    all_nodes[::2, 1] = far_nodes
+
+    id_elem, xi, eta = finite_elem_mapping.inside_element_many(
+        s, z, candidates, all_nodes, np.zeros((10, 2)), tolerance=1E-3)
+
+    np.testing.assert_array_equal(id_elem, [3] * 9 + [-1])
+    for _i in range(9):
+        _, _xi, _eta = finite_elem_mapping.inside_element(
+            s=s[_i], z=z[_i], nodes=nodes, element_type=0, tolerance=1E-3)
+        assert xi[_i] == _xi
+        assert eta[_i] == _eta
+
+
+def test_strain_at_point_td():
+    """
+    Evaluating the strain at a single point must be identical to
+    calculating it on all GLL points and interpolating afterwards.
+    """
+    np.random.seed(12345)
+    npol = 4
+    nsamp = 20
+    gll_points = np.array([-1.0, -np.sqrt(3.0 / 7.0), 0.0,
+                           np.sqrt(3.0 / 7.0), 1.0])
+    nodes = np.array([
+        [4668274.5, 4313461.5],
+        [4703863.5, 4274623.],
+        [4714964.5, 4284711.],
+        [4679291.5, 4323641.]], dtype=np.float64)
+    G = np.random.randn(npol + 1, npol + 1)  # NOQA
+    GT = np.random.randn(npol + 1, npol + 1)  # NOQA
+    u = np.random.randn(nsamp, npol + 1, npol + 1, 3)
+
+    for fct in (sem_derivatives.strain_monopole_td,
+                sem_derivatives.strain_dipole_td,
+                sem_derivatives.strain_quadpole_td):
+        for axial in (False, True):
+            strain = fct(u, G, GT, gll_points, gll_points, npol, nsamp, nodes,
+                         0, axial)
+            expected = np.empty((nsamp, 6))
+            for i in range(6):
+                expected[:, i] = spectral_basis.lagrange_interpol_2D_td(
+                    gll_points, gll_points, strain[:, :, :, i], 0.3, -0.7)
+
+            actual = sem_derivatives.strain_at_point_td(
+                fct, u, G, GT, gll_points, gll_points, npol, nodes, 0, axial,
+                0.3, -0.7)
+            np.testing.assert_allclose(actual, expected, rtol=1E-10,
+                                       atol=1E-10 * np.abs(expected).max())
+
+
+def test_lagrange_interpol_2D_td_multi():  # NOQA
+    """
+    Interpolating all components in one go must be identical to
+    interpolating them one by one.
+    """
+    np.random.seed(12345)
+    gll_points = np.array([-1.0, -np.sqrt(3.0 / 7.0), 0.0,
+                           np.sqrt(3.0 / 7.0), 1.0])
+    glj_points = np.array([-1.0, -0.5077876295, 0.1323008207, 0.7088201421,
+                           1.0])
+    coefficients = np.asfortranarray(np.random.randn(30, 5, 5, 4))
+
+    for x1, x2 in [(0.3, -0.7), (-1.0, 1.0), (0.0, 0.0)]:
+        actual = spectral_basis.lagrange_interpol_2D_td_multi(
+            glj_points, gll_points, coefficients, x1, x2)
+        assert actual.shape == (30, 4)
+        for i in range(4):
+            expected = spectral_basis.lagrange_interpol_2D_td(
+                glj_points, gll_points, coefficients[:, :, :, i], x1, x2)
+            np.testing.assert_allclose(actual[:, i], expected, rtol=1E-12,
+                                       atol=1E-12)
+
+    # The weights are cached.
+    w1 = spectral_basis.lagrange_weights_2D(glj_points, gll_points, 0.3, -0.7)
+    w2 = spectral_basis.lagrange_weights_2D(glj_points, gll_points, 0.3, -0.7)
+    assert w1 is w2
+    w3 = spectral_basis.lagrange_weights_2D(gll_points, gll_points, 0.3, -0.7)
+    assert w3 is not w1
+    np.testing.assert_allclose(w3[0], spectral_basis.lagrange_basis(
+        gll_points, 0.3))
@@ -370,15 +370,20 @@ def all_clients_all_callbacks(request):
 
 def _add_callback(client):
     def request_callback(request):
-        req = client.fetch(request.path_url)
+        kwargs = {}
+        if request.method == "POST":
+            kwargs["method"] = "POST"
+            kwargs["body"] = request.body
+        req = client.fetch(request.path_url, **kwargs)
         return (req.code, req.headers, req.body)
 
     pattern = re.compile(r"http://localhost.*")
-    responses.add_callback(
-        responses.GET, pattern,
-        callback=request_callback,
-        content_type="application/octet_stream"
-    )
+    for method in (responses.GET, responses.POST):
+        responses.add_callback(
+            method, pattern,
+            callback=request_callback,
+            content_type="application/octet_stream"
+        )
 
 
 @pytest.fixture(params=list(DBS.values()))
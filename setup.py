@@ -153,10 +153,11 @@ EXTRAS_REQUIRE = {
               'pytest>=3.0', 'responses']
 }
 
-# Add mock for Python 2.x. Starting with Python 3 it is part of the standard
-# library.
+# Add mock and futures for Python 2.x. Starting with Python 3 they are part
+# of the standard library.
 if sys.version_info[0] == 2:
     INSTALL_REQUIRES.append("mock")
+    INSTALL_REQUIRES.append("futures")
 
 setup_config = dict(
     name="instaseis",